@@ -1,25 +1,55 @@
 from flask import Flask
-from flask_pymongo import PyMongo
 from flask_cors import CORS
 import logging
+import sys
+import time
 from .config import Config  # Make sure to import your Config class
+from common.database import MongoDatabase
 
-mongo = PyMongo()
+# Shared with the worker, see common/database.py
+mongo = MongoDatabase()
 
 def create_app():
+    started_at = time.perf_counter()
     app = Flask(__name__)
     app.config.from_object(Config)
 
-    # Initialize extensions
-    mongo.init_app(app)
+    # Initialize extensions, timing every MongoDB command for /metrics and for request profiles
+    from common.profiling import MongoProfileListener
+    from .metrics import MongoCommandMetrics, init_metrics
+    from .profiling import init_profiling
+    mongo.configure(app.config['MONGO_URI'], app.config['MONGO_DB'], event_listeners=[MongoCommandMetrics(), MongoProfileListener()])
     CORS(app, origins=Config.CORS_ORIGINS)
 
     # Initialize logger
     logger = logging.getLogger(__name__)
     logger.info("Logging is configured.")   
 
+    # Time every request and expose /metrics
+    init_metrics(app)
+
+    # Profile requests on demand
+    init_profiling(app)
+
     # Register blueprints
     from .routes import register_routes
     register_routes(app)
 
-    return app
\ No newline at end of file
+    # Register CLI commands
+    from .commands import register_commands
+    register_commands(app)
+
+    # Ensure the declared index set
+    from .services.index_service import IndexService
+    IndexService.ensure_indexes()
+
+    # Drain queued trades in this process when the write-behind queue is enabled
+    from .services.trade_queue_service import TradeQueueService
+    TradeQueueService.start_workers()
+
+    # Heavy optional modules (pytrends pulls in pandas) must only load on first use
+    logger.info(
+        f"App created in {(time.perf_counter() - started_at) * 1000:.1f} ms "
+        f"(pandas loaded: {'pandas' in sys.modules})"
+    )
+    return app
@@ -0,0 +1,74 @@
+"""
+Async serving mode: the hot routes run as coroutines over motor on an ASGI
+server, and every other route is served by the sync Flask app in a thread pool.
+
+See asgi.py for the entry point.
+"""
+from quart import Quart
+from quart_cors import cors
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RequestRedirect
+from a2wsgi import WSGIMiddleware
+from app.config import Config
+from common.database import AsyncMongoDatabase
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Shared by the async services, see common/database.py
+mongo = AsyncMongoDatabase()
+
+
+class AsyncDispatcher:
+    """
+    ASGI app sending requests for the routes of the async app to it, and
+    every other request to the sync app.
+    """
+
+    def __init__(self, async_app, sync_app, threads):
+        self.async_app = async_app
+        self.sync_app = WSGIMiddleware(sync_app, workers=threads)
+        self._routes = async_app.url_map.bind('localhost')
+
+    def handles(self, path, method):
+        try:
+            self._routes.match(path, method)
+            return True
+        except RequestRedirect:
+            return True
+        except HTTPException:
+            return False
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and not self.handles(scope['path'], scope['method']):
+            await self.sync_app(scope, receive, send)
+        else:
+            await self.async_app(scope, receive, send)
+
+
+def create_async_app():
+    """
+    Create the sync app and the async app serving its hot routes.
+
+    Returns:
+        AsyncDispatcher: The ASGI app.
+    """
+    from app import create_app
+    from app.metrics import MongoCommandMetrics
+    from common.profiling import MongoProfileListener
+    from .routes import register_routes
+    from .instrumentation import init_metrics, init_profiling
+
+    sync_app = create_app()
+
+    app = Quart(__name__)
+    app.config.from_object(Config)
+    app = cors(app, allow_origin=Config.CORS_ORIGINS)
+
+    mongo.configure(Config.MONGO_URI, Config.MONGO_DB, event_listeners=[MongoCommandMetrics(), MongoProfileListener()])
+    init_metrics(app)
+    init_profiling(app)
+    register_routes(app)
+
+    logger.info(f"Async app serving {len(list(app.url_map.iter_rules()))} routes, the rest on {Config.ASYNC_SYNC_THREADS} threads")
+    return AsyncDispatcher(app, sync_app, Config.ASYNC_SYNC_THREADS)
@@ -0,0 +1,32 @@
+from quart import current_app, request
+from app.http_cache import CachedBody, ResponseCache, negotiate
+
+
+async def cached_body(key, build, version=None, ttl=None, store=True):
+    """
+    Async counterpart of ResponseCache.get: build is a coroutine function,
+    only awaited when the entry is stale. Entries are shared with the sync app.
+
+    Returns:
+        CachedBody: The rendered body.
+    """
+    if not store:
+        return CachedBody(await build(), dumps=current_app.json.dumps)
+    cached = ResponseCache.lookup(key, version, ttl)
+    if cached is None:
+        cached = ResponseCache.put(key, CachedBody(await build(), dumps=current_app.json.dumps), version, ttl)
+    return cached
+
+
+def conditional_response(cached, status=200):
+    """
+    Answer with the cached body, a 304 if the client already has it, or a
+    compressed variant if the client accepts one (see app.http_cache).
+
+    Returns:
+        quart.Response: The response.
+    """
+    body, headers = negotiate(cached, request.accept_encodings, request.if_none_match)
+    if body is None:
+        return current_app.response_class('', status=304, headers=headers)
+    return current_app.response_class(body, status=status, mimetype='application/json', headers=headers)
@@ -0,0 +1,72 @@
+from quart import current_app, g, request
+from app.metrics import REQUEST_LATENCY, REQUESTS_IN_FLIGHT, route_labels
+from app.profiling import profile_requested, start_request_profile, profile_document
+import asyncio
+import random
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# The hooks are coroutines: Quart runs sync hooks in a thread, which would
+# profile that thread instead of the event loop running the request.
+
+
+def init_metrics(app):
+    """
+    Time every request of the async app with the metrics of app.metrics,
+    which the sync app exposes at /metrics for the whole process.
+    """
+    @app.before_request
+    async def start_timer():
+        g.metrics_started_at = time.perf_counter()
+        g.metrics_labels = route_labels(request)
+        REQUESTS_IN_FLIGHT.labels(*g.metrics_labels).inc()
+
+    @app.after_request
+    async def observe_latency(response):
+        if 'metrics_started_at' in g:
+            REQUEST_LATENCY.labels(*g.metrics_labels, request.method, response.status_code).observe(
+                time.perf_counter() - g.metrics_started_at
+            )
+        return response
+
+    @app.teardown_request
+    async def finish_request(error=None):
+        if 'metrics_labels' in g:
+            REQUESTS_IN_FLIGHT.labels(*g.metrics_labels).dec()
+
+
+def init_profiling(app):
+    """
+    Profile requests of the async app on demand, like app.profiling.init_profiling.
+    """
+    sample_rate = app.config['PROFILE_SAMPLE_RATE']
+    interval = app.config['PROFILE_INTERVAL']
+
+    @app.before_request
+    async def start_profile():
+        requested = profile_requested(request, current_app.config['SECRET_KEY'])
+        if requested or (sample_rate and random.random() < sample_rate):
+            g.profile = start_request_profile(request, interval)
+            g.profile_requested = requested
+
+    @app.after_request
+    async def save_profile(response):
+        profile = g.pop('profile', None)
+        if profile is not None:
+            from app.services.profile_service import ProfileService
+            # Joins the sampler thread and writes with the sync client, so off the event loop
+            await asyncio.to_thread(profile.stop)
+            document = profile_document(profile, request, response.status_code, g.profile_requested)
+            profile_id = await asyncio.to_thread(ProfileService.save_profile, document)
+            if profile_id:
+                response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    async def discard_profile(error=None):
+        # The request failed before after_request ran
+        profile = g.pop('profile', None)
+        if profile is not None:
+            await asyncio.to_thread(profile.stop)
@@ -0,0 +1,13 @@
+from .auth import bp as auth_bp
+from .stocks import bp as stocks_bp
+from .transactions import bp as transactions_bp
+from .portfolio import bp as portfolio_bp
+from .leaderboard import bp as leaderboard_bp
+
+# Routes served by the async app; all others fall through to the sync app
+def register_routes(app):
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(stocks_bp)
+    app.register_blueprint(transactions_bp)
+    app.register_blueprint(portfolio_bp)
+    app.register_blueprint(leaderboard_bp)
@@ -0,0 +1,72 @@
+from quart import Blueprint, request, jsonify, current_app
+from app.aio.services.user_service import UserService
+from app.routes.auth import decode_token, issue_token
+from functools import wraps
+import logging
+
+# Create a Blueprint for authentication-related routes
+bp = Blueprint('auth', __name__, url_prefix='/auth')
+logger = logging.getLogger(__name__)
+
+# Decorator to ensure a valid JWT token is present in the request header
+def token_required(f):
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        user_id, error = decode_token(request.headers.get('Authorization'), current_app.config['SECRET_KEY'])
+        if error:
+            return jsonify({'message': error}), 403
+
+        return await f(user_id, *args, **kwargs)
+
+    return decorated
+
+# Route to verify user credentials and issue a JWT token
+@bp.route('/verify_credentials', methods=['POST'])
+async def verify_credentials():
+    data = await request.get_json()
+    logger.info(f"Verifying credentials for username: {data.get('username')}")
+
+    user = await UserService.verify_credentials(data)
+    if user:
+        token = issue_token(user, current_app.config['SECRET_KEY'])
+
+        logger.info(f"Credentials verified for user_id: {user['_id']}. Token generated.")
+        return jsonify({"message": "Credentials verified", "token": token, "isAdmin": user['isAdmin']}), 200
+    else:
+        logger.warning(f"Invalid credentials provided for username: {data.get('username')}")
+        return jsonify({"error": "Invalid username or password"}), 401
+
+# Route to register a new user
+@bp.route('/register', methods=['POST'])
+async def register():
+    data = await request.get_json()
+
+    data['username'] = data['username'].strip()
+    data['password'] = data['password'].strip()
+
+    logger.info(f"Attempting to register new user with username: {data.get('username')}")
+
+    result = await UserService.register_user(data)
+
+    if result.get("message") == "User registered successfully":
+        return jsonify(result), 200
+    elif result.get("message") == "Duplicate user not registered":
+        logger.warning(f"Username {data.get('username')} is already taken.")
+        return jsonify({"error": "Username is already taken!"}), 409
+    else:
+        logger.error(f"Failed to register user {data.get('username')}.")
+        return jsonify({"error": "Failed to register user!"}), 500
+
+# Route to get the user ID by username, requires a valid JWT token
+@bp.route('/get_user_id', methods=['GET'])
+@token_required
+async def get_user_id(current_user):
+    username = request.args.get('username')
+    logger.info(f"Fetching user ID for username: {username}")
+
+    user_id = await UserService.get_user_id(username)
+    if user_id:
+        return jsonify({"_id": str(user_id)}), 200
+    else:
+        logger.warning(f"User {username} not found.")
+        return jsonify({"error": "User not found"}), 404
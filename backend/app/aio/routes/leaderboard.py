@@ -0,0 +1,35 @@
+from quart import Blueprint, jsonify, request
+from app.aio.services.leaderboard_service import LeaderboardService
+from app.aio.http_cache import cached_body, conditional_response
+from app.routes.leaderboard import DEFAULT_LIMIT, MAX_LIMIT, LEADERBOARD_CACHE_TTL
+import logging
+
+# Initialize the logger
+logger = logging.getLogger(__name__)
+
+# Create a Blueprint for leaderboard-related routes
+bp = Blueprint('leaderboard', __name__, url_prefix='/leaderboard')
+
+@bp.route('', methods=['GET'])
+async def get_leaderboard():
+    """
+    Fetch a page of the current leaderboard.
+
+    Accepts optional 'limit' and 'offset' query parameters.
+    Returns a JSON list with the leaderboard data, ranked by net worth, with an ETag.
+    """
+    try:
+        limit = min(max(request.args.get('limit', DEFAULT_LIMIT, type=int), 1), MAX_LIMIT)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+
+        cached = await cached_body(
+            ("leaderboard", limit, offset),
+            lambda: LeaderboardService.get_leaderboard(limit=limit, offset=offset),
+            ttl=LEADERBOARD_CACHE_TTL,
+            # Only the first pages are polled; deeper offsets would grow the cache without bound
+            store=offset == 0
+        )
+        return conditional_response(cached)
+    except Exception as e:
+        logger.error(f"Error fetching the leaderboard: {e}")
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,112 @@
+from quart import Blueprint, jsonify, request
+from app.aio.services.user_service import UserService
+from app.services.user_service import NET_WORTH_COLLECTIONS
+from app.routes.portfolio import DEFAULT_HISTORY_LIMIT, MAX_HISTORY_LIMIT
+from datetime import datetime
+from .auth import token_required
+import logging
+
+# Initialize the logger
+logger = logging.getLogger(__name__)
+
+# Create a Blueprint for portfolio-related routes
+bp = Blueprint('portfolio', __name__, url_prefix='/portfolio')
+
+@bp.route('/stocks', methods=['GET'])
+@token_required
+async def get_portfolio(user_id):
+    """
+    Fetch the user's portfolio.
+    """
+    try:
+        portfolio = await UserService.get_portfolio(user_id)
+        return jsonify(portfolio), 200
+    except Exception as e:
+        logger.error(f"Error fetching portfolio for user_id {user_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/balance', methods=['GET'])
+@token_required
+async def get_balance(user_id):
+    """
+    Fetch the user's balance.
+    """
+    try:
+        balance = await UserService.get_balance(user_id)
+        return jsonify(balance), 200
+    except Exception as e:
+        logger.error(f"Error fetching balance for user_id {user_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/title', methods=['GET'])
+@token_required
+async def get_title(user_id):
+    """
+    Fetch the user's title level and name ("none" for level -1).
+    """
+    try:
+        title_data = await UserService.get_title(user_id)
+        if title_data:
+            return jsonify({"level": title_data['level'], "name": title_data['name']}), 200
+        else:
+            logger.warning(f"Title not found for user_id: {user_id}")
+            return jsonify({"message": "Title not found"}), 404
+    except Exception as e:
+        logger.error(f"Error fetching title for user_id {user_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/assets_value', methods=['GET'])
+@token_required
+async def get_assets_value(user_id):
+    """
+    Fetch the user's assets value.
+    """
+    try:
+        assets_value = await UserService.get_assets_value(user_id)
+        return jsonify(assets_value), 200
+    except Exception as e:
+        logger.error(f"Error fetching assets value for user_id {user_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/summary', methods=['GET'])
+@token_required
+async def get_summary(user_id):
+    """
+    Fetch the balance, title, priced holdings, assets value and net worth in one call.
+    """
+    try:
+        summary = await UserService.get_portfolio_summary(user_id)
+        if summary is None:
+            logger.warning(f"User not found for user_id: {user_id}")
+            return jsonify({"message": "User not found"}), 404
+        return jsonify(summary), 200
+    except Exception as e:
+        logger.error(f"Error fetching portfolio summary for user_id {user_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/history', methods=['GET'])
+@token_required
+async def get_history(user_id):
+    """
+    Fetch the user's net worth history.
+
+    Accepts an 'interval' query parameter ('tick' or '1d', default 'tick'),
+    an optional 'limit', and optional ISO 8601 'from' and 'to' bounds.
+    """
+    try:
+        interval = request.args.get('interval', 'tick')
+        if interval not in NET_WORTH_COLLECTIONS:
+            return jsonify({"error": f"Invalid interval, expected one of {', '.join(NET_WORTH_COLLECTIONS)}"}), 400
+
+        limit = min(max(request.args.get('limit', DEFAULT_HISTORY_LIMIT, type=int), 1), MAX_HISTORY_LIMIT)
+        try:
+            start = datetime.fromisoformat(request.args['from']) if 'from' in request.args else None
+            end = datetime.fromisoformat(request.args['to']) if 'to' in request.args else None
+        except ValueError:
+            return jsonify({"error": "Invalid 'from' or 'to' timestamp"}), 400
+
+        points = await UserService.get_net_worth_history(user_id, interval, limit, start, end)
+        return jsonify({"interval": interval, "points": points}), 200
+    except Exception as e:
+        logger.error(f"Error fetching net worth history for user_id {user_id}: {e}")
+        return jsonify({'error': str(e)}), 500
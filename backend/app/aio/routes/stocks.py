@@ -0,0 +1,108 @@
+from quart import Blueprint, Response, jsonify, request
+from app.aio.services.stock_service import StockService
+from app.aio.services.price_feed_service import AsyncPriceFeedSubscriber
+from app.aio.http_cache import cached_body, conditional_response
+from app.services.stock_service import CANDLE_COLLECTIONS
+from app.services.price_feed_service import PriceFeedService
+from app.routes.stocks import STREAM_HEARTBEAT, DEFAULT_HISTORY_LIMIT, MAX_HISTORY_LIMIT
+from datetime import datetime
+import json
+import logging
+
+# Initialize the logger
+logger = logging.getLogger(__name__)
+
+# Create a Blueprint for stock-related routes
+bp = Blueprint('stocks', __name__, url_prefix='/stocks')
+
+@bp.route('/list', methods=['GET'])
+async def get_stocks():
+    """
+    Fetch all stocks, with an ETag; the rendered body is reused until the cached stock list changes.
+    """
+    try:
+        stocks = await StockService.get_all_stocks()
+
+        if stocks:
+            async def build():
+                return stocks
+            return conditional_response(await cached_body(("stocks",), build, version=stocks))
+        else:
+            logger.warning("No stocks found in the database")
+            return jsonify({"message": "No stocks found"}), 404
+    except Exception as e:
+        logger.error(f"Error fetching stocks: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
+
+@bp.route('/stream', methods=['GET'])
+async def stream_stocks():
+    """
+    Stream stock price changes as server-sent events.
+
+    Each connection is a coroutine waiting on the shared price feed watcher,
+    so idle streams do not hold a thread.
+    """
+    subscriber = PriceFeedService.subscribe(AsyncPriceFeedSubscriber())
+
+    async def generate():
+        try:
+            yield b"retry: 5000\n\n"
+            while True:
+                changes = await subscriber.wait(STREAM_HEARTBEAT)
+                if changes:
+                    yield f"event: prices\ndata: {json.dumps(changes)}\n\n".encode()
+                else:
+                    yield b": keep-alive\n\n"
+        finally:
+            PriceFeedService.unsubscribe(subscriber)
+
+    response = Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Streams stay open for as long as the client is connected
+    response.timeout = None
+    return response
+
+@bp.route('/<symbol>', methods=['GET'])
+async def get_stock_price(symbol):
+    """
+    Get the current price of a stock, or a 404 Not Found.
+    """
+    try:
+        price = await StockService.get_stock_price(symbol.upper())
+        if price is not None:
+            return jsonify({"symbol": symbol.upper(), "price": price}), 200
+        else:
+            logger.warning(f"Stock symbol not found: {symbol.upper()}")
+            return jsonify({"error": "Stock not found"}), 404
+    except Exception as e:
+        logger.error(f"Error fetching stock price for symbol {symbol.upper()}: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
+
+@bp.route('/<symbol>/history', methods=['GET'])
+async def get_price_history(symbol):
+    """
+    Get the OHLC price history of a stock.
+
+    Accepts an 'interval' query parameter ('1m', '1h' or '1d', default '1h'),
+    an optional 'limit', and optional ISO 8601 'from' and 'to' bounds.
+    """
+    try:
+        interval = request.args.get('interval', '1h')
+        if interval not in CANDLE_COLLECTIONS:
+            return jsonify({"error": f"Invalid interval, expected one of {', '.join(CANDLE_COLLECTIONS)}"}), 400
+
+        limit = min(max(request.args.get('limit', DEFAULT_HISTORY_LIMIT, type=int), 1), MAX_HISTORY_LIMIT)
+        try:
+            start = datetime.fromisoformat(request.args['from']) if 'from' in request.args else None
+            end = datetime.fromisoformat(request.args['to']) if 'to' in request.args else None
+        except ValueError:
+            return jsonify({"error": "Invalid 'from' or 'to' timestamp"}), 400
+
+        candles = await StockService.get_price_history(symbol.upper(), interval, limit, start, end)
+        return jsonify({"symbol": symbol.upper(), "interval": interval, "candles": candles}), 200
+    except Exception as e:
+        logger.error(f"Error fetching price history for symbol {symbol.upper()}: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
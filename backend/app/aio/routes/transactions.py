@@ -0,0 +1,99 @@
+from quart import Blueprint, Response, request, jsonify
+from app.aio.services.transaction_service import TransactionService
+from app.services.trade_queue_service import TradeQueueService
+from app.routes.transactions import DEFAULT_LIMIT, MAX_LIMIT
+from .auth import token_required
+import asyncio
+import json
+import logging
+
+# Initialize the logger
+logger = logging.getLogger(__name__)
+
+# Create a Blueprint for transaction-related routes; '/queue/<order_id>' is served by the sync app
+bp = Blueprint('transactions', __name__, url_prefix='/transactions')
+
+async def queue_trade(user_id, trade_type, data):
+    """
+    Enqueue a trade for the write-behind workers instead of executing it.
+    Returns 202 with the order ID, or 400 if the trade is invalid.
+    """
+    # Enqueueing may be a blocking Redis call
+    result = await asyncio.to_thread(TradeQueueService.submit, user_id, trade_type, data or {})
+    if 'error' in result:
+        logger.warning(f"Rejected queued {trade_type} for user_id {user_id}: {result['error']}")
+        return jsonify(result), 400
+    return jsonify(result), 202
+
+@bp.route('/buy', methods=['POST'])
+@token_required
+async def buy_stock(user_id):
+    """
+    Process a stock purchase.
+    """
+    try:
+        data = await request.get_json()
+        if TradeQueueService.enabled():
+            return await queue_trade(user_id, 'buy', data)
+        data['user_id'] = user_id
+        result = await TransactionService.buy_stock(data)
+        return jsonify(result), 200
+    except Exception as e:
+        logger.error(f"Error processing stock purchase for user_id {user_id}: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
+
+@bp.route('/sell', methods=['POST'])
+@token_required
+async def sell_stock(user_id):
+    """
+    Process a stock sale.
+    """
+    try:
+        data = await request.get_json()
+        if TradeQueueService.enabled():
+            return await queue_trade(user_id, 'sell', data)
+        data['user_id'] = user_id
+        result = await TransactionService.sell_stock(data)
+        return jsonify(result), 200
+    except Exception as e:
+        logger.error(f"Error processing stock sale for user_id {user_id}: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
+
+@bp.route('/', methods=['GET'])
+@token_required
+async def get_transactions(user_id):
+    """
+    Fetch a page of transactions for the authenticated user, newest first.
+
+    Accepts optional 'limit', 'before', 'symbol' and 'type' query parameters.
+    The JSON list is streamed as it is read from the database.
+    """
+    try:
+        limit = min(max(request.args.get('limit', DEFAULT_LIMIT, type=int), 1), MAX_LIMIT)
+        transaction_type = request.args.get('type')
+        if transaction_type not in (None, 'buy', 'sell'):
+            return jsonify({"error": "Invalid transaction type"}), 400
+
+        transactions = await TransactionService.get_transactions(
+            user_id,
+            limit=limit,
+            before=request.args.get('before'),
+            stock_symbol=request.args.get('symbol'),
+            transaction_type=transaction_type
+        )
+
+        async def generate():
+            yield b'['
+            index = 0
+            async for transaction in transactions:
+                yield ((',' if index else '') + json.dumps(transaction)).encode()
+                index += 1
+            yield b']'
+
+        return Response(generate(), status=200, mimetype='application/json')
+    except ValueError as e:
+        logger.warning(f"Invalid transactions cursor for user_id {user_id}: {e}")
+        return jsonify({"error": "Invalid cursor"}), 400
+    except Exception as e:
+        logger.error(f"Error fetching transactions for user_id {user_id}: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
@@ -0,0 +1,32 @@
+from app.aio import mongo
+from pymongo import ASCENDING, DESCENDING
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LeaderboardService:
+    """
+    Async counterpart of app.services.leaderboard_service.LeaderboardService.
+
+    Refreshes stay with the sync service, which runs them off the request path.
+    """
+
+    @staticmethod
+    async def get_leaderboard(limit=100, offset=0):
+        """
+        Fetch a page of the materialized leaderboard.
+
+        Returns:
+            list: A list of dictionaries containing the leaderboard data.
+        """
+        try:
+            logger.info(f"Fetching leaderboard page with limit {limit} and offset {offset}.")
+            entries_cursor = mongo.reads.leaderboard.find(
+                {},
+                {"_id": 0, "user_id": 0, "updated_at": 0}
+            ).sort([("netWorth", DESCENDING), ("username", ASCENDING)]).skip(offset).limit(limit)
+
+            return [{**entry, "rank": offset + index + 1} for index, entry in enumerate(await entries_cursor.to_list(length=None))]
+        except Exception as e:
+            logger.error(f"Error fetching leaderboard: {e}")
+            return []
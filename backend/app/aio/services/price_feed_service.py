@@ -0,0 +1,38 @@
+from app.services.price_feed_service import PriceFeedSubscriber
+import asyncio
+
+
+class AsyncPriceFeedSubscriber(PriceFeedSubscriber):
+    """
+    A price feed client served by the event loop instead of a thread.
+
+    Register it with PriceFeedService.subscribe; the watcher thread wakes the
+    loop when it publishes changes.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+
+    def publish(self, changes):
+        with self._lock:
+            self._pending.update(changes)
+        self._loop.call_soon_threadsafe(self._event.set)
+
+    async def wait(self, timeout):
+        """
+        Wait for pending changes.
+
+        Returns:
+            list: The changed stocks, or an empty list if the timeout expired.
+        """
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        with self._lock:
+            changes = list(self._pending.values())
+            self._pending.clear()
+            self._event.clear()
+        return changes
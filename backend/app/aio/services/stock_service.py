@@ -0,0 +1,142 @@
+from app.aio import mongo
+from app.services.stock_service import (
+    StockService as SyncStockService, CANDLE_COLLECTIONS, CANDLE_PROJECTION, IMPACT_PROJECTION
+)
+from pymongo import ReturnDocument
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class StockService:
+    """
+    Async counterpart of app.services.stock_service.StockService.
+
+    Uses the quote cache of the process, shared with the sync service; misses
+    are loaded from the database, without going through the shared Redis tier.
+    """
+
+    @staticmethod
+    async def _load_all_stocks():
+        return [{**stock, '_id': str(stock['_id'])} async for stock in mongo.db.stocks.find()]
+
+    @staticmethod
+    async def _load_prices(symbols):
+        stocks_cursor = mongo.db.stocks.find(
+            {"symbol": {"$in": symbols}},
+            {"_id": 0, "symbol": 1, "price": 1}
+        )
+        return {stock['symbol']: stock['price'] async for stock in stocks_cursor}
+
+    @staticmethod
+    async def get_all_stocks():
+        """
+        Fetch all stocks, through the quote cache.
+
+        Returns:
+            list: A list of all stocks in the database.
+        """
+        try:
+            cache = SyncStockService.get_quote_cache()
+            if not cache:
+                return await StockService._load_all_stocks()
+            stocks, generation = cache.lookup_snapshot()
+            if stocks is None:
+                stocks = await StockService._load_all_stocks()
+                cache.store_snapshot(stocks, generation)
+            return stocks
+        except Exception as e:
+            logger.error(f"Error fetching all stocks: {e}")
+            raise e
+
+    @staticmethod
+    async def get_stock_price(stock_symbol):
+        """
+        Fetch the current price of a stock by its symbol.
+
+        Returns:
+            float: The current price of the stock if found, otherwise None.
+        """
+        try:
+            return (await StockService.get_prices([stock_symbol])).get(stock_symbol)
+        except Exception as e:
+            logger.error(f"Error fetching stock price for {stock_symbol}: {e}")
+            raise e
+
+    @staticmethod
+    async def get_prices(stock_symbols):
+        """
+        Fetch the current prices of several stocks, through the quote cache.
+
+        Returns:
+            dict: A mapping of symbol to current price. Symbols that are not found are omitted.
+        """
+        try:
+            symbols = list(set(stock_symbols))
+            if not symbols:
+                return {}
+            cache = SyncStockService.get_quote_cache()
+            if not cache:
+                return await StockService._load_prices(symbols)
+            prices, missing, generation = cache.lookup_prices(symbols)
+            if missing:
+                loaded = await StockService._load_prices(missing)
+                cache.store_prices(loaded, generation)
+                prices.update(loaded)
+            return prices
+        except Exception as e:
+            logger.error(f"Error fetching stock prices for {stock_symbols}: {e}")
+            raise e
+
+    @staticmethod
+    async def get_price_history(stock_symbol, interval, limit, start=None, end=None):
+        """
+        Fetch OHLC candles of a stock at the given resolution.
+
+        Returns:
+            list: The candles in chronological order.
+        """
+        try:
+            candles_cursor = mongo.db[CANDLE_COLLECTIONS[interval]].find(
+                SyncStockService.price_history_query(stock_symbol, start, end),
+                CANDLE_PROJECTION
+            ).sort("start", -1).limit(limit)
+
+            candles = [{**candle, "start": candle["start"].isoformat()} async for candle in candles_cursor]
+            candles.reverse()
+            return candles
+        except Exception as e:
+            logger.error(f"Error fetching {interval} price history for {stock_symbol}: {e}")
+            raise e
+
+    @staticmethod
+    async def get_trade_price(stock_symbol):
+        """
+        Fetch the price a trade executes at, from the primary rather than the quote cache.
+        """
+        stock = await mongo.trades.stocks.find_one({"symbol": stock_symbol}, {"_id": 0, "price": 1})
+        return stock['price'] if stock else None
+
+    @staticmethod
+    async def apply_price_impact(stock_symbol, quantity, is_buying):
+        """
+        Atomically move the price of a stock by the impact of a trade.
+
+        Returns:
+            float: The price of the stock before the impact, or None if the stock was not found.
+        """
+        price_change, pipeline = SyncStockService.price_impact_update(quantity, is_buying)
+        stock = await mongo.trades.stocks.find_one_and_update(
+            {"symbol": stock_symbol},
+            pipeline,
+            projection=IMPACT_PROJECTION,
+            return_document=ReturnDocument.BEFORE
+        )
+        if not stock:
+            return None
+
+        # Publishing to the shared tier is a blocking Redis call, so it runs in a thread
+        cache = SyncStockService.get_quote_cache()
+        if cache:
+            await asyncio.to_thread(cache.put_quotes, {stock_symbol: SyncStockService.impacted_quote(stock, price_change)})
+        return stock['price']
@@ -0,0 +1,38 @@
+from app.aio import mongo
+from app.services.title_service import TitleService as SyncTitleService, TITLES_CACHE_TTL
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TitleService:
+    """
+    Async counterpart of app.services.title_service.TitleService, sharing its in-process titles map.
+    """
+
+    @staticmethod
+    async def get_titles():
+        """
+        Fetch all titles as a mapping of level to title name, cached for TITLES_CACHE_TTL seconds.
+        """
+        if SyncTitleService._titles is None or time.monotonic() - SyncTitleService._loaded_at > TITLES_CACHE_TTL:
+            try:
+                SyncTitleService._titles = {
+                    title['level']: title['title']
+                    async for title in mongo.db.titles.find({}, {"_id": 0, "level": 1, "title": 1})
+                }
+                SyncTitleService._loaded_at = time.monotonic()
+            except Exception as e:
+                logger.error(f"Error fetching titles: {e}")
+                raise e
+        return SyncTitleService._titles
+
+    @staticmethod
+    async def resolve(title_level):
+        """
+        Resolve a title level to its level and name, or level -1 and "none" if the level has no title.
+        """
+        name = (await TitleService.get_titles()).get(title_level) if title_level != -1 else None
+        if name is None:
+            return {"level": -1, "name": "none"}
+        return {"level": title_level, "name": name}
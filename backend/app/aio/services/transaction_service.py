@@ -0,0 +1,158 @@
+from app.aio import mongo
+from app.services.leaderboard_service import LeaderboardService as SyncLeaderboardService
+from app.services.transaction_service import TransactionService as SyncTransactionService
+from common.holdings import (
+    MAX_UPDATE_ATTEMPTS, credit_updates, affordable_filter, debit_update, pull_empty_update, is_emptied
+)
+from .stock_service import StockService
+from pymongo import DESCENDING, ReturnDocument
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TransactionService:
+    """
+    Async counterpart of app.services.transaction_service.TransactionService,
+    with the same guarded single-document updates.
+    """
+
+    @staticmethod
+    async def _credit_holding(user_id, stock_symbol, quantity, total_price):
+        """
+        Atomically debit the user's balance and add shares to their portfolio, see common.holdings.credit_holding.
+
+        Returns:
+            dict: The updated user document, or None if the balance does not cover the price.
+        """
+        for _ in range(MAX_UPDATE_ATTEMPTS):
+            for query, update, options in credit_updates(user_id, stock_symbol, quantity, total_price):
+                user = await mongo.trades.users.find_one_and_update(
+                    query, update, projection={"_id": 1}, return_document=ReturnDocument.AFTER, **options
+                )
+                if user:
+                    return user
+
+            # Neither guard matched: give up unless a concurrent trade added or pulled the holding in between
+            if not await mongo.trades.users.find_one(affordable_filter(user_id, total_price), {"_id": 1}):
+                return None
+        return None
+
+    @staticmethod
+    async def _debit_holding(user_id, stock_symbol, quantity, total_price):
+        """
+        Atomically remove shares from the user's portfolio and credit their balance, see common.holdings.debit_holding.
+
+        Returns:
+            dict: The updated user document, or None if the holding does not cover the quantity.
+        """
+        query, update, options = debit_update(user_id, stock_symbol, quantity, total_price)
+        user = await mongo.trades.users.find_one_and_update(
+            query, update, projection={"portfolio": {"$elemMatch": {"stock_symbol": stock_symbol}}},
+            return_document=ReturnDocument.AFTER, **options
+        )
+        if user and is_emptied(user, stock_symbol):
+            await mongo.trades.users.update_one(*pull_empty_update(user_id, stock_symbol))
+            user['portfolio'] = [stock for stock in user['portfolio'] if stock['stock_symbol'] != stock_symbol]
+        return user
+
+    @staticmethod
+    async def buy_stock(data):
+        """
+        Buy a stock, see TransactionService.buy_stock of the sync service.
+
+        Returns:
+            dict: A success message if the purchase is successful, or an error message otherwise.
+        """
+        user_id, stock_symbol, quantity = SyncTransactionService.parse_trade(data)
+        if quantity is None:
+            logger.warning(f"Invalid quantity {data['quantity']} for purchase of {stock_symbol} by user {user_id}")
+            return {"message": "Invalid quantity"}
+
+        try:
+            logger.info(f"Attempting to buy stock {stock_symbol} for user {user_id} with quantity {quantity}")
+            # The user is guarded before the price moves, so a rejected trade never moves the price
+            price = await StockService.get_trade_price(stock_symbol)
+            if price is None:
+                logger.warning(f"Stock {stock_symbol} not found")
+                return {"message": "Stock not found"}
+
+            total_price = price * quantity
+            user = await TransactionService._credit_holding(user_id, stock_symbol, quantity, total_price)
+            if not user:
+                exists = await mongo.trades.users.find_one({"_id": user_id}, {"_id": 1})
+                logger.warning(f"User {user_id} has insufficient balance or user not found")
+                return {"message": "Insufficient balance" if exists else "User not found"}
+
+            await StockService.apply_price_impact(stock_symbol, quantity, is_buying=True)
+            await mongo.trades.transactions.insert_one(
+                SyncTransactionService.build_transaction(user_id, stock_symbol, quantity, price, "buy")
+            )
+
+            logger.info(f"Stock {stock_symbol} purchased successfully for user {user_id}")
+
+            SyncLeaderboardService.schedule_refresh(user_id)
+            return {"message": "Stock purchased successfully"}
+        except Exception as e:
+            logger.error(f"Error processing stock purchase for user {user_id}: {e}")
+            return {"message": "Internal Server Error"}
+
+    @staticmethod
+    async def sell_stock(data):
+        """
+        Sell a stock, see TransactionService.sell_stock of the sync service.
+
+        Returns:
+            dict: A success message if the sale is successful, or an error message otherwise.
+        """
+        user_id, stock_symbol, quantity = SyncTransactionService.parse_trade(data)
+        if quantity is None:
+            logger.warning(f"Invalid quantity {data['quantity']} for sale of {stock_symbol} by user {user_id}")
+            return {"message": "Invalid quantity"}
+
+        try:
+            logger.info(f"Attempting to sell stock {stock_symbol} for user {user_id} with quantity {quantity}")
+            price = await StockService.get_trade_price(stock_symbol)
+            if price is None:
+                logger.warning(f"Stock {stock_symbol} not found")
+                return {"message": "Stock not found"}
+
+            total_price = price * quantity
+            user = await TransactionService._debit_holding(user_id, stock_symbol, quantity, total_price)
+            if not user:
+                if not await mongo.trades.users.find_one({"_id": user_id}, {"_id": 1}):
+                    logger.warning(f"User {user_id} not found")
+                    return {"message": "User not found"}
+                logger.warning(f"User {user_id} has insufficient stock quantity of {stock_symbol} to sell")
+                return {"message": "Insufficient stock quantity"}
+
+            await StockService.apply_price_impact(stock_symbol, quantity, is_buying=False)
+            await mongo.trades.transactions.insert_one(
+                SyncTransactionService.build_transaction(user_id, stock_symbol, quantity, price, "sell")
+            )
+
+            logger.info(f"Stock {stock_symbol} sold successfully for user {user_id}")
+
+            SyncLeaderboardService.schedule_refresh(user_id)
+            return {"message": "Stock sold successfully"}
+        except Exception as e:
+            logger.error(f"Error processing stock sale for user {user_id}: {e}")
+            return {"message": "Internal Server Error"}
+
+    @staticmethod
+    async def get_transactions(user_id=None, limit=None, before=None, stock_symbol=None, transaction_type=None):
+        """
+        Fetch transactions, newest first, paged by a keyset cursor on (date, _id).
+
+        Raises:
+            ValueError: If the 'before' cursor is malformed.
+
+        Returns:
+            async generator: The serialized transactions, lazily read from the cursor.
+        """
+        logger.info(f"Fetching transactions for user {user_id}" if user_id else "Fetching all transactions")
+        query = SyncTransactionService.transactions_query(user_id, before, stock_symbol, transaction_type)
+        transactions = mongo.db.transactions.find(query).sort([("date", DESCENDING), ("_id", DESCENDING)])
+        if limit:
+            transactions = transactions.limit(limit)
+
+        return (SyncTransactionService.serialize_transaction(transaction) async for transaction in transactions)
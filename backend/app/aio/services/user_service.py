@@ -0,0 +1,194 @@
+from app.aio import mongo
+from app.services.user_service import UserService as SyncUserService, NET_WORTH_COLLECTIONS
+from .stock_service import StockService
+from .title_service import TitleService
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from werkzeug.security import generate_password_hash, check_password_hash
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class UserService:
+    """
+    Async counterpart of app.services.user_service.UserService.
+
+    Password hashing is CPU-bound, so it runs in a thread instead of blocking the event loop.
+    """
+
+    @staticmethod
+    async def register_user(data):
+        """
+        Register a new user with a balance of 10000 and an empty portfolio.
+
+        Returns:
+            dict: A message telling whether the user was registered.
+        """
+        if await mongo.db.users.find_one({"username": data['username']}, {"_id": 1}):
+            logger.info(f"Duplicate user not registered: {data['username']}")
+            return {"message": "Duplicate user not registered"}
+
+        user = SyncUserService.new_user(data['username'], await asyncio.to_thread(generate_password_hash, data['password']))
+        try:
+            logger.info(f"Registering new user: {data['username']}")
+            await mongo.db.users.insert_one(user)
+            logger.info(f"User {data['username']} registered successfully")
+            return {"message": "User registered successfully"}
+        except DuplicateKeyError:
+            # A concurrent registration won the unique index on username
+            logger.info(f"Duplicate user not registered: {data['username']}")
+            return {"message": "Duplicate user not registered"}
+        except Exception as e:
+            logger.error(f"Error registering user {data['username']}: {e}")
+            return {"message": "Error registering user"}
+
+    @staticmethod
+    async def get_user_id(username):
+        """
+        Fetch the user ID by username, or None if not found.
+        """
+        try:
+            logger.info(f"Fetching user ID for username: {username}")
+            user = await mongo.db.users.find_one({"username": username}, {"_id": 1})
+            if user:
+                return user['_id']
+            logger.warning(f"User ID not found for username: {username}")
+            return None
+        except Exception as e:
+            logger.error(f"Error fetching user ID for username {username}: {e}")
+            return None
+
+    @staticmethod
+    async def verify_credentials(data):
+        """
+        Verify user credentials.
+
+        Returns:
+            dict: The user document with the isAdmin field if the credentials are correct, otherwise None.
+        """
+        try:
+            logger.info(f"Verifying credentials for username: {data['username']}")
+            user = await mongo.db.users.find_one({"username": data['username']})
+            if user and await asyncio.to_thread(check_password_hash, user['password'], data['password']):
+                logger.info(f"Credentials verified for user: {data['username']}")
+                user['isAdmin'] = user.get('isAdmin', False)
+                return user
+            logger.warning(f"Invalid credentials for username: {data['username']}")
+            return None
+        except Exception as e:
+            logger.error(f"Error verifying credentials for username {data['username']}: {e}")
+            return None
+
+    @staticmethod
+    async def get_portfolio(user_id):
+        """
+        Fetch the user's priced portfolio, or an empty list if the user is not found.
+        """
+        try:
+            logger.info(f"Fetching portfolio for user ID: {user_id}")
+            user = await mongo.db.users.find_one({"_id": ObjectId(user_id)}, {"portfolio": 1})
+            if user and 'portfolio' in user:
+                portfolio = user['portfolio']
+                prices = await StockService.get_prices(stock['stock_symbol'] for stock in portfolio)
+                for stock in portfolio:
+                    stock['price'] = prices.get(stock['stock_symbol'])
+                return portfolio
+            logger.warning(f"No portfolio found for user ID: {user_id}")
+            return []
+        except Exception as e:
+            logger.error(f"Error fetching portfolio for user ID {user_id}: {e}")
+            return []
+
+    @staticmethod
+    async def get_balance(user_id):
+        """
+        Fetch the user's balance, or an empty list if the user is not found.
+        """
+        try:
+            logger.info(f"Fetching balance for user ID: {user_id}")
+            user = await mongo.db.users.find_one({"_id": ObjectId(user_id)}, {"balance": 1})
+            if user and 'balance' in user:
+                return user['balance']
+            logger.warning(f"No balance found for user ID: {user_id}")
+            return []
+        except Exception as e:
+            logger.error(f"Error fetching balance for user ID {user_id}: {e}")
+            return []
+
+    @staticmethod
+    async def get_title(user_id):
+        """
+        Fetch the user's title level and name, or level -1 and "none" if the user has no title.
+        """
+        try:
+            logger.info(f"Fetching title for user ID: {user_id}")
+            user = await mongo.db.users.find_one({"_id": ObjectId(user_id)}, {"title_level": 1})
+            if not user or 'title_level' not in user:
+                logger.warning(f"No title found for user ID: {user_id}")
+                return {"level": -1, "name": "none"}
+            return await TitleService.resolve(user['title_level'])
+        except Exception as e:
+            logger.error(f"Error fetching title for user ID {user_id}: {e}")
+            return {"level": -1, "name": "none"}
+
+    @staticmethod
+    async def get_assets_value(user_id):
+        """
+        Fetch the total value of the user's holdings, or 0 if the user is not found.
+        """
+        try:
+            logger.info(f"Fetching assets value for user ID: {user_id}")
+            assets_value = 0
+            user = await mongo.db.users.find_one({"_id": ObjectId(user_id)}, {"portfolio": 1})
+            if user and 'portfolio' in user:
+                prices = await StockService.get_prices(stock['stock_symbol'] for stock in user['portfolio'])
+                assets_value = SyncUserService.build_summary(user, prices, None)['assets_value']
+            else:
+                logger.warning(f"No portfolio found for user ID: {user_id}")
+            return assets_value
+        except Exception as e:
+            logger.error(f"Error fetching assets value for user ID {user_id}: {e}")
+            return 0
+
+    @staticmethod
+    async def get_portfolio_summary(user_id):
+        """
+        Fetch the balance, title, priced holdings, assets value and net worth
+        in one pass, or None if the user is not found.
+        """
+        try:
+            logger.info(f"Fetching portfolio summary for user ID: {user_id}")
+            user = await mongo.db.users.find_one(
+                {"_id": ObjectId(user_id)},
+                {"_id": 0, "balance": 1, "portfolio": 1, "title_level": 1}
+            )
+            if not user:
+                logger.warning(f"User not found by ID: {user_id}")
+                return None
+
+            prices = await StockService.get_prices(stock['stock_symbol'] for stock in user.get('portfolio', []))
+            return SyncUserService.build_summary(user, prices, await TitleService.resolve(user.get('title_level', -1)))
+        except Exception as e:
+            logger.error(f"Error fetching portfolio summary for user ID {user_id}: {e}")
+            raise e
+
+    @staticmethod
+    async def get_net_worth_history(user_id, interval, limit, start=None, end=None):
+        """
+        Fetch the net worth history of a user at the given resolution.
+
+        Returns:
+            list: The points in chronological order.
+        """
+        try:
+            points_cursor = mongo.reads[NET_WORTH_COLLECTIONS[interval]].aggregate(
+                SyncUserService.net_worth_history_pipeline(user_id, interval, limit, start, end)
+            )
+
+            points = [{**point, "time": point["time"].isoformat()} async for point in points_cursor]
+            points.reverse()
+            return points
+        except Exception as e:
+            logger.error(f"Error fetching {interval} net worth history for user ID {user_id}: {e}")
+            raise e
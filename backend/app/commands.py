@@ -0,0 +1,26 @@
+import json
+import click
+from .services.index_service import IndexService
+from .services.news_service import NewsService
+
+def register_commands(app):
+    """
+    Register the maintenance commands available through the 'flask' CLI.
+    """
+    @app.cli.command('ensure-indexes')
+    def ensure_indexes():
+        """Create every declared index that does not exist yet."""
+        errors = IndexService.ensure_indexes()
+        for collection, error in errors.items():
+            click.echo(f"{collection}: {error}", err=True)
+        click.echo("Indexes ensured." if not errors else "Some indexes could not be created.")
+
+    @app.cli.command('index-report')
+    def index_report():
+        """List missing, undeclared and unused indexes."""
+        click.echo(json.dumps(IndexService.get_index_report(), indent=2))
+
+    @app.cli.command('normalize-news-timestamps')
+    def normalize_news_timestamps():
+        """Convert string timestamps of news articles into dates."""
+        click.echo(f"Converted {NewsService.normalize_timestamps()} news articles.")
@@ -1,46 +1,51 @@
 import os
-import logging.config
 from dotenv import load_dotenv
+from common.logging_config import configure_logging
 
 # Load environment variables from .env file
 load_dotenv()
 
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 
-logging_config = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'formatters': {
-        'standard': {
-            'format': '[%(asctime)s] %(levelname)s in %(module)s: %(message)s',
-        },
-    },
-    'handlers': {
-        'console': {
-            'level': LOG_LEVEL,
-            'class': 'logging.StreamHandler',
-            'formatter': 'standard',
-        }
-        # ,
-        # 'file': {
-        #     'level': LOG_LEVEL,
-        #     'class': 'logging.FileHandler',
-        #     'filename': 'logs/app.log',
-        #     'formatter': 'standard',
-        # },
-    },
-    'loggers': {
-        '': {  # root logger
-            'handlers': ['console'],
-            'level': LOG_LEVEL,
-            'propagate': True,
-        },
-    },
-}
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+LOG_RATE_LIMIT = float(os.getenv('LOG_RATE_LIMIT', '20'))
+LOG_RATE_BURST = int(os.getenv('LOG_RATE_BURST', '50'))
 
-logging.config.dictConfig(logging_config)
+# Loggers on the request hot path, limited to LOG_RATE_LIMIT info records per second each
+HOT_PATH_LOGGERS = [
+    'app.routes.auth',
+    'app.routes.portfolio',
+    'app.routes.shop',
+    'app.routes.stocks',
+    'app.routes.transactions',
+    'app.services.leaderboard_service',
+    'app.services.stock_service',
+    'app.services.transaction_service',
+    'app.services.user_service',
+]
+
+configure_logging(
+    LOG_LEVEL,
+    json_output=LOG_FORMAT == 'json',
+    rate_limits={name: (LOG_RATE_LIMIT, LOG_RATE_BURST) for name in HOT_PATH_LOGGERS}
+)
 
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'default_secret_key')
     MONGO_URI = os.getenv('DATABASE_URI', 'mongodb://localhost:27017/')
+    # Used when DATABASE_URI names no database; pool size, timeouts and read routing are read by common/database.py
+    MONGO_DB = os.getenv('MONGO_DB', 'gourdstocks')
     CORS_ORIGINS = '*'#os.getenv('CORS_ORIGINS', '*')
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379/0')
+    # Trades are executed in the request unless queued ('local' or 'redis')
+    TRADE_QUEUE = os.getenv('TRADE_QUEUE', 'off')
+    TRADE_QUEUE_WORKERS = int(os.getenv('TRADE_QUEUE_WORKERS', '4'))
+    TRADE_QUEUE_BATCH_SIZE = int(os.getenv('TRADE_QUEUE_BATCH_SIZE', '100'))
+    # Quotes are cached in-process ('local'), also shared through Redis ('redis'), or not at all ('off')
+    QUOTE_CACHE = os.getenv('QUOTE_CACHE', 'local')
+    QUOTE_CACHE_TTL = float(os.getenv('QUOTE_CACHE_TTL', '5'))
+    # Requests profiled without being asked for by an admin, and seconds between profiler samples
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+    PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', '0.005'))
+    # Threads serving the routes the async app (asgi.py) hands over to the sync app
+    ASYNC_SYNC_THREADS = int(os.getenv('ASYNC_SYNC_THREADS', '16'))
@@ -0,0 +1,177 @@
+from flask import current_app, request
+from collections import OrderedDict
+import gzip
+import hashlib
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, gzip is always available
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+# Rendered bodies kept per process; the least recently used are evicted first
+MAX_CACHED_RESPONSES = 256
+
+# Encodings in order of preference, when the client accepts several equally
+COMPRESSORS = {"gzip": lambda body: gzip.compress(body, compresslevel=6)}
+if brotli is not None:
+    COMPRESSORS = {"br": lambda body: brotli.compress(body, quality=5), **COMPRESSORS}
+
+
+class CachedBody:
+    """
+    A rendered JSON body with its strong ETag and lazily built compressed variants.
+
+    Variants are compressed once and then served to every client accepting
+    them, until the body is replaced.
+    """
+
+    def __init__(self, data, dumps=None):
+        self.empty = not data
+        self.body = (dumps or current_app.json.dumps)(data).encode('utf-8')
+        self.etag = hashlib.sha1(self.body).hexdigest()
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    def variant(self, encoding):
+        with self._lock:
+            if encoding not in self._variants:
+                self._variants[encoding] = COMPRESSORS[encoding](self.body)
+            return self._variants[encoding]
+
+
+class ResponseCache:
+    """
+    Rendered responses of polled read-only routes, by key.
+
+    An entry is reused while its version is unchanged (when the route can
+    tell the data version cheaply) or until its TTL expires. At most
+    MAX_CACHED_RESPONSES entries are kept, and keys built from request
+    arguments should be limited to a fixed set (e.g. the first page).
+    """
+    _entries = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get(key, build, version=None, ttl=None, store=True):
+        """
+        Fetch the rendered body for key, building it if the entry is stale.
+
+        Args:
+            key (hashable): The cache key, usually the route and its query arguments.
+            build (callable): Returns the data to render.
+            version (optional): The current version of the data, compared by identity (e.g. the
+                cached list the data comes from); the entry is rebuilt when it changes.
+            ttl (float, optional): Seconds the entry is reused when no version is given.
+            store (bool): Whether the body is cached; when False it is rendered for this request only.
+
+        Returns:
+            CachedBody: The rendered body.
+        """
+        if not store:
+            return CachedBody(build())
+        cached = ResponseCache.lookup(key, version, ttl)
+        if cached is None:
+            cached = ResponseCache.put(key, CachedBody(build()), version, ttl)
+        return cached
+
+    @staticmethod
+    def lookup(key, version=None, ttl=None):
+        """
+        Fetch the rendered body for key if the entry is still fresh (see get).
+
+        Returns:
+            CachedBody: The rendered body, or None if the entry is missing or stale.
+        """
+        with ResponseCache._lock:
+            entry = ResponseCache._entries.get(key)
+            if entry is not None:
+                ResponseCache._entries.move_to_end(key)
+        if entry is not None:
+            cached_version, expires_at, cached = entry
+            if version is not None and cached_version is version:
+                return cached
+            if version is None and ttl is not None and expires_at > time.monotonic():
+                return cached
+        return None
+
+    @staticmethod
+    def put(key, cached, version=None, ttl=None):
+        """
+        Store a rendered body for key (see get), e.g. after building it asynchronously.
+
+        Returns:
+            CachedBody: The stored body.
+        """
+        with ResponseCache._lock:
+            ResponseCache._entries[key] = (version, time.monotonic() + (ttl or 0), cached)
+            ResponseCache._entries.move_to_end(key)
+            while len(ResponseCache._entries) > MAX_CACHED_RESPONSES:
+                ResponseCache._entries.popitem(last=False)
+        return cached
+
+    @staticmethod
+    def invalidate(prefix):
+        """
+        Drop every entry whose key tuple starts with prefix, e.g. after a write in this process.
+        """
+        with ResponseCache._lock:
+            for key in [key for key in ResponseCache._entries if key[0] == prefix]:
+                del ResponseCache._entries[key]
+
+
+def negotiate(cached, accept_encodings, if_none_match):
+    """
+    Pick the representation of the cached body for a request.
+
+    Args:
+        cached (CachedBody): The rendered body.
+        accept_encodings: The request's parsed Accept-Encoding header.
+        if_none_match: The request's parsed If-None-Match header.
+
+    Returns:
+        tuple: The body to send, or None if the client already has it (304), and the response headers.
+    """
+    encoding = None
+    if len(cached.body) >= MIN_COMPRESS_SIZE:
+        encoding = accept_encodings.best_match(list(COMPRESSORS))
+    # Each encoding is a distinct representation, so it gets its own strong ETag
+    etag = f"{cached.etag}-{encoding}" if encoding else cached.etag
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+
+    # Any representation of the same body is as good as the one that would be sent
+    if if_none_match.star_tag or any(
+        if_none_match.contains_weak(tag)
+        for tag in [cached.etag] + [f"{cached.etag}-{name}" for name in COMPRESSORS]
+    ):
+        return None, headers
+
+    if encoding:
+        headers['Content-Encoding'] = encoding
+        return cached.variant(encoding), headers
+    return cached.body, headers
+
+
+def conditional_response(cached, status=200):
+    """
+    Answer with the cached body, a 304 if the client already has it, or a
+    compressed variant if the client accepts one.
+
+    Args:
+        cached (CachedBody): The rendered body.
+        status (int): The status of a full response.
+
+    Returns:
+        flask.Response: The response.
+    """
+    body, headers = negotiate(cached, request.accept_encodings, request.if_none_match)
+    if body is None:
+        return current_app.response_class(status=304, headers=headers)
+    return current_app.response_class(body, status=status, mimetype='application/json', headers=headers)
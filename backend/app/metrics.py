@@ -0,0 +1,120 @@
+from flask import Response, g, request
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from pymongo import monitoring
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Latency of API requests until the response is returned.',
+    ['blueprint', 'route', 'method', 'status']
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'http_requests_in_flight',
+    'API requests currently being handled.',
+    ['blueprint', 'route']
+)
+MONGO_LATENCY = Histogram(
+    'mongodb_command_duration_seconds',
+    'Latency of MongoDB commands issued by the API.',
+    ['command', 'collection'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+MONGO_FAILURES = Counter(
+    'mongodb_command_failures_total',
+    'MongoDB commands issued by the API that failed.',
+    ['command', 'collection']
+)
+TRADE_QUEUE_DEPTH = Gauge(
+    'trade_queue_depth',
+    'Orders in the write-behind trade queue, waiting or being applied.',
+    ['state']
+)
+
+# Commands whose first field is not the name of a collection
+_COLLECTIONLESS_COMMANDS = {'ping', 'hello', 'isMaster', 'ismaster', 'endSessions', 'buildInfo', 'listCollections', 'saslStart', 'saslContinue'}
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    Record the latency of every MongoDB command of the client, by command and collection.
+    """
+
+    def __init__(self):
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if event.command_name in _COLLECTIONLESS_COMMANDS:
+            collection = ''
+        elif event.command_name == 'getMore':
+            collection = event.command.get('collection', '')
+        else:
+            collection = event.command.get(event.command_name, '')
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = collection if isinstance(collection, str) else ''
+
+    def _finish(self, event):
+        with self._lock:
+            return self._collections.pop((event.connection_id, event.request_id), '')
+
+    def succeeded(self, event):
+        MONGO_LATENCY.labels(event.command_name, self._finish(event)).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._finish(event)
+        MONGO_LATENCY.labels(event.command_name, collection).observe(event.duration_micros / 1e6)
+        MONGO_FAILURES.labels(event.command_name, collection).inc()
+
+
+def route_labels(request):
+    """
+    The blueprint and route labels of a Flask or Quart request.
+    """
+    rule = request.url_rule.rule if request.url_rule else 'unmatched'
+    return request.blueprint or '', rule
+
+
+def refresh_trade_queue_depth():
+    # Gauges read from other services are refreshed on each scrape
+    from .services.trade_queue_service import TradeQueueService
+    if TradeQueueService.enabled():
+        try:
+            depth = TradeQueueService.get_metrics()
+            TRADE_QUEUE_DEPTH.labels('queued').set(depth['queued'])
+            TRADE_QUEUE_DEPTH.labels('pending').set(depth['pending'])
+        except Exception as e:
+            logger.warning(f"Could not read the trade queue depth: {e}")
+
+
+def init_metrics(app):
+    """
+    Time every request and expose the metrics of this process at /metrics
+    (see app.aio.instrumentation for the async app, which shares them).
+    """
+    @app.before_request
+    def start_timer():
+        g.metrics_started_at = time.perf_counter()
+        g.metrics_labels = route_labels(request)
+        REQUESTS_IN_FLIGHT.labels(*g.metrics_labels).inc()
+
+    @app.after_request
+    def observe_latency(response):
+        if 'metrics_started_at' in g:
+            REQUEST_LATENCY.labels(*g.metrics_labels, request.method, response.status_code).observe(
+                time.perf_counter() - g.metrics_started_at
+            )
+        return response
+
+    @app.teardown_request
+    def finish_request(error=None):
+        if 'metrics_labels' in g:
+            REQUESTS_IN_FLIGHT.labels(*g.metrics_labels).dec()
+
+    @app.route('/metrics')
+    def metrics():
+        refresh_trade_queue_depth()
+        return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
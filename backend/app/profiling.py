@@ -0,0 +1,76 @@
+from flask import current_app, g, request
+from common.profiling import Profile
+import jwt
+import random
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Header or query parameter with which an admin asks for a profile of the request
+PROFILE_HEADER = 'X-Profile'
+PROFILE_PARAM = 'profile'
+
+
+def is_admin(request, secret_key):
+    """
+    Whether the Flask or Quart request carries the token of an admin.
+    """
+    token = request.headers.get('Authorization', '')
+    try:
+        return bool(jwt.decode(token.split()[1], secret_key, algorithms=["HS256"]).get('isAdmin'))
+    except (IndexError, jwt.InvalidTokenError):
+        return False
+
+
+def profile_requested(request, secret_key):
+    """
+    Whether an admin asked for a profile of the request.
+    """
+    flag = request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_PARAM)
+    return flag in ('1', 'true') and is_admin(request, secret_key)
+
+
+def start_request_profile(request, interval):
+    rule = request.url_rule.rule if request.url_rule else 'unmatched'
+    return Profile(f"{request.method} {rule}", interval).start()
+
+
+def profile_document(profile, request, status, requested):
+    """
+    Serialize a stopped request profile for ProfileService.save_profile.
+    """
+    return profile.to_document(kind='request', path=request.full_path, status=status, sampled=not requested)
+
+
+def init_profiling(app):
+    """
+    Profile requests on demand: those of admins sending the X-Profile header (or ?profile=1),
+    plus a PROFILE_SAMPLE_RATE share of all requests. The profile id is returned in the X-Profile-Id header.
+    """
+    sample_rate = app.config['PROFILE_SAMPLE_RATE']
+    interval = app.config['PROFILE_INTERVAL']
+
+    @app.before_request
+    def start_profile():
+        requested = profile_requested(request, current_app.config['SECRET_KEY'])
+        if requested or (sample_rate and random.random() < sample_rate):
+            g.profile = start_request_profile(request, interval)
+            g.profile_requested = requested
+
+    @app.after_request
+    def save_profile(response):
+        profile = g.pop('profile', None)
+        if profile is not None:
+            from .services.profile_service import ProfileService
+            profile.stop()
+            profile_id = ProfileService.save_profile(profile_document(profile, request, response.status_code, g.profile_requested))
+            if profile_id:
+                response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def discard_profile(error=None):
+        # The request failed before after_request ran
+        profile = g.pop('profile', None)
+        if profile is not None:
+            profile.stop()
@@ -9,6 +9,7 @@ from .leaderboard import bp as leaderboard_bp
 from .admin import bp as admin_bp
 from .news import bp as news_bp
 from .shop import bp as shop_bp
+from .orders import bp as orders_bp
 
 # Create a function to register all blueprints
 def register_routes(app):
@@ -20,4 +21,5 @@ def register_routes(app):
     app.register_blueprint(admin_bp)
     app.register_blueprint(news_bp)
     app.register_blueprint(shop_bp)
+    app.register_blueprint(orders_bp)
 
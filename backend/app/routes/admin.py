@@ -1,5 +1,11 @@
 from flask import Blueprint, request, jsonify
 from app.services.admin_service import AdminService
+from app.services.leaderboard_service import LeaderboardService
+from app.services.index_service import IndexService
+from app.services.order_service import OrderService
+from app.services.profile_service import ProfileService
+from app.services.trade_queue_service import TradeQueueService
+from app.routes.auth import admin_required
 import logging
 
 # Initialize logger
@@ -53,3 +59,108 @@ def update_stock_trend(symbol):
     except Exception as e:
         logger.error(f"Error updating stock trend direction for {symbol.upper()}: {e}")
         return jsonify({"error": "Internal Server Error"}), 500
+
+@bp.route('/leaderboard/refresh', methods=['POST'])
+@admin_required
+def refresh_leaderboard():
+    """
+    Rebuild the materialized leaderboard (admin only).
+
+    Returns the number of leaderboard entries written.
+    """
+    try:
+        logger.info("Admin request: Refreshing the leaderboard")
+        count = LeaderboardService.refresh_leaderboard()
+        return jsonify({"message": "Leaderboard refreshed successfully", "entries": count}), 200
+    except Exception as e:
+        logger.error(f"Error refreshing the leaderboard: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
+
+@bp.route('/indexes', methods=['GET'])
+@admin_required
+def get_index_report():
+    """
+    Report missing, undeclared and unused indexes (admin only).
+    """
+    try:
+        logger.info("Admin request: Fetching the index report")
+        return jsonify(IndexService.get_index_report()), 200
+    except Exception as e:
+        logger.error(f"Error fetching the index report: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
+
+@bp.route('/indexes/ensure', methods=['POST'])
+@admin_required
+def ensure_indexes():
+    """
+    Create every declared index that does not exist yet (admin only).
+    """
+    try:
+        logger.info("Admin request: Ensuring indexes")
+        errors = IndexService.ensure_indexes()
+        if errors:
+            return jsonify({"error": "Some indexes could not be created", "details": errors}), 500
+        return jsonify({"message": "Indexes ensured successfully"}), 200
+    except Exception as e:
+        logger.error(f"Error ensuring indexes: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
+
+@bp.route('/orders/match', methods=['POST'])
+@admin_required
+def match_orders():
+    """
+    Run one order matching batch immediately (admin only).
+    """
+    try:
+        logger.info("Admin request: Matching open orders")
+        return jsonify(OrderService.match_orders()), 200
+    except Exception as e:
+        logger.error(f"Error matching orders: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
+
+@bp.route('/trade-queue', methods=['GET'])
+@admin_required
+def get_trade_queue_metrics():
+    """
+    Report the depth of the write-behind trade queue and this process's worker counters (admin only).
+    """
+    try:
+        return jsonify(TradeQueueService.get_metrics()), 200
+    except Exception as e:
+        logger.error(f"Error fetching trade queue metrics: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
+
+@bp.route('/profiles', methods=['GET'])
+@admin_required
+def list_profiles():
+    """
+    List the most recent request and task profiles without their call trees (admin only).
+
+    Optional query parameters: 'name' (e.g. 'GET /leaderboard' or 'tasks.update_stock_prices') and 'limit'.
+    """
+    try:
+        limit = min(int(request.args.get('limit', 50)), 500)
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    try:
+        return jsonify(ProfileService.list_profiles(limit, request.args.get('name'))), 200
+    except Exception as e:
+        logger.error(f"Error listing profiles: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
+
+@bp.route('/profiles/<profile_id>', methods=['GET'])
+@admin_required
+def download_profile(profile_id):
+    """
+    Download a profile with its call tree as a JSON file (admin only).
+    """
+    try:
+        profile = ProfileService.get_profile(profile_id)
+        if not profile:
+            return jsonify({"error": "Profile not found"}), 404
+        response = jsonify(profile)
+        response.headers['Content-Disposition'] = f'attachment; filename=profile-{profile_id}.json'
+        return response, 200
+    except Exception as e:
+        logger.error(f"Error fetching profile {profile_id}: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify, current_app
 from app.services.user_service import UserService
+from app.profiling import is_admin
 import jwt
 import datetime
 from functools import wraps
@@ -9,34 +10,66 @@ import logging
 bp = Blueprint('auth', __name__, url_prefix='/auth')
 logger = logging.getLogger(__name__)
 
+def decode_token(authorization, secret_key):
+    """
+    Decode the user ID from a 'Bearer <token>' Authorization header (shared with the async app).
+
+    Returns:
+        tuple: The user ID and None, or None and the message to answer with a 403.
+    """
+    if not authorization:
+        logger.warning("Token is missing from the request.")
+        return None, 'Token is missing!'
+
+    try:
+        token = authorization.split()[1]
+        data = jwt.decode(token, secret_key, algorithms=["HS256"])
+        logger.info(f"Token successfully decoded for user_id: {data['user_id']}")
+        return data['user_id'], None
+    except jwt.ExpiredSignatureError:
+        logger.warning("Token has expired.")
+        return None, 'Token has expired!'
+    except jwt.InvalidTokenError:
+        logger.warning("Invalid token provided.")
+        return None, 'Token is invalid!'
+    except Exception as e:
+        logger.error(f"Token verification failed: {e}")
+        return None, 'Token verification failed!'
+
+def issue_token(user, secret_key):
+    """
+    Issue the 24 hour JWT token of a verified user.
+    """
+    return jwt.encode({
+        'user_id': str(user['_id']),
+        'isAdmin': user['isAdmin'],  # Include isAdmin in the token
+        'exp': datetime.datetime.now() + datetime.timedelta(hours=24)
+    }, secret_key, algorithm="HS256")
+
 # Decorator to ensure a valid JWT token is present in the request header
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
-            logger.warning("Token is missing from the request.")
-            return jsonify({'message': 'Token is missing!'}), 403
-
-        try:
-            token = token.split()[1]
-            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
-            user_id = data['user_id']
-            logger.info(f"Token successfully decoded for user_id: {user_id}")
-        except jwt.ExpiredSignatureError:
-            logger.warning("Token has expired.")
-            return jsonify({'message': 'Token has expired!'}), 403
-        except jwt.InvalidTokenError:
-            logger.warning("Invalid token provided.")
-            return jsonify({'message': 'Token is invalid!'}), 403
-        except Exception as e:
-            logger.error(f"Token verification failed: {e}")
-            return jsonify({'message': 'Token verification failed!'}), 403
+        user_id, error = decode_token(request.headers.get('Authorization'), current_app.config['SECRET_KEY'])
+        if error:
+            return jsonify({'message': error}), 403
 
         return f(user_id, *args, **kwargs)
 
     return decorated
 
+# Decorator to restrict a route to the holders of an admin token
+def admin_required(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not is_admin(request, current_app.config['SECRET_KEY']):
+            logger.warning(f"Non-admin request to {request.path} refused.")
+            return jsonify({'message': 'Admin access required!'}), 403
+
+        return f(*args, **kwargs)
+
+    return decorated
+
 # Route to verify user credentials and issue a JWT token
 @bp.route('/verify_credentials', methods=['POST'])
 def verify_credentials():
@@ -45,11 +78,7 @@ def verify_credentials():
     
     user = UserService.verify_credentials(data)
     if user:
-        token = jwt.encode({
-            'user_id': str(user['_id']),
-            'isAdmin': user['isAdmin'],  # Include isAdmin in the token
-            'exp': datetime.datetime.now() + datetime.timedelta(hours=24)
-        }, current_app.config['SECRET_KEY'], algorithm="HS256")
+        token = issue_token(user, current_app.config['SECRET_KEY'])
         
         logger.info(f"Credentials verified for user_id: {user['_id']}. Token generated.")
         return jsonify({"message": "Credentials verified", "token": token, "isAdmin": user['isAdmin']}), 200
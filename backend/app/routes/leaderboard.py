@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request, make_response
 from app.services.leaderboard_service import LeaderboardService
+from app.http_cache import ResponseCache, conditional_response
 from flask_cors import CORS
 import logging
 
@@ -12,24 +13,35 @@ bp = Blueprint('leaderboard', __name__, url_prefix='/leaderboard')
 # Apply CORS
 CORS(bp, supports_credentials=True)
 
+# Bounds for the page size of the leaderboard
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+# Seconds a rendered leaderboard page is reused by this process
+LEADERBOARD_CACHE_TTL = 2
+
 @bp.route('', methods=['GET', 'OPTIONS'])
 def get_leaderboard():
     """
-    Fetch the current leaderboard.
-    
-    Returns a JSON object with the leaderboard data.
+    Fetch a page of the current leaderboard.
+
+    Accepts optional 'limit' and 'offset' query parameters.
+    Returns a JSON list with the leaderboard data, ranked by net worth, with an ETag.
     """
     try:
+        limit = min(max(request.args.get('limit', DEFAULT_LIMIT, type=int), 1), MAX_LIMIT)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+
         logger.info("Fetching the current leaderboard")
-        # Retrieve the leaderboard from the service
-        leaderboard = LeaderboardService.get_leaderboard()
-        
-        if not leaderboard:
-            logger.warning("Leaderboard data is empty")
-        else:
-            logger.info("Successfully fetched the leaderboard")
-        
-        return jsonify(leaderboard)
+        # Retrieve the leaderboard page from the service, at most once per LEADERBOARD_CACHE_TTL
+        cached = ResponseCache.get(
+            ("leaderboard", limit, offset),
+            lambda: LeaderboardService.get_leaderboard(limit=limit, offset=offset),
+            ttl=LEADERBOARD_CACHE_TTL,
+            # Only the first pages are polled; deeper offsets would grow the cache without bound
+            store=offset == 0
+        )
+        return conditional_response(cached)
     except Exception as e:
         logger.error(f"Error fetching the leaderboard: {e}")
         return jsonify({'error': str(e)}), 500
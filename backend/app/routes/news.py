@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request
 from app.services.news_service import NewsService
+from app.http_cache import ResponseCache, conditional_response
 from flask_cors import CORS
 import logging
 
@@ -12,18 +13,45 @@ bp = Blueprint('news', __name__, url_prefix='/news')
 # Apply CORS
 CORS(bp, supports_credentials=True)
 
+# Seconds the rendered news list is reused by this process
+NEWS_CACHE_TTL = 10
+
+# Bounds for the page size of the news list
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
 @bp.route('/', methods=['GET'])
 def get_all_news():
     """
-    Fetch all news articles.
-    
-    Returns a list of all news articles in the database.
+    Fetch a page of news summaries, newest first.
+
+    Accepts optional 'limit', 'before' (the 'cursor' of the last article of the
+    previous page) and 'featured' ('true' or 'false') query parameters.
+    Listed articles carry a short 'summary' instead of their content; use
+    GET /news/<id> for the full article. Returns the list with an ETag.
     """
     try:
-        logger.info("Fetching all news articles from the database")
-        news_articles = NewsService.get_all_news()
-        logger.info(f"Successfully fetched {len(news_articles)} news articles")
-        return jsonify(news_articles), 200
+        limit = min(max(request.args.get('limit', DEFAULT_LIMIT, type=int), 1), MAX_LIMIT)
+        before = request.args.get('before')
+        featured = request.args.get('featured')
+        if featured not in (None, 'true', 'false'):
+            return jsonify({"error": "Invalid featured filter"}), 400
+        if before:
+            try:
+                NewsService.decode_cursor(before)
+            except ValueError as e:
+                logger.warning(f"Invalid news cursor: {e}")
+                return jsonify({"error": "Invalid cursor"}), 400
+
+        logger.info("Fetching news articles")
+        cached = ResponseCache.get(
+            ("news", limit, before, featured),
+            lambda: NewsService.get_all_news(limit=limit, before=before, featured=None if featured is None else featured == 'true'),
+            ttl=NEWS_CACHE_TTL,
+            # Only the first page is polled; caching every cursor would grow the cache without bound
+            store=before is None
+        )
+        return conditional_response(cached)
     except Exception as e:
         logger.error(f"Error fetching news: {e}")
         return jsonify({"error": "Internal Server Error"}), 500
@@ -69,9 +97,15 @@ def add_news_article():
         if not title or not content or not author:
             logger.warning("Missing required fields for adding news article")
             return jsonify({"error": "Missing required fields"}), 400
+        try:
+            timestamp = NewsService.parse_timestamp(timestamp)
+        except ValueError as e:
+            logger.warning(f"Invalid timestamp for news article: {e}")
+            return jsonify({"error": "Invalid timestamp"}), 400
 
         logger.info(f"Adding new news article: {title}")
         new_article = NewsService.add_news_article(title, content, author, is_featured, thumbnail, timestamp)
+        ResponseCache.invalidate("news")
         return jsonify(new_article), 201
     except Exception as e:
         logger.error(f"Error adding news article: {e}")
@@ -0,0 +1,68 @@
+from flask import Blueprint, request, jsonify
+from bson import ObjectId
+from app.services.order_service import OrderService
+from .transactions import token_required
+from flask_cors import CORS
+import logging
+
+# Initialize the logger
+logger = logging.getLogger(__name__)
+
+# Create a Blueprint for order-related routes
+bp = Blueprint('orders', __name__, url_prefix='/orders')
+
+# Apply CORS
+CORS(bp, supports_credentials=True)
+
+@bp.route('/', methods=['POST'])
+@token_required
+def place_order(user_id):
+    """
+    Queue a market or limit order for the next matching batch.
+
+    Expects a JSON payload with 'stock_symbol', 'side', 'quantity', and
+    optionally 'type' and 'limit_price'.
+    Returns 202 with the order ID.
+    """
+    try:
+        data = request.get_json() or {}
+        data['user_id'] = user_id
+        result = OrderService.place_order(data)
+        if 'error' in result:
+            logger.warning(f"Rejected order from user_id {user_id}: {result['error']}")
+            return jsonify(result), 400
+        return jsonify(result), 202
+    except Exception as e:
+        logger.error(f"Error placing order for user_id {user_id}: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
+
+@bp.route('/<order_id>', methods=['GET'])
+@token_required
+def get_order(user_id, order_id):
+    """
+    Get the status of one of the user's orders.
+    """
+    try:
+        if not ObjectId.is_valid(order_id):
+            return jsonify({"error": "Order not found"}), 404
+        order = OrderService.get_order(user_id, order_id)
+        if order:
+            return jsonify(order), 200
+        return jsonify({"error": "Order not found"}), 404
+    except Exception as e:
+        logger.error(f"Error fetching order {order_id} for user_id {user_id}: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
+
+@bp.route('/<order_id>', methods=['DELETE'])
+@token_required
+def cancel_order(user_id, order_id):
+    """
+    Cancel one of the user's orders that has not been matched yet.
+    """
+    try:
+        if ObjectId.is_valid(order_id) and OrderService.cancel_order(user_id, order_id):
+            return jsonify({"message": "Order cancelled successfully"}), 200
+        return jsonify({"error": "Order not found or already processed"}), 409
+    except Exception as e:
+        logger.error(f"Error cancelling order {order_id} for user_id {user_id}: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
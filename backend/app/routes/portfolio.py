@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request
-from app.services.user_service import UserService
+from app.services.user_service import UserService, NET_WORTH_COLLECTIONS
+from datetime import datetime
 import jwt
 from functools import wraps
 import os
@@ -128,3 +129,57 @@ def get_assets_value(user_id):
     except Exception as e:
         logger.error(f"Error fetching assets value for user_id {user_id}: {e}")
         return jsonify({'error': str(e)}), 500, {'Content-Type': 'application/json'}
+
+@bp.route('/summary', methods=['GET'])
+@token_required
+def get_summary(user_id):
+    """
+    Fetch the user's whole portfolio page in one call.
+
+    Expects a valid JWT token.
+    Returns the balance, title, priced holdings, assets value and net worth.
+    """
+    try:
+        logger.info(f"Fetching portfolio summary for user_id: {user_id}")
+        summary = UserService.get_portfolio_summary(user_id)
+        if summary is None:
+            logger.warning(f"User not found for user_id: {user_id}")
+            return jsonify({"message": "User not found"}), 404
+        logger.info(f"Successfully fetched portfolio summary for user_id: {user_id}")
+        return jsonify(summary), 200, {'Content-Type': 'application/json'}
+    except Exception as e:
+        logger.error(f"Error fetching portfolio summary for user_id {user_id}: {e}")
+        return jsonify({'error': str(e)}), 500, {'Content-Type': 'application/json'}
+
+# Bounds for the number of points of the net worth history
+DEFAULT_HISTORY_LIMIT = 200
+MAX_HISTORY_LIMIT = 1000
+
+@bp.route('/history', methods=['GET'])
+@token_required
+def get_history(user_id):
+    """
+    Fetch the user's net worth history.
+
+    Accepts an 'interval' query parameter ('tick' for every price tick of the
+    last 7 days, or '1d' for one point per day, default 'tick'), an optional
+    'limit', and optional ISO 8601 'from' and 'to' bounds.
+    Returns the points in chronological order.
+    """
+    try:
+        interval = request.args.get('interval', 'tick')
+        if interval not in NET_WORTH_COLLECTIONS:
+            return jsonify({"error": f"Invalid interval, expected one of {', '.join(NET_WORTH_COLLECTIONS)}"}), 400
+
+        limit = min(max(request.args.get('limit', DEFAULT_HISTORY_LIMIT, type=int), 1), MAX_HISTORY_LIMIT)
+        try:
+            start = datetime.fromisoformat(request.args['from']) if 'from' in request.args else None
+            end = datetime.fromisoformat(request.args['to']) if 'to' in request.args else None
+        except ValueError:
+            return jsonify({"error": "Invalid 'from' or 'to' timestamp"}), 400
+
+        points = UserService.get_net_worth_history(user_id, interval, limit, start, end)
+        return jsonify({"interval": interval, "points": points}), 200
+    except Exception as e:
+        logger.error(f"Error fetching net worth history for user_id {user_id}: {e}")
+        return jsonify({'error': str(e)}), 500
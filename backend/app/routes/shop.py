@@ -1,5 +1,7 @@
 from flask import Blueprint, jsonify, request
 from app.services.shop_service import ShopService
+from app.services.title_service import TITLES_CACHE_TTL
+from app.http_cache import ResponseCache, conditional_response
 import jwt
 from functools import wraps
 import os
@@ -68,10 +70,12 @@ def purchase_title(user_id):
 @bp.route('/titles', methods=['GET'])
 def get_shop_data():
     """
-    Endpoint for retrieving shop data (titles and prices).
+    Endpoint for retrieving shop data (titles and prices), with an ETag.
     """
-    titles = ShopService.get_shop_data()
-    if titles:
-        return jsonify(titles), 200
+    cached = ResponseCache.get(("shop",), ShopService.get_shop_data, ttl=TITLES_CACHE_TTL)
+    if not cached.empty:
+        return conditional_response(cached)
     else:
+        # Do not keep serving an empty shop once titles are added
+        ResponseCache.invalidate("shop")
         return jsonify({"message": "No titles found."}), 404
@@ -1,6 +1,10 @@
-from flask import Blueprint, jsonify
-from app.services.stock_service import StockService
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from app.services.stock_service import StockService, CANDLE_COLLECTIONS
+from app.services.price_feed_service import PriceFeedService
+from app.http_cache import ResponseCache, conditional_response
 from flask_cors import CORS
+from datetime import datetime
+import json
 import logging
 
 # Initialize the logger
@@ -12,12 +16,20 @@ bp = Blueprint('stocks', __name__, url_prefix='/stocks')
 # Apply CORS
 CORS(bp, supports_credentials=True)
 
+# Seconds between keep-alive comments on idle price streams
+STREAM_HEARTBEAT = 15
+
+# Bounds for the number of candles in a history response
+DEFAULT_HISTORY_LIMIT = 200
+MAX_HISTORY_LIMIT = 1000
+
 @bp.route('/list', methods=['GET'])
 def get_stocks():
     """
     Fetch all stocks.
 
-    Returns a list of all stocks in the database.
+    Returns a list of all stocks in the database, with an ETag; the rendered
+    body is reused until the cached stock list changes.
     """
     try:
         logger.info("Fetching all stocks from the database")
@@ -26,7 +38,7 @@ def get_stocks():
 
         if stocks:
             logger.info(f"Successfully fetched {len(stocks)} stocks from the database")
-            return jsonify(stocks), 200
+            return conditional_response(ResponseCache.get(("stocks",), lambda: stocks, version=stocks))
         else:
             logger.warning("No stocks found in the database")
             return jsonify({"message": "No stocks found"}), 404
@@ -34,6 +46,35 @@ def get_stocks():
         logger.error(f"Error fetching stocks: {e}")
         return jsonify({"error": "Internal Server Error"}), 500
 
+@bp.route('/stream', methods=['GET'])
+def stream_stocks():
+    """
+    Stream stock price changes as server-sent events.
+
+    Each 'prices' event carries a JSON list with only the stocks that changed
+    since the previous event. Clients should load '/stocks/list' once and then
+    apply the streamed changes.
+    """
+    subscriber = PriceFeedService.subscribe()
+
+    def generate():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                changes = subscriber.wait(STREAM_HEARTBEAT)
+                if changes:
+                    yield f"event: prices\ndata: {json.dumps(changes)}\n\n"
+                else:
+                    yield ": keep-alive\n\n"
+        finally:
+            PriceFeedService.unsubscribe(subscriber)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @bp.route('/<symbol>', methods=['GET'])
 def get_stock_price(symbol):
     """
@@ -54,3 +95,31 @@ def get_stock_price(symbol):
     except Exception as e:
         logger.error(f"Error fetching stock price for symbol {symbol.upper()}: {e}")
         return jsonify({"error": "Internal Server Error"}), 500
+
+@bp.route('/<symbol>/history', methods=['GET'])
+def get_price_history(symbol):
+    """
+    Get the OHLC price history of a stock.
+
+    Accepts an 'interval' query parameter ('1m', '1h' or '1d', default '1h'),
+    an optional 'limit', and optional ISO 8601 'from' and 'to' bounds.
+    Returns the candles in chronological order.
+    """
+    try:
+        interval = request.args.get('interval', '1h')
+        if interval not in CANDLE_COLLECTIONS:
+            return jsonify({"error": f"Invalid interval, expected one of {', '.join(CANDLE_COLLECTIONS)}"}), 400
+
+        limit = min(max(request.args.get('limit', DEFAULT_HISTORY_LIMIT, type=int), 1), MAX_HISTORY_LIMIT)
+        try:
+            start = datetime.fromisoformat(request.args['from']) if 'from' in request.args else None
+            end = datetime.fromisoformat(request.args['to']) if 'to' in request.args else None
+        except ValueError:
+            return jsonify({"error": "Invalid 'from' or 'to' timestamp"}), 400
+
+        logger.info(f"Fetching {interval} price history for stock symbol: {symbol.upper()}")
+        candles = StockService.get_price_history(symbol.upper(), interval, limit, start, end)
+        return jsonify({"symbol": symbol.upper(), "interval": interval, "candles": candles}), 200
+    except Exception as e:
+        logger.error(f"Error fetching price history for symbol {symbol.upper()}: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
@@ -1,8 +1,10 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from app.services.transaction_service import TransactionService
+from app.services.trade_queue_service import TradeQueueService
 import jwt
 from functools import wraps
 import os
+import json
 from flask_cors import CORS
 import logging
 
@@ -48,6 +50,17 @@ def token_required(f):
 
     return decorated
 
+def queue_trade(user_id, trade_type, data):
+    """
+    Enqueue a trade for the write-behind workers instead of executing it.
+    Returns 202 with the order ID, or 400 if the trade is invalid.
+    """
+    result = TradeQueueService.submit(user_id, trade_type, data or {})
+    if 'error' in result:
+        logger.warning(f"Rejected queued {trade_type} for user_id {user_id}: {result['error']}")
+        return jsonify(result), 400
+    return jsonify(result), 202
+
 @bp.route('/buy', methods=['POST'])
 @token_required
 def buy_stock(user_id):
@@ -59,6 +72,8 @@ def buy_stock(user_id):
     """
     try:
         data = request.get_json()
+        if TradeQueueService.enabled():
+            return queue_trade(user_id, 'buy', data)
         data['user_id'] = user_id
         logger.info(f"Processing stock purchase for user_id: {user_id}, data: {data}")
         result = TransactionService.buy_stock(data)
@@ -79,6 +94,8 @@ def sell_stock(user_id):
     """
     try:
         data = request.get_json()
+        if TradeQueueService.enabled():
+            return queue_trade(user_id, 'sell', data)
         data['user_id'] = user_id
         logger.info(f"Processing stock sale for user_id: {user_id}, data: {data}")
         result = TransactionService.sell_stock(data)
@@ -88,17 +105,60 @@ def sell_stock(user_id):
         logger.error(f"Error processing stock sale for user_id {user_id}: {e}")
         return jsonify({"error": "Internal Server Error"}), 500
 
+@bp.route('/queue/<order_id>', methods=['GET'])
+@token_required
+def get_queued_trade(user_id, order_id):
+    """
+    Get the status of a trade queued by /buy or /sell, and its result once applied.
+    """
+    try:
+        status = TradeQueueService.get_status(user_id, order_id) if TradeQueueService.enabled() else None
+        if status:
+            return jsonify(status), 200
+        return jsonify({"error": "Order not found"}), 404
+    except Exception as e:
+        logger.error(f"Error fetching queued trade {order_id} for user_id {user_id}: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
+
+# Bounds for the page size of the transaction history
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
 @bp.route('/', methods=['GET'])
 @token_required
 def get_transactions(user_id):
     """
-    Fetch all transactions for the authenticated user.
+    Fetch a page of transactions for the authenticated user, newest first.
+
+    Accepts optional 'limit', 'before' (the 'cursor' of the last transaction of
+    the previous page), 'symbol' and 'type' query parameters.
+    The JSON list is streamed as it is read from the database.
     """
     try:
+        limit = min(max(request.args.get('limit', DEFAULT_LIMIT, type=int), 1), MAX_LIMIT)
+        transaction_type = request.args.get('type')
+        if transaction_type not in (None, 'buy', 'sell'):
+            return jsonify({"error": "Invalid transaction type"}), 400
+
         logger.info(f"Fetching transactions for user_id: {user_id}")
-        transactions = TransactionService.get_transactions(user_id)
-        logger.info(f"Successfully fetched transactions for user_id: {user_id}")
-        return jsonify(transactions), 200
+        transactions = TransactionService.get_transactions(
+            user_id,
+            limit=limit,
+            before=request.args.get('before'),
+            stock_symbol=request.args.get('symbol'),
+            transaction_type=transaction_type
+        )
+
+        def generate():
+            yield '['
+            for index, transaction in enumerate(transactions):
+                yield (',' if index else '') + json.dumps(transaction)
+            yield ']'
+
+        return Response(stream_with_context(generate()), status=200, mimetype='application/json')
+    except ValueError as e:
+        logger.warning(f"Invalid transactions cursor for user_id {user_id}: {e}")
+        return jsonify({"error": "Invalid cursor"}), 400
     except Exception as e:
         logger.error(f"Error fetching transactions for user_id {user_id}: {e}")
         return jsonify({"error": "Internal Server Error"}), 500
@@ -0,0 +1,59 @@
+from app import mongo
+from common.indexes import INDEXES
+from pymongo.errors import ConnectionFailure
+import logging
+
+logger = logging.getLogger(__name__)
+
+class IndexService:
+    @staticmethod
+    def ensure_indexes():
+        """
+        Create every declared index that does not exist yet.
+
+        A failure on one collection (e.g. duplicate keys blocking a unique index)
+        is logged and does not prevent the other collections from being indexed.
+
+        Returns:
+            dict: A mapping of collection name to the error message of failed collections.
+        """
+        errors = {}
+        for collection, indexes in INDEXES.items():
+            try:
+                mongo.db[collection].create_indexes(indexes)
+            except ConnectionFailure as e:
+                logger.error(f"Database unreachable, skipping index creation: {e}")
+                return {name: str(e) for name in INDEXES}
+            except Exception as e:
+                logger.error(f"Error ensuring indexes on {collection}: {e}")
+                errors[collection] = str(e)
+        logger.info(f"Indexes ensured on {len(INDEXES) - len(errors)} of {len(INDEXES)} collections")
+        return errors
+
+    @staticmethod
+    def get_index_report():
+        """
+        Compare the indexes in the database with the declared index set.
+
+        Returns:
+            dict: Per collection, the declared indexes that are 'missing', the existing
+                indexes that are 'undeclared', and the indexes that have not served
+                any operation since the server started ('unused').
+        """
+        report = {}
+        for collection, indexes in INDEXES.items():
+            declared = {index.document['name'] for index in indexes}
+            existing = {index['name'] for index in mongo.db[collection].list_indexes()}
+
+            usage = mongo.db[collection].aggregate([{"$indexStats": {}}])
+            unused = sorted(
+                stats['name'] for stats in usage
+                if stats['name'] != '_id_' and stats['accesses']['ops'] == 0
+            )
+
+            report[collection] = {
+                "missing": sorted(declared - existing),
+                "undeclared": sorted(existing - declared - {'_id_'}),
+                "unused": unused
+            }
+        return report
@@ -1,63 +1,169 @@
 from app import mongo
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from common.leaderboard import USER_PROJECTION, build_entry, entry_update
 from .stock_service import StockService
-from .user_service import UserService
+from .title_service import TitleService
+from datetime import datetime
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
 class LeaderboardService:
+    # Users whose entry the background refresher has yet to recompute, see schedule_refresh
+    _pending = set()
+    _pending_lock = threading.Lock()
+    _pending_ready = threading.Event()
+    _refresher = None
+
+    @staticmethod
+    def build_entry(user, prices, titles):
+        """
+        Build the leaderboard entry for a single user, see common.leaderboard.build_entry.
+        """
+        return build_entry(user, prices, titles)
+
     @staticmethod
-    def get_leaderboard():
+    def refresh_leaderboard():
         """
-        Fetch the leaderboard data.
+        Rebuild the materialized leaderboard collection in bulk.
 
-        Retrieves user data from the database, calculates the net worth for each user,
-        and sorts the users by their net worth in descending order.
+        Values every user's portfolio from one price map and one streamed user scan,
+        upserts the results with a single unordered bulk write, and removes entries
+        for users that no longer exist. Entries refreshed by a trade during the
+        scan are kept.
 
         Returns:
-            list: A list of dictionaries containing the leaderboard data.
+            int: The number of leaderboard entries written.
         """
         try:
-            logger.info("Fetching users from the database for leaderboard calculation.")
-            users_cursor = mongo.db.users.find()
-
-            leaderboard = []
-            for user in users_cursor:
-                logger.info(f"Calculating net worth for user: {user['username']}")
-                
-                # Calculate invested assets and net worth
-                invested_assets = sum(
-                    stock['quantity'] * StockService.get_stock_price(stock['stock_symbol'])
-                    for stock in user['portfolio']
+            refreshed_at = datetime.now()
+            prices = {stock['symbol']: stock['price'] for stock in mongo.db.stocks.find({}, {"_id": 0, "symbol": 1, "price": 1})}
+            titles = TitleService.get_titles()
+
+            operations = []
+            for user in mongo.db.users.find({}, USER_PROJECTION):
+                entry = LeaderboardService.build_entry(user, prices, titles)
+                entry['updated_at'] = refreshed_at
+                operations.append(entry_update(entry))
+
+            if operations:
+                mongo.db.leaderboard.bulk_write(operations, ordered=False)
+            mongo.db.leaderboard.delete_many({"updated_at": {"$lt": refreshed_at}})
+
+            logger.info(f"Leaderboard refreshed with {len(operations)} entries.")
+            return len(operations)
+        except Exception as e:
+            logger.error(f"Error refreshing leaderboard: {e}")
+            raise e
+
+    @staticmethod
+    def refresh_users(user_ids):
+        """
+        Recompute the leaderboard entries of the given users with one bulk write, e.g. after order matching.
+
+        Args:
+            user_ids (iterable): The ObjectIds of the users.
+
+        Returns:
+            int: The number of leaderboard entries written.
+        """
+        try:
+            refreshed_at = datetime.now()
+            users = list(mongo.db.users.find({"_id": {"$in": list(user_ids)}}, USER_PROJECTION))
+            prices = StockService.get_prices(stock['stock_symbol'] for user in users for stock in user.get('portfolio', []))
+            titles = TitleService.get_titles()
+
+            if users:
+                mongo.db.leaderboard.bulk_write([
+                    entry_update({**build_entry(user, prices, titles), "updated_at": refreshed_at})
+                    for user in users
+                ], ordered=False)
+            return len(users)
+        except Exception as e:
+            logger.error(f"Error refreshing leaderboard entries of {len(user_ids)} users: {e}")
+            return 0
+
+    @staticmethod
+    def schedule_refresh(user_id):
+        """
+        Queue a refresh of the user's entry, e.g. after a trade, off the request path.
+
+        A background thread per process recomputes the queued entries; users queued
+        while it works are coalesced into its next bulk write.
+
+        Args:
+            user_id (str | ObjectId): The ID of the user.
+        """
+        with LeaderboardService._pending_lock:
+            LeaderboardService._pending.add(ObjectId(user_id))
+            if LeaderboardService._refresher is None or not LeaderboardService._refresher.is_alive():
+                LeaderboardService._refresher = threading.Thread(
+                    target=LeaderboardService._refresh_pending, name="leaderboard-refresher", daemon=True
                 )
-                net_worth = user['balance'] + invested_assets
-
-                # Retrieve the user's title and level
-                title_data = UserService.get_title(user['_id'])  # This will return {"level": ..., "name": ...}
-                title_name = title_data['name']
-                title_level = title_data['level']
-
-                # Construct the image URL for the title
-                if title_level != -1:  # Ensure the user has a valid title level
-                    title_image_url = f"/images/Level{title_level}.png"
-                else:
-                    title_image_url = None  # No title image for users with level -1
-
-                # Append user data to the leaderboard
-                leaderboard.append({
-                    "username": user['username'],
-                    "liquidAssets": user['balance'],
-                    "investedAssets": invested_assets,
-                    "netWorth": net_worth,
-                    "title": title_name,  # Add title name
-                    "title_image": title_image_url  # Add title image URL
-                })
-
-            # Sort leaderboard by net worth in descending order
-            leaderboard.sort(key=lambda x: x['netWorth'], reverse=True)
-            logger.info("Leaderboard calculated successfully.")
-            return leaderboard
+                LeaderboardService._refresher.start()
+        LeaderboardService._pending_ready.set()
+
+    @staticmethod
+    def _refresh_pending():
+        while True:
+            LeaderboardService._pending_ready.wait()
+            with LeaderboardService._pending_lock:
+                user_ids = LeaderboardService._pending
+                LeaderboardService._pending = set()
+                LeaderboardService._pending_ready.clear()
+            if user_ids:
+                LeaderboardService.refresh_users(user_ids)
+
+    @staticmethod
+    def refresh_user(user_id, user=None):
+        """
+        Recompute the leaderboard entry of a single user, e.g. after a trade.
+
+        Args:
+            user_id (str): The ID of the user.
+            user (dict, optional): The user document projected with USER_PROJECTION,
+                if the caller already holds it.
+        """
+        try:
+            if user is None:
+                user = mongo.db.users.find_one({"_id": ObjectId(user_id)}, USER_PROJECTION)
+            if not user:
+                logger.warning(f"User not found for leaderboard refresh: {user_id}")
+                return
+
+            prices = StockService.get_prices(stock['stock_symbol'] for stock in user.get('portfolio', []))
+            titles = TitleService.get_titles()
+            entry = LeaderboardService.build_entry(user, prices, titles)
+            entry['updated_at'] = datetime.now()
+            mongo.db.leaderboard.replace_one({"user_id": user['_id']}, entry, upsert=True)
+        except Exception as e:
+            logger.error(f"Error refreshing leaderboard entry for user {user_id}: {e}")
+
+    @staticmethod
+    def get_leaderboard(limit=100, offset=0):
+        """
+        Fetch a page of the materialized leaderboard.
+
+        Entries are served sorted by net worth in descending order from the
+        precomputed leaderboard collection.
+
+        Args:
+            limit (int): The maximum number of entries to return.
+            offset (int): The number of entries to skip.
+
+        Returns:
+            list: A list of dictionaries containing the leaderboard data.
+        """
+        try:
+            logger.info(f"Fetching leaderboard page with limit {limit} and offset {offset}.")
+            entries_cursor = mongo.reads.leaderboard.find(
+                {},
+                {"_id": 0, "user_id": 0, "updated_at": 0}
+            ).sort([("netWorth", DESCENDING), ("username", ASCENDING)]).skip(offset).limit(limit)
 
+            return [{**entry, "rank": offset + index + 1} for index, entry in enumerate(entries_cursor)]
         except Exception as e:
             logger.error(f"Error fetching leaderboard: {e}")
             return []
@@ -1,31 +1,128 @@
 from app import mongo
 from bson import ObjectId
+from pymongo import DESCENDING
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Characters of the content kept in the summary of listed articles
+SUMMARY_LENGTH = 280
+
+# Fields of listed articles; the full content is only served by get_news_article
+SUMMARY_PROJECTION = {
+    "title": 1,
+    "author": 1,
+    "timestamp": 1,
+    "isFeatured": 1,
+    "thumbnail": 1,
+    "summary": {"$substrCP": ["$content", 0, SUMMARY_LENGTH]}
+}
+
 class NewsService:
     @staticmethod
-    def get_all_news():
+    def parse_timestamp(timestamp):
+        """
+        Parse an ISO 8601 timestamp (as sent by the frontend) into a datetime.
+
+        Returns:
+            datetime: The parsed timestamp, or the value unchanged if it is not a string.
+
+        Raises:
+            ValueError: If the string is not a valid timestamp.
+        """
+        if isinstance(timestamp, str):
+            return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        return timestamp
+
+    @staticmethod
+    def encode_cursor(article):
+        """
+        Build the opaque 'before' cursor pointing at an article.
+        """
+        return f"{article['timestamp'].isoformat()}_{article['_id']}"
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Parse a 'before' cursor into its (timestamp, _id) pair.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        timestamp, _, article_id = cursor.partition('_')
+        if not ObjectId.is_valid(article_id):
+            raise ValueError(f"Invalid cursor: {cursor}")
+        return datetime.fromisoformat(timestamp), ObjectId(article_id)
+
+    @staticmethod
+    def get_all_news(limit=None, before=None, featured=None):
         """
-        Fetch all news articles from the database, sorted by timestamp in descending order.
+        Fetch a page of news summaries, newest first.
 
-        Converts ObjectId to string for JSON serialization.
+        Pages are addressed by a keyset cursor on (timestamp, _id) and listed
+        articles leave out their content (only a short 'summary' is kept), so
+        the cost of a page does not grow with the archive.
+        Converts ObjectId and datetime to string for JSON serialization.
+
+        Args:
+            limit (int, optional): The maximum number of articles to return.
+            before (str, optional): Only return articles older than this cursor.
+            featured (bool, optional): Only return featured (True) or other (False) articles.
 
         Returns:
-            list: A list of all news articles in the database.
+            list: The article summaries, each with the 'cursor' of the next page.
         """
         try:
-            # Fetch and sort news by timestamp in descending order (newest first)
-            news_cursor = mongo.db.news.find().sort('timestamp', -1)
-            
-            # Convert ObjectId to string for JSON serialization
-            return [{**news, '_id': str(news['_id'])} for news in news_cursor]
+            query = {}
+            if featured is not None:
+                query["isFeatured"] = featured
+            if before:
+                timestamp, article_id = NewsService.decode_cursor(before)
+                query["$or"] = [
+                    {"timestamp": {"$lt": timestamp}},
+                    {"timestamp": timestamp, "_id": {"$lt": article_id}}
+                ]
+
+            news_cursor = mongo.reads.news.find(query, SUMMARY_PROJECTION).sort([("timestamp", DESCENDING), ("_id", DESCENDING)])
+            if limit:
+                news_cursor = news_cursor.limit(limit)
+
+            # Articles stored before timestamps were normalized have no cursor (see normalize_timestamps)
+            return [
+                {
+                    **news,
+                    '_id': str(news['_id']),
+                    'timestamp': news['timestamp'].isoformat() if isinstance(news.get('timestamp'), datetime) else news.get('timestamp'),
+                    'cursor': NewsService.encode_cursor(news) if isinstance(news.get('timestamp'), datetime) else None
+                }
+                for news in news_cursor
+            ]
         except Exception as e:
-            logger.error(f"Error fetching all news: {e}")
+            logger.error(f"Error fetching news: {e}")
             raise e
 
+    @staticmethod
+    def normalize_timestamps():
+        """
+        Convert the string timestamps of older articles into dates, so they sort
+        and paginate with the others.
+
+        Returns:
+            int: The number of articles converted.
+        """
+        converted = 0
+        for article in mongo.db.news.find({"timestamp": {"$type": "string"}}, {"timestamp": 1}):
+            try:
+                timestamp = NewsService.parse_timestamp(article['timestamp'])
+            except ValueError:
+                logger.warning(f"Unparseable timestamp on news article {article['_id']}: {article['timestamp']}")
+                continue
+            mongo.db.news.update_one({"_id": article['_id']}, {"$set": {"timestamp": timestamp}})
+            converted += 1
+        logger.info(f"Converted the timestamps of {converted} news articles")
+        return converted
+
 
     @staticmethod
     def get_news_article(article_id):
@@ -66,6 +163,8 @@ class NewsService:
         try:
             if timestamp is None:
                 timestamp = datetime.now()  # Set the current time if no timestamp is provided
+            # Store dates, never strings, so articles sort and paginate by time
+            timestamp = NewsService.parse_timestamp(timestamp)
 
             article = {
                 "title": title,
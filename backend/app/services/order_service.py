@@ -0,0 +1,117 @@
+from app import mongo
+from bson import ObjectId
+from common.matching import ORDER_SIDES, ORDER_TYPES, match_orders
+from .stock_service import StockService
+from .leaderboard_service import LeaderboardService
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+class OrderService:
+    @staticmethod
+    def place_order(data):
+        """
+        Queue an order for the next matching batch.
+
+        Expects data to contain 'user_id', 'stock_symbol', 'side' ('buy' or 'sell')
+        and 'quantity', and optionally 'type' ('market' or 'limit', default 'market')
+        and 'limit_price' for limit orders.
+
+        Args:
+            data (dict): The order details.
+
+        Returns:
+            dict: The queued order's 'order_id', or an 'error' message if the order is invalid.
+        """
+        side = data.get('side')
+        order_type = data.get('type', 'market')
+        quantity = data.get('quantity')
+        limit_price = data.get('limit_price')
+
+        if side not in ORDER_SIDES:
+            return {"error": "Invalid side"}
+        if order_type not in ORDER_TYPES:
+            return {"error": "Invalid order type"}
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+            return {"error": "Invalid quantity"}
+        if order_type == 'limit' and (not isinstance(limit_price, (int, float)) or isinstance(limit_price, bool) or limit_price <= 0):
+            return {"error": "Invalid limit price"}
+        if not data.get('stock_symbol'):
+            return {"error": "Missing stock symbol"}
+
+        order = {
+            "user_id": ObjectId(data['user_id']),
+            "stock_symbol": data['stock_symbol'].upper(),
+            "side": side,
+            "type": order_type,
+            "quantity": quantity,
+            "status": "open",
+            "created_at": datetime.now()
+        }
+        if order_type == 'limit':
+            order['limit_price'] = float(limit_price)
+
+        try:
+            result = mongo.trades.orders.insert_one(order)
+            logger.info(f"Queued {order_type} {side} order {result.inserted_id} for user {data['user_id']}")
+            return {"order_id": str(result.inserted_id)}
+        except Exception as e:
+            logger.error(f"Error queueing order for user {data['user_id']}: {e}")
+            raise e
+
+    @staticmethod
+    def get_order(user_id, order_id):
+        """
+        Fetch one of the user's orders.
+
+        Returns:
+            dict: The order if found, otherwise None.
+        """
+        try:
+            order = mongo.db.orders.find_one(
+                {"_id": ObjectId(order_id), "user_id": ObjectId(user_id)},
+                {"batch_id": 0, "claimed_at": 0}
+            )
+            if order:
+                order['_id'] = str(order['_id'])
+                order['user_id'] = str(order['user_id'])
+            return order
+        except Exception as e:
+            logger.error(f"Error fetching order {order_id} for user {user_id}: {e}")
+            raise e
+
+    @staticmethod
+    def cancel_order(user_id, order_id):
+        """
+        Cancel one of the user's orders if it has not been claimed by a matching batch yet.
+
+        Returns:
+            bool: True if the order was cancelled, False otherwise.
+        """
+        try:
+            result = mongo.trades.orders.update_one(
+                {"_id": ObjectId(order_id), "user_id": ObjectId(user_id), "status": "open"},
+                {"$set": {"status": "cancelled", "processed_at": datetime.now()}}
+            )
+            return result.modified_count == 1
+        except Exception as e:
+            logger.error(f"Error cancelling order {order_id} for user {user_id}: {e}")
+            raise e
+
+    @staticmethod
+    def match_orders():
+        """
+        Clear the open orders in one batch (see common.matching.match_orders)
+        and refresh the leaderboard entries of the users with a filled order.
+
+        Returns:
+            dict: Counts of filled, rejected and pending orders.
+        """
+        filled_users = set()
+        counts = match_orders(mongo.trades, filled_users=filled_users)
+        if counts['symbols']:
+            StockService.invalidate_quotes()
+        if filled_users:
+            LeaderboardService.refresh_users(filled_users)
+        return counts
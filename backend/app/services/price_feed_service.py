@@ -0,0 +1,211 @@
+from app import mongo
+from pymongo.errors import PyMongoError
+from datetime import datetime
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seconds between polls of the stocks collection when change streams are unavailable
+POLL_INTERVAL = 1.0
+
+# Fields pushed to clients for each changed stock
+FEED_PROJECTION = {"_id": 1, "symbol": 1, "price": 1, "change": 1, "high": 1, "low": 1, "last_update": 1}
+
+
+class PriceFeedSubscriber:
+    """
+    A single connected client of the price feed.
+
+    Pending changes are coalesced per symbol, so a slow client only ever
+    receives the latest price of each stock instead of an unbounded backlog.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def publish(self, changes):
+        with self._lock:
+            self._pending.update(changes)
+        self._ready.set()
+
+    def wait(self, timeout):
+        """
+        Wait for pending changes.
+
+        Returns:
+            list: The changed stocks, or an empty list if the timeout expired.
+        """
+        if not self._ready.wait(timeout):
+            return []
+        with self._lock:
+            changes = list(self._pending.values())
+            self._pending.clear()
+            self._ready.clear()
+        return changes
+
+
+class PriceFeedService:
+    """
+    Fan out stock price changes to all connected clients of this process.
+
+    A single background watcher per process follows the stocks collection,
+    through a change stream when the deployment supports it and by polling
+    on 'last_update' otherwise, so the cost between ticks does not grow with
+    the number of connected clients.
+    """
+    _subscribers = set()
+    _lock = threading.Lock()
+    _watcher = None
+
+    @staticmethod
+    def subscribe(subscriber=None):
+        """
+        Register a new client and make sure the shared watcher is running.
+
+        Args:
+            subscriber (PriceFeedSubscriber, optional): The subscriber to register, e.g. an
+                asyncio one; a new PriceFeedSubscriber by default.
+
+        Returns:
+            PriceFeedSubscriber: The subscriber to read changes from.
+        """
+        subscriber = subscriber or PriceFeedSubscriber()
+        with PriceFeedService._lock:
+            PriceFeedService._subscribers.add(subscriber)
+            if PriceFeedService._watcher is None or not PriceFeedService._watcher.is_alive():
+                PriceFeedService._watcher = threading.Thread(
+                    target=PriceFeedService._watch, name="price-feed-watcher", daemon=True
+                )
+                PriceFeedService._watcher.start()
+        logger.info(f"Price feed client subscribed ({len(PriceFeedService._subscribers)} connected)")
+        return subscriber
+
+    @staticmethod
+    def unsubscribe(subscriber):
+        with PriceFeedService._lock:
+            PriceFeedService._subscribers.discard(subscriber)
+        logger.info(f"Price feed client unsubscribed ({len(PriceFeedService._subscribers)} connected)")
+
+    @staticmethod
+    def publish(stocks):
+        """
+        Push changed stocks to every connected client.
+
+        Args:
+            stocks (iterable): Stock documents projected with FEED_PROJECTION.
+        """
+        changes = {}
+        for stock in stocks:
+            last_update = stock.get('last_update')
+            changes[stock['symbol']] = {
+                "symbol": stock['symbol'],
+                "price": stock.get('price'),
+                "change": stock.get('change'),
+                "high": stock.get('high'),
+                "low": stock.get('low'),
+                "last_update": last_update.isoformat() if isinstance(last_update, datetime) else last_update
+            }
+        if not changes:
+            return
+
+        with PriceFeedService._lock:
+            subscribers = list(PriceFeedService._subscribers)
+        for subscriber in subscribers:
+            subscriber.publish(changes)
+
+    @staticmethod
+    def _has_subscribers():
+        with PriceFeedService._lock:
+            return bool(PriceFeedService._subscribers)
+
+    @staticmethod
+    def _watch():
+        """
+        Follow the stocks collection while any client is connected.
+        """
+        use_change_stream = True
+        while True:
+            try:
+                if use_change_stream:
+                    PriceFeedService._watch_change_stream()
+                else:
+                    PriceFeedService._watch_polling()
+            except PyMongoError as e:
+                if use_change_stream:
+                    logger.info(f"Change streams unavailable ({e}), polling the stocks collection instead")
+                    use_change_stream = False
+                    continue
+                logger.error(f"Price feed watcher stopped: {e}")
+            except Exception as e:
+                logger.error(f"Price feed watcher stopped: {e}")
+
+            # Only exit once no client is left, so a late subscriber is never stranded
+            with PriceFeedService._lock:
+                if not PriceFeedService._subscribers:
+                    PriceFeedService._watcher = None
+                    return
+            time.sleep(POLL_INTERVAL)
+
+    @staticmethod
+    def _watch_change_stream():
+        # Updates only carry the changed fields: they are merged into the last known state of
+        # each stock, so no document is looked up again for every change
+        fields = [field for field in FEED_PROJECTION if field != "_id"]
+        pipeline = [
+            {"$match": {"operationType": {"$in": ["update", "replace", "insert"]}}},
+            {"$project": {
+                "operationType": 1,
+                "documentKey": 1,
+                **{f"fullDocument.{field}": 1 for field in FEED_PROJECTION},
+                **{f"updateDescription.updatedFields.{field}": 1 for field in fields}
+            }}
+        ]
+
+        with mongo.db.stocks.watch(pipeline, max_await_time_ms=500) as stream:
+            # Read after the stream is opened, so no change falls between the two
+            stocks = {stock['_id']: stock for stock in mongo.db.stocks.find({}, FEED_PROJECTION)}
+            while PriceFeedService._has_subscribers():
+                batch = {}
+                change = stream.try_next()
+                while change is not None:
+                    stock_id = change['documentKey']['_id']
+                    if change['operationType'] == 'update':
+                        updated = change.get('updateDescription', {}).get('updatedFields', {})
+                        stock = stocks.get(stock_id)
+                        if stock is None:
+                            # A stock inserted before the stream was opened but after the state was read
+                            stock = stocks[stock_id] = mongo.db.stocks.find_one({"_id": stock_id}, FEED_PROJECTION) or {}
+                        if updated and stock:
+                            stock.update(updated)
+                            batch[stock_id] = stock
+                    else:
+                        stock = stocks[stock_id] = change.get('fullDocument') or {}
+                        batch[stock_id] = stock
+                    change = stream.try_next()
+                PriceFeedService.publish(stock for stock in batch.values() if 'symbol' in stock)
+
+    @staticmethod
+    def _watch_polling():
+        latest = mongo.db.stocks.find_one({}, {"last_update": 1}, sort=[("last_update", -1)])
+        watermark = latest.get('last_update') if latest else None
+        # Stocks already published at the watermark: a tick writes every stock with the same
+        # 'last_update', so a poll landing mid-write must read that timestamp again
+        seen = set()
+
+        while PriceFeedService._has_subscribers():
+            time.sleep(POLL_INTERVAL)
+            query = {"last_update": {"$gte": watermark} if watermark else {"$ne": None}}
+            changed = [
+                stock for stock in mongo.db.stocks.find(query, FEED_PROJECTION)
+                if (stock['_id'], stock.get('last_update')) not in seen
+            ]
+            updates = [stock['last_update'] for stock in changed if stock.get('last_update')]
+            if updates and max(updates) != watermark:
+                watermark = max(updates)
+                seen = set()
+            seen.update((stock['_id'], stock['last_update']) for stock in changed if stock.get('last_update') == watermark)
+            PriceFeedService.publish(changed)
@@ -0,0 +1,63 @@
+from app import mongo
+from bson import ObjectId
+from bson.errors import InvalidId
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Profiles are stored in full, but listed without their call tree
+SUMMARY_PROJECTION = {"tree": 0}
+
+class ProfileService:
+    @staticmethod
+    def save_profile(document):
+        """
+        Store a recorded request or task profile.
+
+        Args:
+            document (dict): The profile, as serialized by common.profiling.Profile.to_document.
+
+        Returns:
+            str: The id of the stored profile, or None if it could not be stored.
+        """
+        try:
+            result = mongo.db.profiles.insert_one(document)
+            logger.info(f"Stored profile {result.inserted_id} of {document['name']} ({document['wall_seconds'] * 1000:.1f} ms)")
+            return str(result.inserted_id)
+        except Exception as e:
+            logger.error(f"Error storing the profile of {document.get('name')}: {e}")
+            return None
+
+    @staticmethod
+    def list_profiles(limit=50, name=None):
+        """
+        List the most recent profiles, newest first, without their call trees.
+
+        Args:
+            limit (int): The maximum number of profiles returned.
+            name (str): Only return the profiles of this route or task.
+
+        Returns:
+            list: The profile summaries.
+        """
+        query = {"name": name} if name else {}
+        profiles = list(mongo.db.profiles.find(query, SUMMARY_PROJECTION).sort("started_at", -1).limit(limit))
+        for profile in profiles:
+            profile['_id'] = str(profile['_id'])
+        return profiles
+
+    @staticmethod
+    def get_profile(profile_id):
+        """
+        Fetch a stored profile with its call tree.
+
+        Returns:
+            dict: The profile if found, otherwise None.
+        """
+        try:
+            profile = mongo.db.profiles.find_one({"_id": ObjectId(profile_id)})
+        except InvalidId:
+            return None
+        if profile:
+            profile['_id'] = str(profile['_id'])
+        return profile
@@ -1,6 +1,7 @@
 from app import mongo
 import logging
 from bson import ObjectId
+from .leaderboard_service import LeaderboardService
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +41,8 @@ class ShopService:
                 {"$set": {"balance": new_balance, "title_level": int(title['level'])}}
             )
 
+            LeaderboardService.refresh_user(user_id)
+
             logger.info(f"User {user['username']} purchased title: {title['title']}. New balance: {new_balance}")
             return {"message": f"Title '{title['title']}' purchased successfully!", "new_balance": new_balance}
 
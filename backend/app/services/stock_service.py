@@ -1,18 +1,87 @@
 from app import mongo
+from app.config import Config
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
 from .trends_service import TrendsService
+from common.matching import PRICE_IMPACT_PER_SHARE
+from common.quote_cache import QuoteCache
 from datetime import datetime
-import time
-import random
+import os
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+# Fields the pricing engine reads from each stock
+PRICING_PROJECTION = {"price": 1, "symbol": 1, "sector": 1, "volatility_factor": 1, "trend_direction": 1, "high": 1, "low": 1, "anchor_price": 1}
+
+# Fields of a candle returned by the price history
+CANDLE_PROJECTION = {"_id": 0, "start": 1, "open": 1, "high": 1, "low": 1, "close": 1}
+
+# Fields of a stock read back by the price impact of a trade
+IMPACT_PROJECTION = {"_id": 0, "price": 1, "high": 1, "low": 1}
+
+# Pre-aggregated candle collections by history interval
+CANDLE_COLLECTIONS = {
+    "1m": "stock_candles_1m",
+    "1h": "stock_candles_1h",
+    "1d": "stock_candles_1d"
+}
+
 class StockService:
+    _quote_cache = None
+    _quote_cache_lock = threading.Lock()
+
+    @staticmethod
+    def get_quote_cache():
+        """
+        Create the quote cache on first use, according to the QUOTE_CACHE setting.
+
+        Returns:
+            QuoteCache: The cache of this process, or None if caching is off.
+        """
+        if Config.QUOTE_CACHE not in ('local', 'redis'):
+            return None
+        with StockService._quote_cache_lock:
+            if StockService._quote_cache is None:
+                redis_client = None
+                if Config.QUOTE_CACHE == 'redis':
+                    import redis
+                    redis_client = redis.Redis.from_url(Config.REDIS_URL)
+                StockService._quote_cache = QuoteCache(redis_client, ttl=Config.QUOTE_CACHE_TTL)
+            return StockService._quote_cache
+
+    @staticmethod
+    def invalidate_quotes(stock_symbols=None):
+        """
+        Drop cached quotes after prices were changed outside of a tick or trade.
+
+        Args:
+            stock_symbols (iterable, optional): The changed symbols, or None for all stocks.
+        """
+        cache = StockService.get_quote_cache()
+        if cache:
+            cache.invalidate(list(stock_symbols) if stock_symbols is not None else None)
+
+    @staticmethod
+    def _load_all_stocks():
+        # The snapshot is served (and ETagged) until the next tick, so it must not come from a lagging secondary
+        stocks_cursor = mongo.db.stocks.find()
+        return [{**stock, '_id': str(stock['_id'])} for stock in stocks_cursor]
+
+    @staticmethod
+    def _load_prices(symbols):
+        stocks_cursor = mongo.db.stocks.find(
+            {"symbol": {"$in": symbols}},
+            {"_id": 0, "symbol": 1, "price": 1}
+        )
+        return {stock['symbol']: stock['price'] for stock in stocks_cursor}
+
     @staticmethod
     def get_all_stocks():
         """
-        Fetch all stocks from the database.
+        Fetch all stocks, through the quote cache.
 
         Converts ObjectId to string for JSON serialization.
 
@@ -20,8 +89,10 @@ class StockService:
             list: A list of all stocks in the database.
         """
         try:
-            stocks_cursor = mongo.db.stocks.find()
-            return [{**stock, '_id': str(stock['_id'])} for stock in stocks_cursor]
+            cache = StockService.get_quote_cache()
+            if cache:
+                return cache.get_snapshot(StockService._load_all_stocks)
+            return StockService._load_all_stocks()
         except Exception as e:
             logger.error(f"Error fetching all stocks: {e}")
             raise e
@@ -53,50 +124,216 @@ class StockService:
             float: The current price of the stock if found, otherwise None.
         """
         try:
-            stock = mongo.db.stocks.find_one({"symbol": stock_symbol})
-            return stock['price'] if stock else None
+            return StockService.get_prices([stock_symbol]).get(stock_symbol)
         except Exception as e:
             logger.error(f"Error fetching stock price for {stock_symbol}: {e}")
             raise e
 
     @staticmethod
-    def update_stock_prices():
+    def get_prices(stock_symbols):
+        """
+        Fetch the current prices of several stocks, through the quote cache.
+
+        Symbols missing from the cache are read with a single query.
+
+        Args:
+            stock_symbols (iterable): The symbols of the stocks.
+
+        Returns:
+            dict: A mapping of symbol to current price. Symbols that are not found are omitted.
+        """
+        try:
+            symbols = list(set(stock_symbols))
+            if not symbols:
+                return {}
+            cache = StockService.get_quote_cache()
+            if cache:
+                return cache.get_prices(symbols, StockService._load_prices)
+            return StockService._load_prices(symbols)
+        except Exception as e:
+            logger.error(f"Error fetching stock prices for {stock_symbols}: {e}")
+            raise e
+
+    @staticmethod
+    def price_history_query(stock_symbol, start=None, end=None):
+        """
+        Build the filter of the candles of a stock between start (inclusive) and end (exclusive).
+        """
+        query = {"symbol": stock_symbol}
+        if start or end:
+            query["start"] = {}
+            if start:
+                query["start"]["$gte"] = start
+            if end:
+                query["start"]["$lt"] = end
+        return query
+
+    @staticmethod
+    def get_price_history(stock_symbol, interval, limit, start=None, end=None):
+        """
+        Fetch OHLC candles of a stock at the given resolution.
+
+        Candles are read from the pre-aggregated collection of the interval,
+        so raw ticks are never scanned.
+
+        Args:
+            stock_symbol (str): The symbol of the stock.
+            interval (str): One of the keys of CANDLE_COLLECTIONS.
+            limit (int): The maximum number of candles to return.
+            start (datetime, optional): Only return candles starting at or after this time.
+            end (datetime, optional): Only return candles starting before this time.
+
+        Returns:
+            list: The candles in chronological order.
+        """
+        try:
+            candles_cursor = mongo.db[CANDLE_COLLECTIONS[interval]].find(
+                StockService.price_history_query(stock_symbol, start, end),
+                CANDLE_PROJECTION
+            ).sort("start", -1).limit(limit)
+
+            candles = [{**candle, "start": candle["start"].isoformat()} for candle in candles_cursor]
+            candles.reverse()
+            return candles
+        except Exception as e:
+            logger.error(f"Error fetching {interval} price history for {stock_symbol}: {e}")
+            raise e
+
+    @staticmethod
+    def update_stock_prices(model=None):
         """
         Update the prices of all stocks in the database.
 
-        Simulates price changes based on random percentage changes.
+        Advances every stock with a sector by one vectorized tick of the shared
+        pricing engine and commits the new prices with a single bulk write.
         Updates the high, low, and change values of each stock.
+
+        Args:
+            model (str, optional): The price model, defaults to the PRICE_MODEL setting.
+
+        Returns:
+            int: The number of stocks updated.
         """
+        # NumPy is only loaded when a tick is actually run
+        from common.pricing import PricingEngine
+
         try:
-            stocks = mongo.db.stocks.find()
-            for stock in stocks:
-                sector = stock.get('sector')
-                if sector:
-                    old_price = stock['price']
-                    percentage_change = random.uniform(-10, 10)
-                    new_price = old_price * (1 + percentage_change / 100.0)
-                    new_high = max(stock.get('high', new_price), new_price)
-                    new_low = min(stock.get('low', new_price), new_price)
-                    price_change = new_price - old_price
-
-                    mongo.db.stocks.update_one(
-                        {'_id': stock['_id']},
-                        {'$set': {
-                            'price': new_price,
-                            'high': new_high,
-                            'low': new_low,
-                            'change': price_change,
-                            'last_update': datetime.now()
-                        }}
-                    )
-
-
-                    logger.info(f"Updated stock {stock['symbol']} price to {new_price}")
-                    time.sleep(5)  # Simulate delay
+            model = model or os.getenv('PRICE_MODEL', 'additive')
+            sector_interest = {
+                trend['sector']: trend.get('live_interest', 0)
+                for trend in mongo.db.trends.find({}, {"_id": 0, "sector": 1, "live_interest": 1})
+            }
+            engine = PricingEngine(model).load(
+                mongo.db.stocks.find({"sector": {"$nin": [None, ""]}}, PRICING_PROJECTION),
+                sector_interest
+            )
+            engine.tick()
+
+            now = datetime.now()
+            operations = [
+                UpdateOne(
+                    {'_id': stock_id},
+                    {'$set': {
+                        'price': price,
+                        'high': high,
+                        'low': low,
+                        'change': change,
+                        'anchor_price': anchor,
+                        'last_update': now
+                    }}
+                )
+                for stock_id, symbol, price, change, high, low, anchor in engine.updates()
+            ]
+            if operations:
+                mongo.db.stocks.bulk_write(operations, ordered=False)
+
+            cache = StockService.get_quote_cache()
+            if cache:
+                cache.put_prices({symbol: price for symbol, price in zip(engine.symbols, engine.price.tolist())})
+
+            logger.info(f"Updated {len(operations)} stock prices with the {model} model")
+            return len(operations)
         except Exception as e:
             logger.error(f"Error updating stock prices: {e}")
             raise e
 
+    @staticmethod
+    def get_trade_price(stock_symbol):
+        """
+        Fetch the price a trade executes at, from the primary rather than the quote cache.
+
+        Returns:
+            float: The current price of the stock if found, otherwise None.
+        """
+        stock = mongo.trades.stocks.find_one({"symbol": stock_symbol}, {"_id": 0, "price": 1})
+        return stock['price'] if stock else None
+
+    @staticmethod
+    def price_impact_update(quantity, is_buying):
+        """
+        Build the pipeline update moving a stock's price by the impact of a trade.
+
+        Returns:
+            tuple: The price change and the pipeline.
+        """
+        price_change = PRICE_IMPACT_PER_SHARE * quantity if is_buying else -PRICE_IMPACT_PER_SHARE * quantity
+        return price_change, [
+            {"$set": {
+                "price": {"$add": ["$price", price_change]},
+                "change": price_change,
+                "last_update": datetime.now()
+            }},
+            {"$set": {
+                "high": {"$max": [{"$ifNull": ["$high", "$price"]}, "$price"]},
+                "low": {"$min": [{"$ifNull": ["$low", "$price"]}, "$price"]}
+            }}
+        ]
+
+    @staticmethod
+    def impacted_quote(stock, price_change):
+        """
+        Compute the quote written by the price impact pipeline from the stock before the update.
+        """
+        new_price = stock['price'] + price_change
+        return {
+            "price": new_price,
+            "change": price_change,
+            "high": max(stock.get("high") or new_price, new_price),
+            "low": min(stock.get("low") or new_price, new_price)
+        }
+
+    @staticmethod
+    def apply_price_impact(stock_symbol, quantity, is_buying):
+        """
+        Atomically move the price of a stock by the impact of a trade.
+
+        The price, high, low and change are updated in a single server-side
+        pipeline update, so concurrent trades on the same stock never lose updates.
+
+        Args:
+            stock_symbol (str): The symbol of the stock.
+            quantity (int): The quantity of stock being bought or sold.
+            is_buying (bool): True if buying, False if selling.
+
+        Returns:
+            float: The price of the stock before the impact, or None if the stock was not found.
+        """
+        price_change, pipeline = StockService.price_impact_update(quantity, is_buying)
+        stock = mongo.trades.stocks.find_one_and_update(
+            {"symbol": stock_symbol},
+            pipeline,
+            projection=IMPACT_PROJECTION,
+            return_document=ReturnDocument.BEFORE
+        )
+        if not stock:
+            return None
+
+        # Push the quote the pipeline just wrote to every process
+        cache = StockService.get_quote_cache()
+        if cache:
+            cache.put_quotes({stock_symbol: StockService.impacted_quote(stock, price_change)})
+        return stock['price']
+
     @staticmethod
     def update_stock_price(stock_symbol, quantity, is_buying):
         """
@@ -111,32 +348,12 @@ class StockService:
             float: The new price of the stock if successful, otherwise an error message.
         """
         try:
-            stock = mongo.db.stocks.find_one({"symbol": stock_symbol})
-            if not stock:
+            old_price = StockService.apply_price_impact(stock_symbol, quantity, is_buying)
+            if old_price is None:
                 return {"error": f"Stock '{stock_symbol}' not found"}
 
-            price_change = 0.02 * quantity  # Adjust this factor as needed
-            new_price = stock['price'] + price_change if is_buying else stock['price'] - price_change
-
-            old_price = stock['price']
-            new_high = max(stock.get('high', new_price), new_price)
-            new_low = min(stock.get('low', new_price), new_price)
-            price_change = new_price - old_price
-
-            result = mongo.db.stocks.update_one(
-                {'_id': stock['_id']},
-                {'$set': {
-                    'price': new_price,
-                    'high': new_high,
-                    'low': new_low,
-                    'change': price_change,
-                    'last_update': datetime.now()
-                }}
-            )
-
-            if result.matched_count == 0:
-                logger.error(f"Failed to update stock '{stock_symbol}' in the database")
-                return {"error": f"Failed to update stock '{stock_symbol}' in the database"}
+            price_change = PRICE_IMPACT_PER_SHARE * quantity
+            new_price = old_price + price_change if is_buying else old_price - price_change
 
             logger.info(f"Updated stock {stock_symbol} price to {new_price}")
             return new_price
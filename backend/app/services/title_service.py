@@ -0,0 +1,48 @@
+from app import mongo
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seconds a loaded titles map is reused before the titles collection is read again
+TITLES_CACHE_TTL = 60
+
+class TitleService:
+    _titles = None
+    _loaded_at = 0.0
+
+    @staticmethod
+    def get_titles():
+        """
+        Fetch all titles as a mapping of level to title name.
+
+        The titles collection is small and rarely changes, so the mapping is
+        cached in-process for TITLES_CACHE_TTL seconds.
+
+        Returns:
+            dict: A mapping of title level to title name.
+        """
+        if TitleService._titles is None or time.monotonic() - TitleService._loaded_at > TITLES_CACHE_TTL:
+            try:
+                TitleService._titles = {
+                    title['level']: title['title']
+                    for title in mongo.db.titles.find({}, {"_id": 0, "level": 1, "title": 1})
+                }
+                TitleService._loaded_at = time.monotonic()
+            except Exception as e:
+                logger.error(f"Error fetching titles: {e}")
+                raise e
+        return TitleService._titles
+
+    @staticmethod
+    def resolve(title_level):
+        """
+        Resolve a title level to its level and name.
+
+        Returns:
+            dict: The title level and name, or level -1 and "none" if the level has no title.
+        """
+        name = TitleService.get_titles().get(title_level) if title_level != -1 else None
+        if name is None:
+            return {"level": -1, "name": "none"}
+        return {"level": title_level, "name": name}
@@ -0,0 +1,140 @@
+from collections import OrderedDict, deque
+import json
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seconds a fill result stays available to the status endpoint
+STATUS_TTL = 24 * 3600
+
+# Results kept by the in-process queue before the oldest are dropped
+LOCAL_STATUS_LIMIT = 10000
+
+
+class LocalTradeQueue:
+    """
+    In-process stand-in for the Redis stream, for development and tests.
+
+    Orders are lost when the process exits, and every worker must live in the
+    process that enqueued the order.
+    """
+
+    def __init__(self):
+        self._entries = deque()
+        self._pending = {}
+        self._statuses = OrderedDict()
+        self._condition = threading.Condition()
+        self._next_id = 0
+
+    def enqueue(self, order):
+        with self._condition:
+            self._next_id += 1
+            self._entries.append((str(self._next_id), order))
+            self._condition.notify()
+
+    def read(self, consumer, count, block):
+        """
+        Take up to count orders, waiting up to block seconds for the first one.
+
+        Returns:
+            list: (entry_id, order) tuples, which stay pending until acknowledged.
+        """
+        with self._condition:
+            if not self._entries:
+                self._condition.wait(block)
+            batch = []
+            while self._entries and len(batch) < count:
+                entry_id, order = self._entries.popleft()
+                self._pending[entry_id] = order
+                batch.append((entry_id, order))
+            return batch
+
+    def ack(self, entry_ids):
+        with self._condition:
+            for entry_id in entry_ids:
+                self._pending.pop(entry_id, None)
+
+    def set_status(self, order_id, status):
+        with self._condition:
+            self._statuses[order_id] = status
+            self._statuses.move_to_end(order_id)
+            while len(self._statuses) > LOCAL_STATUS_LIMIT:
+                self._statuses.popitem(last=False)
+
+    def get_status(self, order_id):
+        with self._condition:
+            return self._statuses.get(order_id)
+
+    def depth(self):
+        with self._condition:
+            return {"queued": len(self._entries), "pending": len(self._pending)}
+
+
+class RedisTradeQueue:
+    """
+    Durable trade queue on a Redis stream, drained through a consumer group.
+
+    Orders survive API restarts: entries read by a consumer stay pending until
+    acknowledged, and entries left pending by a crashed consumer are claimed
+    again once they have been idle for claim_idle seconds.
+    """
+
+    def __init__(self, redis_client, stream='trades:queue', group='trade-workers', claim_idle=60):
+        self.redis = redis_client
+        self.stream = stream
+        self.group = group
+        self.claim_idle_ms = int(claim_idle * 1000)
+        self._claimed_at = 0
+        try:
+            self.redis.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except Exception as e:
+            # The group already exists when another API process created it first
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def enqueue(self, order):
+        self.redis.xadd(self.stream, {"order": json.dumps(order)})
+
+    def read(self, consumer, count, block):
+        """
+        Take up to count orders, reclaiming stale pending entries first.
+
+        Returns:
+            list: (entry_id, order) tuples, which stay pending until acknowledged.
+        """
+        entries = []
+        if time.monotonic() - self._claimed_at > self.claim_idle_ms / 1000:
+            self._claimed_at = time.monotonic()
+            _, entries, *_ = self.redis.xautoclaim(
+                self.stream, self.group, consumer, self.claim_idle_ms, start_id='0-0', count=count
+            )
+        if not entries:
+            response = self.redis.xreadgroup(self.group, consumer, {self.stream: '>'}, count=count, block=int(block * 1000))
+            entries = response[0][1] if response else []
+
+        batch = []
+        for entry_id, fields in entries:
+            if not fields:
+                # Trimmed while pending: nothing left to apply
+                self.ack([entry_id])
+                continue
+            batch.append((entry_id, json.loads(fields[b'order'])))
+        return batch
+
+    def ack(self, entry_ids):
+        if entry_ids:
+            self.redis.xack(self.stream, self.group, *entry_ids)
+            self.redis.xdel(self.stream, *entry_ids)
+
+    def set_status(self, order_id, status):
+        self.redis.set(f'trades:status:{order_id}', json.dumps(status), ex=STATUS_TTL)
+
+    def get_status(self, order_id):
+        status = self.redis.get(f'trades:status:{order_id}')
+        return json.loads(status) if status else None
+
+    def depth(self):
+        pending = self.redis.xpending(self.stream, self.group)['pending']
+        return {"queued": max(self.redis.xlen(self.stream) - pending, 0), "pending": pending}
@@ -0,0 +1,213 @@
+from app import mongo
+from app.config import Config
+from bson import ObjectId
+from .trade_queue import LocalTradeQueue, RedisTradeQueue
+from .transaction_service import TransactionService
+from datetime import datetime
+import os
+import threading
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seconds a worker waits for new orders before checking the queue again
+READ_BLOCK_SECONDS = 1.0
+
+TRADE_TYPES = ('buy', 'sell')
+
+# Messages of TransactionService that mean the trade went through
+FILLED_MESSAGES = ("Stock purchased successfully", "Stock sold successfully")
+
+
+class TradeQueueService:
+    """
+    Write-behind execution of trades.
+
+    When enabled, the trade routes only validate and enqueue the order and
+    answer 202; a pool of worker threads drains the queue in batches, applies
+    each order through TransactionService and records its result for the
+    status endpoint.
+    """
+    _queue = None
+    _workers = []
+    _lock = threading.Lock()
+    _stats = {"processed": 0, "filled": 0, "rejected": 0, "failed": 0, "batches": 0}
+
+    @staticmethod
+    def enabled():
+        return Config.TRADE_QUEUE in ('local', 'redis')
+
+    @staticmethod
+    def get_queue():
+        """
+        Create the configured queue on first use.
+
+        Returns:
+            LocalTradeQueue | RedisTradeQueue: The queue of this process.
+        """
+        with TradeQueueService._lock:
+            if TradeQueueService._queue is None:
+                if Config.TRADE_QUEUE == 'redis':
+                    import redis
+                    TradeQueueService._queue = RedisTradeQueue(redis.Redis.from_url(Config.REDIS_URL))
+                else:
+                    TradeQueueService._queue = LocalTradeQueue()
+            return TradeQueueService._queue
+
+    @staticmethod
+    def start_workers():
+        """
+        Start the worker pool of this process, if the queue is enabled and the pool is not running.
+        """
+        if not TradeQueueService.enabled():
+            return
+        queue = TradeQueueService.get_queue()
+        with TradeQueueService._lock:
+            TradeQueueService._workers = [worker for worker in TradeQueueService._workers if worker.is_alive()]
+            while len(TradeQueueService._workers) < Config.TRADE_QUEUE_WORKERS:
+                consumer = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+                worker = threading.Thread(
+                    target=TradeQueueService._work, args=(queue, consumer), name=f"trade-worker-{consumer}", daemon=True
+                )
+                worker.start()
+                TradeQueueService._workers.append(worker)
+        logger.info(f"Trade queue ({Config.TRADE_QUEUE}) drained by {Config.TRADE_QUEUE_WORKERS} workers")
+
+    @staticmethod
+    def submit(user_id, trade_type, data):
+        """
+        Validate a trade and enqueue it.
+
+        Args:
+            user_id (str): The ID of the user placing the trade.
+            trade_type (str): 'buy' or 'sell'.
+            data (dict): The trade payload with 'stock_symbol' and 'quantity'.
+
+        Returns:
+            dict: The 'order_id' and 'status' of the queued order, or an 'error' message.
+        """
+        quantity = data.get('quantity')
+        stock_symbol = data.get('stock_symbol')
+        if trade_type not in TRADE_TYPES:
+            return {"error": "Invalid trade type"}
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+            return {"error": "Invalid quantity"}
+        if not isinstance(stock_symbol, str) or not stock_symbol:
+            return {"error": "Missing stock symbol"}
+
+        order_id = uuid.uuid4().hex
+        order = {
+            "order_id": order_id,
+            "user_id": str(user_id),
+            "type": trade_type,
+            "stock_symbol": stock_symbol.upper(),
+            "quantity": quantity,
+            "queued_at": datetime.now().isoformat()
+        }
+
+        queue = TradeQueueService.get_queue()
+        # The status is written first, so it can be polled as soon as the order is acknowledged
+        queue.set_status(order_id, {**order, "status": "queued"})
+        queue.enqueue(order)
+        TradeQueueService.start_workers()
+        logger.info(f"Queued {trade_type} order {order_id} for user {user_id}")
+        return {"order_id": order_id, "status": "queued"}
+
+    @staticmethod
+    def get_status(user_id, order_id):
+        """
+        Fetch the result of one of the user's queued orders.
+
+        Returns:
+            dict: The order and its 'status' ('queued', 'filled', 'rejected' or 'failed'),
+                or None if it is unknown, expired or belongs to another user.
+        """
+        status = TradeQueueService.get_queue().get_status(order_id)
+        if not status or status.get('user_id') != str(user_id):
+            return None
+        return status
+
+    @staticmethod
+    def get_metrics():
+        """
+        Report the queue depth and the counters of this process's workers.
+
+        Returns:
+            dict: The queue 'mode', 'queued' and 'pending' depths, the number of live
+                'workers', and the processed/filled/rejected/failed/batches counters.
+        """
+        if not TradeQueueService.enabled():
+            return {"mode": Config.TRADE_QUEUE}
+        metrics = {"mode": Config.TRADE_QUEUE, **TradeQueueService.get_queue().depth()}
+        with TradeQueueService._lock:
+            metrics["workers"] = sum(worker.is_alive() for worker in TradeQueueService._workers)
+            metrics.update(TradeQueueService._stats)
+        return metrics
+
+    @staticmethod
+    def _apply(order):
+        # A crash after the trade but before its status was written redelivers the order:
+        # its transaction, unique by order_id, tells that it was already applied
+        if mongo.trades.transactions.find_one({"order_id": order['order_id']}, {"_id": 1}):
+            logger.info(f"Queued order {order['order_id']} was already applied")
+            return "filled", FILLED_MESSAGES[TRADE_TYPES.index(order['type'])]
+
+        data = {
+            "order_id": order['order_id'],
+            "user_id": order['user_id'],
+            "stock_symbol": order['stock_symbol'],
+            "quantity": order['quantity']
+        }
+        if order['type'] == 'buy':
+            result = TransactionService.buy_stock(data)
+        else:
+            result = TransactionService.sell_stock(data)
+
+        message = result.get('message')
+        if message in FILLED_MESSAGES:
+            return "filled", message
+        if message == "Internal Server Error":
+            return "failed", message
+        return "rejected", message
+
+    @staticmethod
+    def _work(queue, consumer):
+        """
+        Drain the queue in batches until the process exits.
+        """
+        while True:
+            try:
+                batch = queue.read(consumer, Config.TRADE_QUEUE_BATCH_SIZE, READ_BLOCK_SECONDS)
+            except Exception as e:
+                logger.error(f"Trade worker {consumer} could not read the queue: {e}")
+                time.sleep(READ_BLOCK_SECONDS)
+                continue
+            if not batch:
+                continue
+
+            counts = {"filled": 0, "rejected": 0, "failed": 0}
+            for entry_id, order in batch:
+                # A redelivered order that already has a result must not be applied twice
+                previous = queue.get_status(order['order_id'])
+                if previous and previous.get('status') != 'queued':
+                    continue
+
+                try:
+                    status, message = TradeQueueService._apply(order) if ObjectId.is_valid(order['user_id']) else ("rejected", "User not found")
+                except Exception as e:
+                    logger.error(f"Error applying queued order {order['order_id']}: {e}")
+                    status, message = "failed", "Internal Server Error"
+                counts[status] += 1
+                queue.set_status(order['order_id'], {
+                    **order, "status": status, "message": message, "processed_at": datetime.now().isoformat()
+                })
+
+            queue.ack([entry_id for entry_id, _ in batch])
+            with TradeQueueService._lock:
+                TradeQueueService._stats["batches"] += 1
+                TradeQueueService._stats["processed"] += sum(counts.values())
+                for status, count in counts.items():
+                    TradeQueueService._stats[status] += count
+            logger.info(f"Trade worker {consumer} applied {len(batch)} orders: {counts}")
@@ -1,74 +1,97 @@
 from app import mongo
 from bson import ObjectId
+from pymongo import DESCENDING
+from common.holdings import credit_holding, debit_holding
 from .stock_service import StockService
+from .leaderboard_service import LeaderboardService
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
 class TransactionService:
+    @staticmethod
+    def parse_trade(data):
+        """
+        Read the user, stock and quantity of a buy or sell request (shared with the async service).
+
+        Returns:
+            tuple: The user ObjectId, the upper-cased stock symbol, and the quantity,
+                or None for a quantity that is not a positive integer.
+        """
+        quantity = data['quantity']
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+            quantity = None
+        return ObjectId(data['user_id']), data['stock_symbol'].upper(), quantity
+
+    @staticmethod
+    def build_transaction(user_id, stock_symbol, quantity, price, transaction_type, order_id=None):
+        """
+        Build the transaction document of an executed trade.
+
+        The 'order_id' of a queued order is unique among transactions, which
+        tells whether a redelivered order was already applied.
+        """
+        transaction = {
+            "user_id": user_id,
+            "stock_symbol": stock_symbol,
+            "quantity": quantity,
+            "price": price,
+            "total_price": price * quantity,
+            "type": transaction_type,
+            "date": datetime.now()
+        }
+        if order_id:
+            transaction["order_id"] = order_id
+        return transaction
+
     @staticmethod
     def buy_stock(data):
         """
         Buy a stock.
         
         Expects data to contain 'user_id', 'stock_symbol', and 'quantity'.
-        Fetches the current stock price, updates user's portfolio and balance,
-        and logs the transaction in the transactions collection.
+        Atomically debits the user's balance at the current price and credits their
+        holding, then applies the price impact to the stock and logs the transaction
+        in the transactions collection. A purchase the user cannot afford leaves the
+        price untouched. The user's leaderboard entry is refreshed in the background.
         
         Args:
-            data (dict): Dictionary containing 'user_id', 'stock_symbol', and 'quantity'.
+            data (dict): Dictionary containing 'user_id', 'stock_symbol', 'quantity', and
+                optionally the 'order_id' of a queued order.
         
         Returns:
             dict: A success message if the purchase is successful, or an error message otherwise.
         """
-        user_id = ObjectId(data['user_id'])
-        stock_symbol = data['stock_symbol'].upper()
-        quantity = data['quantity']
+        user_id, stock_symbol, quantity = TransactionService.parse_trade(data)
+        if quantity is None:
+            logger.warning(f"Invalid quantity {data['quantity']} for purchase of {stock_symbol} by user {user_id}")
+            return {"message": "Invalid quantity"}
 
         try:
             logger.info(f"Attempting to buy stock {stock_symbol} for user {user_id} with quantity {quantity}")
-            price = StockService.get_stock_price(stock_symbol)
+            # The user is guarded before the price moves, so a rejected trade never moves the price
+            price = StockService.get_trade_price(stock_symbol)
             if price is None:
                 logger.warning(f"Stock {stock_symbol} not found")
                 return {"message": "Stock not found"}
 
-            user = mongo.db.users.find_one({"_id": user_id})
-            if user and user['balance'] >= (total_price := price * quantity):
-                portfolio = user.get('portfolio', [])
-                stock_exists = False
-
-                for stock in portfolio:
-                    if stock['stock_symbol'] == stock_symbol:
-                        stock['quantity'] += quantity
-                        stock_exists = True
-                        break
-
-                if not stock_exists:
-                    portfolio.append({"stock_symbol": stock_symbol, "quantity": quantity})
-
-                mongo.db.users.update_one(
-                    {"_id": user_id},
-                    {"$set": {"balance": user['balance'] - total_price, "portfolio": portfolio}}
-                )
-
-                transaction = {
-                    "user_id": user_id,
-                    "stock_symbol": stock_symbol,
-                    "quantity": quantity,
-                    "price": price,
-                    "total_price": total_price,
-                    "type": "buy",
-                    "date": datetime.now()
-                }
-                mongo.db.transactions.insert_one(transaction)
-
-                logger.info(f"Stock {stock_symbol} purchased successfully for user {user_id}")
-
-                StockService.update_stock_price(stock_symbol, quantity, is_buying=True)
-                return {"message": "Stock purchased successfully"}
-            logger.warning(f"User {user_id} has insufficient balance or user not found")
-            return {"message": "Insufficient balance" if user else "User not found"}
+            total_price = price * quantity
+            user = credit_holding(mongo.trades.users, user_id, stock_symbol, quantity, total_price, projection={"_id": 1})
+            if not user:
+                exists = mongo.trades.users.find_one({"_id": user_id}, {"_id": 1})
+                logger.warning(f"User {user_id} has insufficient balance or user not found")
+                return {"message": "Insufficient balance" if exists else "User not found"}
+
+            StockService.apply_price_impact(stock_symbol, quantity, is_buying=True)
+            mongo.trades.transactions.insert_one(TransactionService.build_transaction(
+                user_id, stock_symbol, quantity, price, "buy", order_id=data.get('order_id')
+            ))
+
+            logger.info(f"Stock {stock_symbol} purchased successfully for user {user_id}")
+
+            LeaderboardService.schedule_refresh(user_id)
+            return {"message": "Stock purchased successfully"}
         except Exception as e:
             logger.error(f"Error processing stock purchase for user {user_id}: {e}")
             return {"message": "Internal Server Error"}
@@ -79,96 +102,133 @@ class TransactionService:
         Sell a stock.
         
         Expects data to contain 'user_id', 'stock_symbol', and 'quantity'.
-        Fetches the current stock price, updates user's portfolio and balance,
-        and logs the transaction in the transactions collection.
+        Atomically debits the user's holding and credits their balance at the current
+        price, then applies the price impact to the stock and logs the transaction in
+        the transactions collection. A sale of shares the user does not hold leaves
+        the price untouched. The user's leaderboard entry is refreshed in the background.
         
         Args:
-            data (dict): Dictionary containing 'user_id', 'stock_symbol', and 'quantity'.
+            data (dict): Dictionary containing 'user_id', 'stock_symbol', 'quantity', and
+                optionally the 'order_id' of a queued order.
         
         Returns:
             dict: A success message if the sale is successful, or an error message otherwise.
         """
-        user_id = ObjectId(data['user_id'])
-        stock_symbol = data['stock_symbol'].upper()
-        quantity = data['quantity']
+        user_id, stock_symbol, quantity = TransactionService.parse_trade(data)
+        if quantity is None:
+            logger.warning(f"Invalid quantity {data['quantity']} for sale of {stock_symbol} by user {user_id}")
+            return {"message": "Invalid quantity"}
 
         try:
             logger.info(f"Attempting to sell stock {stock_symbol} for user {user_id} with quantity {quantity}")
-            price = StockService.get_stock_price(stock_symbol)
+            price = StockService.get_trade_price(stock_symbol)
             if price is None:
                 logger.warning(f"Stock {stock_symbol} not found")
                 return {"message": "Stock not found"}
 
-            user = mongo.db.users.find_one({"_id": user_id})
-            if user:
-                portfolio = user.get('portfolio', [])
-                for stock in portfolio:
-                    if stock['stock_symbol'] == stock_symbol:
-                        if stock['quantity'] >= quantity:
-                            stock['quantity'] -= quantity
-                            if stock['quantity'] == 0:
-                                portfolio.remove(stock)
-                            break
-                else:
-                    logger.warning(f"User {user_id} has insufficient stock quantity of {stock_symbol} to sell")
-                    return {"message": "Insufficient stock quantity"}
-
-                new_balance = user['balance'] + price * quantity
-                mongo.db.users.update_one(
-                    {"_id": user_id},
-                    {"$set": {"balance": new_balance, "portfolio": portfolio}}
-                )
-
-                transaction = {
-                    "user_id": user_id,
-                    "stock_symbol": stock_symbol,
-                    "quantity": quantity,
-                    "price": price,
-                    "total_price": price * quantity,
-                    "type": "sell",
-                    "date": datetime.now()
-                }
-                mongo.db.transactions.insert_one(transaction)
-
-                logger.info(f"Stock {stock_symbol} sold successfully for user {user_id}")
-
-                StockService.update_stock_price(stock_symbol, quantity, is_buying=False)
-                return {"message": "Stock sold successfully"}
-            logger.warning(f"User {user_id} not found")
-            return {"message": "User not found"}
+            total_price = price * quantity
+            user = debit_holding(
+                mongo.trades.users, user_id, stock_symbol, quantity, total_price,
+                projection={"portfolio": {"$elemMatch": {"stock_symbol": stock_symbol}}}
+            )
+            if not user:
+                if not mongo.trades.users.find_one({"_id": user_id}, {"_id": 1}):
+                    logger.warning(f"User {user_id} not found")
+                    return {"message": "User not found"}
+                logger.warning(f"User {user_id} has insufficient stock quantity of {stock_symbol} to sell")
+                return {"message": "Insufficient stock quantity"}
+
+            StockService.apply_price_impact(stock_symbol, quantity, is_buying=False)
+            mongo.trades.transactions.insert_one(TransactionService.build_transaction(
+                user_id, stock_symbol, quantity, price, "sell", order_id=data.get('order_id')
+            ))
+
+            logger.info(f"Stock {stock_symbol} sold successfully for user {user_id}")
+
+            LeaderboardService.schedule_refresh(user_id)
+            return {"message": "Stock sold successfully"}
         except Exception as e:
             logger.error(f"Error processing stock sale for user {user_id}: {e}")
             return {"message": "Internal Server Error"}
 
     @staticmethod
-    def get_transactions(user_id=None):
+    def encode_cursor(transaction):
+        """
+        Build the opaque 'before' cursor pointing at a transaction.
+        """
+        return f"{transaction['date'].isoformat()}_{transaction['_id']}"
+
+    @staticmethod
+    def decode_cursor(cursor):
         """
-        Fetch transactions.
+        Parse a 'before' cursor into its (date, _id) pair.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        date, _, transaction_id = cursor.partition('_')
+        if not ObjectId.is_valid(transaction_id):
+            raise ValueError(f"Invalid cursor: {cursor}")
+        return datetime.fromisoformat(date), ObjectId(transaction_id)
+
+    @staticmethod
+    def transactions_query(user_id=None, before=None, stock_symbol=None, transaction_type=None):
+        """
+        Build the filter of a page of transactions (see get_transactions).
+
+        Raises:
+            ValueError: If the 'before' cursor is malformed.
+        """
+        query = {"user_id": ObjectId(user_id)} if user_id else {}
+        if stock_symbol:
+            query["stock_symbol"] = stock_symbol.upper()
+        if transaction_type:
+            query["type"] = transaction_type
+        if before:
+            date, transaction_id = TransactionService.decode_cursor(before)
+            query["$or"] = [
+                {"date": {"$lt": date}},
+                {"date": date, "_id": {"$lt": transaction_id}}
+            ]
+        return query
+
+    @staticmethod
+    def serialize_transaction(transaction):
+        """
+        Convert ObjectId and datetime fields for JSON, and add the transaction's cursor.
+        """
+        return {
+            **transaction,
+            '_id': str(transaction['_id']),
+            'user_id': str(transaction['user_id']),
+            'date': transaction['date'].isoformat(),
+            'cursor': TransactionService.encode_cursor(transaction)
+        }
+
+    @staticmethod
+    def get_transactions(user_id=None, limit=None, before=None, stock_symbol=None, transaction_type=None):
+        """
+        Fetch transactions, newest first.
         
         Optionally expects 'user_id' to filter transactions for a specific user.
+        Pages are addressed by a keyset cursor on (date, _id), so each page is a
+        bounded index range scan no matter how long the history is.
         Converts ObjectId and datetime to string for JSON serialization.
         
         Args:
             user_id (str, optional): The ID of the user to filter transactions for.
+            limit (int, optional): The maximum number of transactions to return.
+            before (str, optional): Only return transactions older than this cursor.
+            stock_symbol (str, optional): Only return transactions of this stock.
+            transaction_type (str, optional): Only return 'buy' or 'sell' transactions.
         
         Returns:
-            list: A list of transactions.
+            generator: The serialized transactions, lazily read from the cursor.
         """
-        try:
-            logger.info(f"Fetching transactions for user {user_id}" if user_id else "Fetching all transactions")
-            query = {"user_id": ObjectId(user_id)} if user_id else {}
-            transactions = mongo.db.transactions.find(query)
-            result = [
-                {
-                    **transaction,
-                    '_id': str(transaction['_id']),
-                    'user_id': str(transaction['user_id']),
-                    'date': transaction['date'].isoformat()
-                }
-                for transaction in transactions
-            ]
-            logger.info(f"Successfully fetched transactions for user {user_id}" if user_id else "Successfully fetched all transactions")
-            return result
-        except Exception as e:
-            logger.error(f"Error fetching transactions: {e}")
-            return {"message": "Internal Server Error"}
+        logger.info(f"Fetching transactions for user {user_id}" if user_id else "Fetching all transactions")
+        query = TransactionService.transactions_query(user_id, before, stock_symbol, transaction_type)
+        transactions = mongo.db.transactions.find(query).sort([("date", DESCENDING), ("_id", DESCENDING)])
+        if limit:
+            transactions = transactions.limit(limit)
+
+        return (TransactionService.serialize_transaction(transaction) for transaction in transactions)
@@ -1,31 +1,67 @@
 from app import mongo
-from pytrends.request import TrendReq
 from datetime import datetime
+import threading
 import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Seconds a fetched interest value is reused before Google Trends is queried again
+TRENDS_CACHE_TTL = 600
+
 class TrendsService:
-    pytrends = TrendReq(hl='en-US', tz=360)
+    _client = None
+    _client_lock = threading.Lock()
+    _cache = {}
+    _cache_lock = threading.Lock()
 
     @staticmethod
-    def get_trends_data(keyword):
+    def get_client():
+        """
+        Get the Google Trends client, creating it on first use.
+
+        pytrends (and pandas with it) is only imported here, so importing the
+        service or creating the app does not pay for it.
+        """
+        if TrendsService._client is None:
+            with TrendsService._client_lock:
+                if TrendsService._client is None:
+                    from pytrends.request import TrendReq
+                    TrendsService._client = TrendReq(hl='en-US', tz=360)
+        return TrendsService._client
+
+    @staticmethod
+    def get_trends_data(keyword, timeframe='now 1-H'):
         """
         Fetch interest data for a specific keyword using Google Trends.
+
+        Values are cached per keyword and timeframe for TRENDS_CACHE_TTL seconds.
         
         Args:
             keyword (str): The keyword to fetch trends data for.
+            timeframe (str): The Google Trends timeframe to query.
         
         Returns:
             float: The latest interest value for the keyword, or 0 if no data is found.
         """
+        cache_key = (keyword, timeframe)
+        with TrendsService._cache_lock:
+            cached = TrendsService._cache.get(cache_key)
+        if cached and time.monotonic() - cached[1] < TRENDS_CACHE_TTL:
+            return cached[0]
+
         try:
             logger.info(f"Fetching Google Trends data for keyword: {keyword}")
-            TrendsService.pytrends.build_payload([keyword], cat=0, timeframe='now 1-H', geo='', gprop='')
-            data = TrendsService.pytrends.interest_over_time()
-            interest_value = data[keyword].iloc[-1] if not data.empty else 0
+            client = TrendsService.get_client()
+            # The client holds the payload between the two calls, so they must not interleave
+            with TrendsService._client_lock:
+                client.build_payload([keyword], cat=0, timeframe=timeframe, geo='', gprop='')
+                data = client.interest_over_time()
+            interest_value = int(data[keyword].iloc[-1]) if not data.empty else 0
             logger.info(f"Google Trends data for '{keyword}': {interest_value}")
+
+            with TrendsService._cache_lock:
+                TrendsService._cache[cache_key] = (interest_value, time.monotonic())
             return interest_value
         except Exception as e:
             logger.error(f"Error fetching trends data for keyword '{keyword}': {e}")
@@ -59,6 +95,8 @@ class TrendsService:
                     'last_update': datetime.now()
                 }}
             )
+            from .stock_service import StockService
+            StockService.invalidate_quotes([stock['symbol']])
             logger.info(f"Updated stock price for sector '{sector}' to {new_price}")
         except ValueError as ve:
             logger.error(f"ValueError: {ve}")
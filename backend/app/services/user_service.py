@@ -1,12 +1,35 @@
 from app import mongo
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from werkzeug.security import generate_password_hash, check_password_hash
 from .stock_service import StockService
+from .title_service import TitleService
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Net worth history collections by interval, written by the worker after each price tick:
+# every tick's point bucketed per user and day, and the last point of each day
+NET_WORTH_COLLECTIONS = {
+    "tick": "net_worth_history",
+    "1d": "net_worth_1d"
+}
+
 class UserService:
+    @staticmethod
+    def new_user(username, password_hash):
+        """
+        Build the document of a new user, with a balance of 10000 and an empty portfolio.
+        """
+        return {
+            "username": username,
+            "password": password_hash,
+            "balance": 10000,
+            "portfolio": [],
+            "isAdmin": False,
+            "title_level": -1
+        }
+
     @staticmethod
     def register_user(data):
         """
@@ -21,19 +44,16 @@ class UserService:
             logger.info(f"Duplicate user not registered: {data['username']}")
             return {"message": "Duplicate user not registered"}
 
-        user = {
-            "username": data['username'],
-            "password": generate_password_hash(data['password']),
-            "balance": 10000,
-            "portfolio": [],
-            "isAdmin": False,
-            "title_level": -1
-        }
+        user = UserService.new_user(data['username'], generate_password_hash(data['password']))
         try:
             logger.info(f"Registering new user: {data['username']}")
             mongo.db.users.insert_one(user)
             logger.info(f"User {data['username']} registered successfully")
             return {"message": "User registered successfully"}
+        except DuplicateKeyError:
+            # A concurrent registration won the unique index on username
+            logger.info(f"Duplicate user not registered: {data['username']}")
+            return {"message": "Duplicate user not registered"}
         except Exception as e:
             logger.error(f"Error registering user {data['username']}: {e}")
             return {"message": "Error registering user"}
@@ -111,8 +131,9 @@ class UserService:
             user = mongo.db.users.find_one({"_id": ObjectId(user_id)}, {"portfolio": 1})
             if user and 'portfolio' in user:
                 portfolio = user['portfolio']
+                prices = StockService.get_prices(stock['stock_symbol'] for stock in portfolio)
                 for stock in portfolio:
-                    stock['price'] = StockService.get_stock_price(stock['stock_symbol'])
+                    stock['price'] = prices.get(stock['stock_symbol'])
                 logger.info(f"Portfolio fetched for user ID: {user_id}")
                 return portfolio
             logger.warning(f"No portfolio found for user ID: {user_id}")
@@ -157,18 +178,12 @@ class UserService:
                 logger.warning(f"No title found for user ID: {user_id}")
                 return {"level": -1, "name": "none"}  # User not found or title_level missing
 
-            # If the title_level is -1, the user has no title
-            if user['title_level'] == -1:
-                return {"level": -1, "name": "none"}
-
-            # Otherwise, fetch the corresponding title name from the titles collection
-            title = mongo.db.titles.find_one({"level": user['title_level']}, {"title": 1})
-            if title:
-                return {"level": user['title_level'], "name": title['title']}
-            else:
+            # Resolve the title name through the cached titles lookup
+            title = TitleService.resolve(user['title_level'])
+            if title['level'] == -1 and user['title_level'] != -1:
                 # Handle case where the title level does not have a corresponding entry
                 logger.warning(f"Title for level {user['title_level']} not found in titles collection")
-                return {"level": -1, "name": "none"}
+            return title
 
         except Exception as e:
             logger.error(f"Error fetching title for user ID {user_id}: {e}")
@@ -188,10 +203,8 @@ class UserService:
             assets_value = 0
             user = mongo.db.users.find_one({"_id": ObjectId(user_id)}, {"portfolio": 1})
             if user and 'portfolio' in user:
-                for stock in user['portfolio']:
-                    price = StockService.get_stock_price(stock['stock_symbol'])
-                    if price:
-                        assets_value += stock['quantity'] * price
+                prices = StockService.get_prices(stock['stock_symbol'] for stock in user['portfolio'])
+                assets_value = UserService.build_summary(user, prices, None)['assets_value']
                 logger.info(f"Assets value calculated for user ID: {user_id}")
             else:
                 logger.warning(f"No portfolio found for user ID: {user_id}")
@@ -201,3 +214,136 @@ class UserService:
             return 0
 
 
+
+    @staticmethod
+    def build_summary(user, prices, title):
+        """
+        Price the holdings of a user document.
+
+        Args:
+            user (dict): The user, with its balance and portfolio.
+            prices (dict): The prices of the held stocks by symbol.
+            title (dict): The resolved title of the user.
+
+        Returns:
+            dict: The balance, title, priced holdings, assets value and net worth.
+        """
+        holdings = []
+        assets_value = 0
+        for stock in user.get('portfolio', []):
+            price = prices.get(stock['stock_symbol'])
+            value = stock['quantity'] * price if price else 0
+            assets_value += value
+            holdings.append({**stock, "price": price, "value": value})
+
+        balance = user.get('balance', 0)
+        return {
+            "balance": balance,
+            "title": title,
+            "portfolio": holdings,
+            "assets_value": assets_value,
+            "net_worth": balance + assets_value
+        }
+
+    @staticmethod
+    def get_portfolio_summary(user_id):
+        """
+        Fetch everything the portfolio page shows in one pass.
+        Expects the 'user_id' as input.
+        Reads the user once, prices all holdings with a single bulk query and
+        resolves the title through the cached titles lookup.
+        Returns the balance, title, priced holdings, assets value and net worth,
+        or None if the user is not found.
+        """
+        try:
+            logger.info(f"Fetching portfolio summary for user ID: {user_id}")
+            user = mongo.db.users.find_one(
+                {"_id": ObjectId(user_id)},
+                {"_id": 0, "balance": 1, "portfolio": 1, "title_level": 1}
+            )
+            if not user:
+                logger.warning(f"User not found by ID: {user_id}")
+                return None
+
+            prices = StockService.get_prices(stock['stock_symbol'] for stock in user.get('portfolio', []))
+            return UserService.build_summary(user, prices, TitleService.resolve(user.get('title_level', -1)))
+        except Exception as e:
+            logger.error(f"Error fetching portfolio summary for user ID {user_id}: {e}")
+            raise e
+
+    @staticmethod
+    def net_worth_history_pipeline(user_id, interval, limit, start=None, end=None):
+        """
+        Build the aggregation reading the latest net worth points of a user, newest first.
+
+        Args:
+            user_id (str): The ID of the user.
+            interval (str): One of the keys of NET_WORTH_COLLECTIONS.
+            limit (int): The maximum number of points to return.
+            start (datetime, optional): Only return points at or after this time.
+            end (datetime, optional): Only return points before this time.
+
+        Returns:
+            list: The aggregation pipeline.
+        """
+        time_range = {}
+        if start:
+            time_range["$gte"] = start
+        if end:
+            time_range["$lt"] = end
+
+        query = {"user_id": ObjectId(user_id)}
+        pipeline = [{"$match": query}, {"$sort": {"start": -1}}]
+        if interval == "tick":
+            # Buckets start at midnight, so the one holding 'start' may begin before it
+            if time_range:
+                query["start"] = {**time_range}
+                if start:
+                    query["start"]["$gte"] = start.replace(hour=0, minute=0, second=0, microsecond=0)
+            # Points are appended in time order: reversing each bucket keeps the unwound points newest first
+            pipeline += [
+                {"$project": {"_id": 0, "points": {"$reverseArray": "$points"}}},
+                {"$unwind": "$points"},
+                {"$replaceRoot": {"newRoot": "$points"}}
+            ]
+            if time_range:
+                pipeline.append({"$match": {"t": time_range}})
+        elif time_range:
+            query["start"] = time_range
+
+        pipeline += [
+            {"$limit": limit},
+            {"$project": {"_id": 0, "time": "$t", "cash": "$c", "invested": "$i", "net_worth": {"$add": ["$c", "$i"]}}}
+        ]
+        return pipeline
+
+    @staticmethod
+    def get_net_worth_history(user_id, interval, limit, start=None, end=None):
+        """
+        Fetch the net worth history of a user at the given resolution.
+
+        Points are snapshots of the cash balance and holdings value taken by the
+        worker after each price tick, so no portfolio is priced on request.
+
+        Args:
+            user_id (str): The ID of the user.
+            interval (str): One of the keys of NET_WORTH_COLLECTIONS.
+            limit (int): The maximum number of points to return.
+            start (datetime, optional): Only return points at or after this time.
+            end (datetime, optional): Only return points before this time.
+
+        Returns:
+            list: The points in chronological order.
+        """
+        try:
+            logger.info(f"Fetching {interval} net worth history for user ID: {user_id}")
+            points_cursor = mongo.reads[NET_WORTH_COLLECTIONS[interval]].aggregate(
+                UserService.net_worth_history_pipeline(user_id, interval, limit, start, end)
+            )
+
+            points = [{**point, "time": point["time"].isoformat()} for point in points_cursor]
+            points.reverse()
+            return points
+        except Exception as e:
+            logger.error(f"Error fetching {interval} net worth history for user ID {user_id}: {e}")
+            raise e
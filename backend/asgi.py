@@ -0,0 +1,4 @@
+from app.aio import create_async_app
+
+# Serve with an ASGI server, e.g. `uvicorn asgi:app`
+app = create_async_app()
@@ -0,0 +1,191 @@
+"""
+Generate synthetic users, stocks, titles and news and load them into MongoDB.
+
+Documents have the same shape as the ones the API writes. Every user shares
+one password, so a single hash is computed however many users are created,
+and users are generated and inserted in independent chunks, in parallel with
+--workers:
+
+    PYTHONPATH=.. python -m benchmarks.datagen --users 1000000 --stocks 10000 --workers 8 --drop
+"""
+import argparse
+import multiprocessing
+import random
+import string
+import time
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient
+from werkzeug.security import generate_password_hash
+
+DEFAULT_MONGO_URI = 'mongodb://localhost:27017/pepo_benchmark'
+
+# Password of every synthetic user
+PASSWORD = 'benchmark'
+
+SECTORS = ['Technology', 'Healthcare', 'Finance', 'Energy', 'Retail', 'Media', 'Transport', 'Food']
+
+# Documents sent to MongoDB per insert_many call
+CHUNK_SIZE = 10000
+
+
+def username(index):
+    return f'user{index:07d}'
+
+
+def symbol(index):
+    # Base-26 symbols: A..Z, BA.., so every index maps to a distinct symbol
+    letters = ''
+    while True:
+        index, remainder = divmod(index, 26)
+        letters = string.ascii_uppercase[remainder] + letters
+        if not index:
+            return letters.rjust(3, 'A')
+
+
+def generate_stocks(count, rng):
+    now = datetime.now()
+    for index in range(count):
+        price = round(rng.uniform(5, 500), 2)
+        yield {
+            'symbol': symbol(index),
+            'name': f'Synthetic {symbol(index)} Corp',
+            'sector': SECTORS[index % len(SECTORS)],
+            'price': price,
+            'high': price,
+            'low': price,
+            'change': 0.0,
+            'volatility_factor': round(rng.uniform(0.5, 2.0), 2),
+            'trend_direction': 0.0,
+            'last_update': now,
+        }
+
+
+def generate_users(start, count, stock_count, holdings, rng, password_hash):
+    """
+    Yield the users start to start + count, each holding a random number of stocks, up to holdings.
+    """
+    for index in range(start, start + count):
+        held = rng.sample(range(stock_count), min(rng.randint(0, holdings), stock_count))
+        yield {
+            'username': username(index),
+            'password': password_hash,
+            'balance': round(rng.uniform(1000, 100000), 2),
+            'portfolio': [{'stock_symbol': symbol(stock), 'quantity': rng.randint(1, 100)} for stock in held],
+            'isAdmin': False,
+            'title_level': -1,
+        }
+
+
+def generate_titles():
+    names = ['Intern', 'Analyst', 'Trader', 'Broker', 'Fund Manager', 'Tycoon']
+    return [{'level': level, 'title': name, 'price': 1000 * 2 ** level} for level, name in enumerate(names)]
+
+
+def generate_news(count, rng):
+    now = datetime.now()
+    words = ['market', 'rally', 'stocks', 'earnings', 'sector', 'growth', 'rates', 'outlook', 'shares', 'record']
+    for index in range(count):
+        yield {
+            'title': f'Headline {index}: {" ".join(rng.choices(words, k=5))}',
+            'content': ' '.join(rng.choices(words, k=400)),
+            'author': 'Benchmark Desk',
+            'timestamp': now - timedelta(minutes=index),
+            'isFeatured': index % 10 == 0,
+            'thumbnail': None,
+        }
+
+
+def insert_chunked(collection, documents):
+    chunk = []
+    inserted = 0
+    for document in documents:
+        chunk.append(document)
+        if len(chunk) == CHUNK_SIZE:
+            inserted += len(collection.insert_many(chunk, ordered=False).inserted_ids)
+            chunk = []
+    if chunk:
+        inserted += len(collection.insert_many(chunk, ordered=False).inserted_ids)
+    return inserted
+
+
+def insert_users(task):
+    """
+    Generate and insert one chunk of users. Each chunk has its own random
+    generator, so the data set is the same however many workers insert it.
+    """
+    mongo_uri, start, count, stock_count, holdings, random_seed, password_hash = task
+    rng = random.Random(random_seed * 1000003 + start)
+    client = MongoClient(mongo_uri)
+    try:
+        users = list(generate_users(start, count, stock_count, holdings, rng, password_hash))
+        return len(client.get_default_database().users.insert_many(users, ordered=False).inserted_ids)
+    finally:
+        client.close()
+
+
+def seed(mongo_uri, users=1000, stocks=100, holdings=5, news=200, drop=False, random_seed=0, workers=1):
+    """
+    Load a synthetic data set.
+
+    Args:
+        mongo_uri (str): The URI of the database to seed.
+        users (int): The number of users.
+        stocks (int): The number of stocks.
+        holdings (int): The maximum number of stocks each user holds.
+        news (int): The number of news articles.
+        drop (bool): Drop the existing collections first.
+        random_seed (int): Seed of the random generator, for reproducible data sets.
+        workers (int): The number of processes inserting users.
+
+    Returns:
+        dict: The number of documents inserted per collection and the elapsed seconds.
+    """
+    rng = random.Random(random_seed)
+    started_at = time.perf_counter()
+    client = MongoClient(mongo_uri)
+    db = client.get_default_database()
+    if drop:
+        for name in ('users', 'stocks', 'titles', 'news', 'transactions', 'leaderboard', 'orders'):
+            db.drop_collection(name)
+
+    password_hash = generate_password_hash(PASSWORD)
+    tasks = [
+        (mongo_uri, start, min(CHUNK_SIZE, users - start), stocks, holdings, random_seed, password_hash)
+        for start in range(0, users, CHUNK_SIZE)
+    ]
+    if workers > 1 and len(tasks) > 1:
+        with multiprocessing.Pool(workers) as pool:
+            inserted_users = sum(pool.imap_unordered(insert_users, tasks))
+    else:
+        inserted_users = sum(map(insert_users, tasks))
+
+    counts = {
+        'stocks': insert_chunked(db.stocks, generate_stocks(stocks, rng)),
+        'users': inserted_users,
+        'titles': insert_chunked(db.titles, generate_titles()),
+        'news': insert_chunked(db.news, generate_news(news, rng)),
+    }
+    client.close()
+    counts['seconds'] = round(time.perf_counter() - started_at, 2)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--mongo-uri', default=DEFAULT_MONGO_URI, help='database to seed (the name in the URI is used)')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--stocks', type=int, default=100)
+    parser.add_argument('--holdings', type=int, default=5, help='maximum stocks held per user')
+    parser.add_argument('--news', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1, help='processes inserting users')
+    parser.add_argument('--drop', action='store_true', help='drop the existing collections first')
+    args = parser.parse_args()
+
+    print(seed(args.mongo_uri, args.users, args.stocks, args.holdings, args.news,
+               drop=args.drop, random_seed=args.seed, workers=args.workers))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""
+Drive a realistic mix of concurrent users against the API and report per-route latency.
+
+By default the database is seeded with benchmarks.datagen and run.py is started
+against it on a free local port, so the whole test runs on one machine:
+
+    PYTHONPATH=.. python -m benchmarks.load_test --users 50 --duration 60 --output results.json
+    PYTHONPATH=.. python -m benchmarks.load_test --baseline results.json   # compare with an earlier run
+
+Pass --url to target an API that is already running (and already seeded).
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from . import datagen
+
+# Relative weights of the actions of a virtual user, by mix
+MIXES = {
+    'default': {'stocks_list': 30, 'portfolio_summary': 25, 'leaderboard': 15, 'buy': 15, 'sell': 10, 'news': 5},
+    'read_heavy': {'stocks_list': 40, 'portfolio_summary': 25, 'leaderboard': 25, 'news': 10},
+    'trade_heavy': {'buy': 45, 'sell': 35, 'portfolio_summary': 15, 'stocks_list': 5},
+}
+
+# Seconds the server gets to start accepting connections
+STARTUP_TIMEOUT = 30
+
+
+class VirtualUser(threading.Thread):
+    """
+    One logged-in user issuing requests over a keep-alive connection until the deadline.
+    """
+
+    def __init__(self, base_url, name, symbols, mix, think_time, deadline, samples, rng):
+        super().__init__(daemon=True)
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.name_ = name
+        self.symbols = symbols
+        self.actions, self.weights = zip(*mix.items())
+        self.think_time = think_time
+        self.deadline = deadline
+        self.samples = samples
+        self.rng = rng
+        self.connection = None
+        self.token = None
+
+    def request(self, label, method, path, body=None, auth=True):
+        headers = {'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'}
+        if auth and self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        started_at = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            self.connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+            response = self.connection.getresponse()
+            payload = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            if self.connection is not None:
+                self.connection.close()
+            self.connection = None
+            payload, status = b'', 0
+        self.samples.append((label, time.perf_counter() - started_at, status))
+        return status, payload
+
+    def login(self):
+        status, payload = self.request('login', 'POST', '/auth/verify_credentials',
+                                       {'username': self.name_, 'password': datagen.PASSWORD}, auth=False)
+        if status == 200:
+            self.token = json.loads(payload)['token']
+        return status == 200
+
+    def run(self):
+        if not self.login():
+            return
+        while time.monotonic() < self.deadline:
+            action = self.rng.choices(self.actions, self.weights)[0]
+            if action == 'stocks_list':
+                self.request(action, 'GET', '/stocks/list')
+            elif action == 'portfolio_summary':
+                self.request(action, 'GET', '/portfolio/summary')
+            elif action == 'leaderboard':
+                self.request(action, 'GET', '/leaderboard?limit=100')
+            elif action == 'news':
+                self.request(action, 'GET', '/news/')
+            else:
+                trade = {'stock_symbol': self.rng.choice(self.symbols), 'quantity': self.rng.randint(1, 5)}
+                self.request(action, 'POST', f'/transactions/{action}', trade)
+            if self.think_time:
+                time.sleep(self.rng.uniform(0, 2 * self.think_time))
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile
+    return sorted_values[max(math.ceil(fraction * len(sorted_values)) - 1, 0)]
+
+
+def summarize(samples, duration):
+    routes = {}
+    for label in sorted({sample[0] for sample in samples}):
+        latencies = sorted(latency for name, latency, _ in samples if name == label)
+        errors = sum(1 for name, _, status in samples if name == label and not 200 <= status < 400)
+        routes[label] = {
+            'requests': len(latencies),
+            'errors': errors,
+            'rps': round(len(latencies) / duration, 2),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'max_ms': round(latencies[-1] * 1000, 2),
+        }
+    return routes
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mongo_uri, port):
+    """
+    Start run.py's app against the benchmark database on the given port.
+    """
+    code = "from run import app; app.run(host='127.0.0.1', port=%d, threaded=True)" % port
+    env = {
+        **os.environ,
+        'DATABASE_URI': mongo_uri,
+        'SECRET_KEY': os.environ.get('SECRET_KEY', 'load-test-secret'),
+        'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'WARNING'),
+    }
+    server = subprocess.Popen([sys.executable, '-c', code], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env=env)
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'Server exited with code {server.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('Server did not start in time')
+
+
+def run(base_url, users, duration, mix, think_time, user_pool, symbols, random_seed=0):
+    samples = []
+    deadline = time.monotonic() + duration
+    rng = random.Random(random_seed)
+    virtual_users = [
+        VirtualUser(base_url, datagen.username(rng.randrange(user_pool)), symbols, MIXES[mix], think_time,
+                    deadline, samples, random.Random(rng.random()))
+        for _ in range(users)
+    ]
+    started_at = time.monotonic()
+    for user in virtual_users:
+        user.start()
+    for user in virtual_users:
+        user.join()
+    return summarize(samples, time.monotonic() - started_at)
+
+
+def compare(result, baseline):
+    print(f"{'route':<20}{'rps':>18}{'p95 ms':>22}{'p99 ms':>22}")
+    for label, stats in result['routes'].items():
+        before = baseline['routes'].get(label)
+        if not before:
+            continue
+        columns = [f"{before[key]:.1f} -> {stats[key]:.1f}" for key in ('rps', 'p95_ms', 'p99_ms')]
+        print(f"{label:<20}{columns[0]:>18}{columns[1]:>22}{columns[2]:>22}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--url', help='target an already running API instead of starting run.py')
+    parser.add_argument('--mongo-uri', default=datagen.DEFAULT_MONGO_URI)
+    parser.add_argument('--no-seed', action='store_true', help='reuse the data already in the database')
+    parser.add_argument('--seed-users', type=int, default=1000)
+    parser.add_argument('--seed-stocks', type=int, default=100)
+    parser.add_argument('--users', type=int, default=20, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds')
+    parser.add_argument('--think-time', type=float, default=0.1, help='mean seconds between requests of a user')
+    parser.add_argument('--mix', choices=sorted(MIXES), default='default')
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--baseline', help='compare with the JSON results of an earlier run')
+    args = parser.parse_args()
+
+    if not args.url and not args.no_seed:
+        print(f"Seeded: {datagen.seed(args.mongo_uri, users=args.seed_users, stocks=args.seed_stocks, drop=True)}", file=sys.stderr)
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        port = free_port()
+        server = start_server(args.mongo_uri, port)
+        base_url = f'http://127.0.0.1:{port}'
+
+    try:
+        symbols = [datagen.symbol(index) for index in range(args.seed_stocks)]
+        routes = run(base_url, args.users, args.duration, args.mix, args.think_time, args.seed_users, symbols)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    result = {
+        'commit': git_commit(),
+        'started_at': datetime.now().isoformat(),
+        'url': base_url,
+        'users': args.users,
+        'duration': args.duration,
+        'mix': args.mix,
+        'routes': routes,
+        'total_rps': round(sum(stats['rps'] for stats in routes.values()), 2),
+    }
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(result, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            compare(result, json.load(baseline))
+
+
+if __name__ == '__main__':
+    main()
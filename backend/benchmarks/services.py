@@ -0,0 +1,191 @@
+"""
+Micro-benchmarks of the core services at configurable scale.
+
+Seeds a dedicated database with benchmarks.datagen, then calls the services
+directly (no HTTP) and reports, per operation, the wall time, the MongoDB
+commands issued and the peak Python memory allocated:
+
+    PYTHONPATH=.. python -m benchmarks.services --users 100000 --stocks 1000 --holdings 10 --workers 8
+    PYTHONPATH=.. python -m benchmarks.services --no-seed --only leaderboard.get user.get_portfolio
+
+The worker's update_stock_prices task is included when Celery is installed.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+from pymongo import monitoring
+
+from . import datagen
+from .load_test import git_commit, percentile
+
+# Users sampled as the subjects of per-user operations
+SAMPLE_SIZE = 1000
+
+
+class CommandCounter(monitoring.CommandListener):
+    """
+    Count the MongoDB commands issued by every client of the process, by command name.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        with self._lock:
+            self.counts[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def reset(self):
+        with self._lock:
+            counts = dict(self.counts)
+            self.counts.clear()
+        return counts
+
+
+def measure(operation, repeat, counter):
+    """
+    Run an operation repeat times and once more under tracemalloc.
+
+    Returns:
+        dict: Wall time statistics in milliseconds, MongoDB commands per call and peak memory in KiB.
+    """
+    counter.reset()
+    durations = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        operation()
+        durations.append(time.perf_counter() - started_at)
+    commands = counter.reset()
+
+    # Memory is traced in a separate run, so tracing does not inflate the timings
+    tracemalloc.start()
+    operation()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    counter.reset()
+
+    durations.sort()
+    return {
+        'runs': repeat,
+        'median_ms': round(statistics.median(durations) * 1000, 3),
+        'p95_ms': round(percentile(durations, 0.95) * 1000, 3),
+        'min_ms': round(durations[0] * 1000, 3),
+        'commands_per_call': round(sum(commands.values()) / repeat, 2),
+        'commands': {name: round(count / repeat, 2) for name, count in sorted(commands.items())},
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def build_operations(args, rng):
+    """
+    Create the app and the operations to measure.
+
+    Returns:
+        dict: A mapping of operation name to (callable, repeat).
+    """
+    from app import create_app, mongo
+    from app.services.leaderboard_service import LeaderboardService
+    from app.services.transaction_service import TransactionService
+    from app.services.user_service import UserService
+
+    create_app()
+    sample = list(mongo.db.users.aggregate([
+        {'$sample': {'size': SAMPLE_SIZE}},
+        {'$project': {'_id': 1, 'portfolio': 1}}
+    ]))
+    user_ids = [str(user['_id']) for user in sample]
+    holders = [(str(user['_id']), user['portfolio']) for user in sample if user.get('portfolio')]
+    symbols = [datagen.symbol(index) for index in range(args.stocks)]
+    LeaderboardService.refresh_leaderboard()
+
+    def sell():
+        user_id, portfolio = rng.choice(holders)
+        TransactionService.sell_stock({'user_id': user_id, 'stock_symbol': rng.choice(portfolio)['stock_symbol'], 'quantity': 1})
+
+    operations = {
+        'leaderboard.refresh': (LeaderboardService.refresh_leaderboard, args.heavy_repeat),
+        'leaderboard.get': (lambda: LeaderboardService.get_leaderboard(limit=100), args.repeat),
+        'leaderboard.get_middle': (lambda: LeaderboardService.get_leaderboard(limit=100, offset=args.users // 2), args.repeat),
+        'user.get_portfolio': (lambda: UserService.get_portfolio(rng.choice(user_ids)), args.repeat),
+        'transaction.buy_stock': (lambda: TransactionService.buy_stock(
+            {'user_id': rng.choice(user_ids), 'stock_symbol': rng.choice(symbols), 'quantity': 1}
+        ), args.repeat),
+    }
+    if holders:
+        operations['transaction.sell_stock'] = (sell, args.repeat)
+
+    try:
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'updates'))
+        import tasks
+        operations['worker.update_stock_prices'] = (tasks.update_stock_prices, args.heavy_repeat)
+    except ImportError as e:
+        print(f"Skipping worker.update_stock_prices: {e}", file=sys.stderr)
+    return operations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--mongo-uri', default=datagen.DEFAULT_MONGO_URI)
+    parser.add_argument('--no-seed', action='store_true', help='reuse the data already in the database')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--stocks', type=int, default=100)
+    parser.add_argument('--holdings', type=int, default=5, help='maximum stocks held per user')
+    parser.add_argument('--workers', type=int, default=1, help='processes seeding users')
+    parser.add_argument('--repeat', type=int, default=50, help='runs of each per-request operation')
+    parser.add_argument('--heavy-repeat', type=int, default=3, help='runs of each whole-collection operation')
+    parser.add_argument('--only', nargs='*', help='names of the operations to run')
+    parser.add_argument('--output', help='write the results as JSON')
+    args = parser.parse_args()
+
+    # The API and the worker read their database from the environment when imported
+    os.environ['DATABASE_URI'] = args.mongo_uri
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    database = args.mongo_uri.rsplit('/', 1)[-1].split('?')[0]
+    os.environ['MONGO_URI'] = args.mongo_uri
+    os.environ['MONGO_DB'] = database
+
+    if not args.no_seed:
+        print(f"Seeded: {datagen.seed(args.mongo_uri, args.users, args.stocks, args.holdings, drop=True, workers=args.workers)}", file=sys.stderr)
+
+    # Registered before any client is created, so every client reports its commands
+    counter = CommandCounter()
+    monitoring.register(counter)
+
+    rng = random.Random(0)
+    results = {}
+    for name, (operation, repeat) in build_operations(args, rng).items():
+        if args.only and name not in args.only:
+            continue
+        results[name] = measure(operation, repeat, counter)
+        print(f"{name:<28}{results[name]['median_ms']:>12.3f} ms{results[name]['commands_per_call']:>10.2f} cmds"
+              f"{results[name]['peak_kib']:>12.1f} KiB", file=sys.stderr)
+
+    result = {
+        'commit': git_commit(),
+        'started_at': datetime.now().isoformat(),
+        'scale': {'users': args.users, 'stocks': args.stocks, 'holdings': args.holdings},
+        'operations': results,
+    }
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(result, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
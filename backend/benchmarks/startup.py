@@ -0,0 +1,55 @@
+"""
+Measure how long the API takes to import and create, and which heavy modules it loads.
+
+Each measurement runs in a fresh interpreter so nothing is cached between runs:
+
+    PYTHONPATH=.. python -m benchmarks.startup --runs 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Modules the API must not load before they are actually needed
+HEAVY_MODULES = ['pandas', 'pytrends']
+
+_PROBE = """
+import json, sys, time
+started_at = time.perf_counter()
+import app
+imported_at = time.perf_counter()
+app.create_app()
+created_at = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported_at - started_at) * 1000,
+    'create_ms': (created_at - imported_at) * 1000,
+    'loaded': [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure(runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', _PROBE], capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'runs': runs,
+        'import_ms_median': statistics.median(sample['import_ms'] for sample in samples),
+        'create_ms_median': statistics.median(sample['create_ms'] for sample in samples),
+        'heavy_modules_loaded': sorted({name for sample in samples for name in sample['loaded']}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    result = measure(parser.parse_args().runs)
+    print(json.dumps(result, indent=2))
+    if result['heavy_modules_loaded']:
+        sys.exit(f"Heavy modules loaded at startup: {', '.join(result['heavy_modules_loaded'])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+"""
+Modules shared by the Flask backend and the Celery worker in 'updates/'.
+"""
@@ -0,0 +1,206 @@
+"""
+MongoDB access shared by the API and the Celery worker.
+
+Each process gets one pooled client, created on first use and created again in
+a forked child (pre-fork web servers, Celery prefork workers), since a client
+must not be used across fork. Pool size and timeouts come from the environment.
+Operations are routed by class:
+
+- 'db': primary reads and the server's default write concern.
+- 'reads': stale-tolerant reads (leaderboard, news), which may be
+  served by secondaries ('secondaryPreferred' by default).
+- 'trades': balance, holding and order writes, on the primary with a
+  'majority' write concern by default.
+
+A single-node replica set serves every class from its primary, so it is enough
+to run and test the routing locally. AsyncMongoDatabase offers the same handles
+over motor for the async serving mode.
+"""
+import os
+import threading
+
+import pymongo
+from pymongo.database import Database
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+from pymongo.write_concern import WriteConcern
+
+READ_PREFERENCES = {
+    'primary': Primary,
+    'primaryPreferred': PrimaryPreferred,
+    'secondary': Secondary,
+    'secondaryPreferred': SecondaryPreferred,
+    'nearest': Nearest,
+}
+
+# Client options read from the environment, by variable; unset ones keep the pymongo defaults
+POOL_OPTIONS = {
+    'MONGO_MAX_POOL_SIZE': 'maxPoolSize',
+    'MONGO_MIN_POOL_SIZE': 'minPoolSize',
+    'MONGO_MAX_IDLE_TIME_MS': 'maxIdleTimeMS',
+    'MONGO_WAIT_QUEUE_TIMEOUT_MS': 'waitQueueTimeoutMS',
+    'MONGO_CONNECT_TIMEOUT_MS': 'connectTimeoutMS',
+    'MONGO_SOCKET_TIMEOUT_MS': 'socketTimeoutMS',
+    'MONGO_SERVER_SELECTION_TIMEOUT_MS': 'serverSelectionTimeoutMS',
+}
+
+OPERATION_CLASSES = ('db', 'reads', 'trades')
+
+
+def pool_options_from_env():
+    return {option: int(os.environ[name]) for name, option in POOL_OPTIONS.items() if os.getenv(name)}
+
+
+def _read_preference(name, max_staleness=None):
+    if name not in READ_PREFERENCES:
+        raise ValueError(f"Unknown read preference: {name}")
+    if name == 'primary':
+        return Primary()
+    return READ_PREFERENCES[name](max_staleness=int(max_staleness) if max_staleness else -1)
+
+
+def _write_concern(w):
+    return WriteConcern(w=int(w) if w.isdigit() else w)
+
+
+def operation_options_from_env():
+    """
+    Read the read preference and write concern of each operation class from the environment.
+
+    Returns:
+        dict: The database options by operation class.
+    """
+    return {
+        'db': {},
+        'reads': {
+            'read_preference': _read_preference(
+                os.getenv('MONGO_READS_READ_PREFERENCE', 'secondaryPreferred'),
+                os.getenv('MONGO_READS_MAX_STALENESS_SECONDS')
+            ),
+        },
+        'trades': {
+            'read_preference': Primary(),
+            'write_concern': _write_concern(os.getenv('MONGO_TRADES_WRITE_CONCERN', 'majority')),
+        },
+    }
+
+
+class MongoDatabase:
+    """
+    The process's MongoDB client, with a handle per operation class (db, reads, trades).
+
+    The handles can be kept in module globals: every use resolves to the client of
+    the current process, so they stay valid in forked children.
+    """
+
+    def __init__(self):
+        self._uri = None
+        self._database = None
+        self._options = {}
+        self._operations = {}
+        self._reset()
+        self.db = _DatabaseHandle(self, 'db')
+        self.reads = _DatabaseHandle(self, 'reads')
+        self.trades = _DatabaseHandle(self, 'trades')
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def configure(self, uri, database=None, event_listeners=(), **options):
+        """
+        Set the connection of the process; the client is created on first use.
+
+        Args:
+            uri (str): The MongoDB connection string.
+            database (str): The database used when the connection string names none.
+            event_listeners (iterable): pymongo monitoring listeners of the client.
+            **options: Client options overriding those from the environment.
+        """
+        self.close()
+        self._uri = uri
+        self._database = database
+        self._options = {**pool_options_from_env(), **options, 'event_listeners': list(event_listeners)}
+        self._operations = operation_options_from_env()
+
+    def _reset(self):
+        # In a forked child the parent's client and lock are dropped, not closed
+        self._client = None
+        self._databases = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    if self._uri is None:
+                        raise RuntimeError("MongoDatabase used before configure()")
+                    self._client = self._create_client()
+        return self._client
+
+    def _create_client(self):
+        return pymongo.MongoClient(self._uri, **self._options)
+
+    def _database_class(self):
+        return Database
+
+    def database(self, operation='db'):
+        """
+        Get the database with the read preference and write concern of an operation class.
+        """
+        database = self._databases.get(operation)
+        if database is None:
+            database = self.client.get_default_database(self._database, **self._operations[operation])
+            self._databases[operation] = database
+        return database
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+        self._reset()
+
+
+class AsyncMongoDatabase(MongoDatabase):
+    """
+    The same handles over a motor client, whose methods are coroutines.
+
+    The client binds to the event loop it is first used in, so it must only be
+    used from the loop of the server.
+    """
+
+    def _create_client(self):
+        # motor is only needed by the async serving mode
+        from motor.motor_asyncio import AsyncIOMotorClient
+        return AsyncIOMotorClient(self._uri, **self._options)
+
+    def _database_class(self):
+        from motor.motor_asyncio import AsyncIOMotorDatabase
+        return AsyncIOMotorDatabase
+
+
+class _DatabaseHandle:
+    def __init__(self, owner, operation):
+        self._owner = owner
+        self._operation = operation
+
+    def get(self):
+        return self._owner.database(self._operation)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if hasattr(self._owner._database_class(), name):
+            return getattr(self.get(), name)
+        return _CollectionHandle(self, name)
+
+    def __getitem__(self, name):
+        return _CollectionHandle(self, name)
+
+
+class _CollectionHandle:
+    def __init__(self, database, name):
+        self._database = database
+        self._name = name
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._database.get()[self._name], name)
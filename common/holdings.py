@@ -0,0 +1,112 @@
+"""
+Guarded updates of a user's balance and holdings, shared by the trades of the
+API (sync and async) and the order matching of the worker.
+
+Each update only matches while the balance covers the purchase or the holding
+covers the sale, so concurrent trades can never overdraw or oversell: a trade
+that loses the race matches no document and must be rejected by the caller.
+"""
+from pymongo import ReturnDocument
+
+# Retries when a concurrent trade races the first purchase of a stock
+MAX_UPDATE_ATTEMPTS = 3
+
+
+def credit_updates(user_id, stock_symbol, quantity, total_price):
+    """
+    Build the guarded updates debiting the balance and adding shares: the first
+    increments an existing holding, the second pushes a new one.
+
+    Returns:
+        list: (filter, update, options) tuples, tried in order.
+    """
+    return [
+        (
+            {"_id": user_id, "balance": {"$gte": total_price}, "portfolio.stock_symbol": stock_symbol},
+            {"$inc": {"balance": -total_price, "portfolio.$[holding].quantity": quantity}},
+            {"array_filters": [{"holding.stock_symbol": stock_symbol}]}
+        ),
+        (
+            {"_id": user_id, "balance": {"$gte": total_price}, "portfolio.stock_symbol": {"$ne": stock_symbol}},
+            {
+                "$inc": {"balance": -total_price},
+                "$push": {"portfolio": {"stock_symbol": stock_symbol, "quantity": quantity}}
+            },
+            {}
+        ),
+    ]
+
+
+def affordable_filter(user_id, total_price):
+    # Tells a lost race on the holding (worth retrying) from an insufficient balance
+    return {"_id": user_id, "balance": {"$gte": total_price}}
+
+
+def debit_update(user_id, stock_symbol, quantity, total_price):
+    """
+    Build the guarded update removing shares and crediting the balance.
+
+    Returns:
+        tuple: The (filter, update, options) of the update.
+    """
+    return (
+        {"_id": user_id, "portfolio": {"$elemMatch": {"stock_symbol": stock_symbol, "quantity": {"$gte": quantity}}}},
+        {"$inc": {"balance": total_price, "portfolio.$[holding].quantity": -quantity}},
+        {"array_filters": [{"holding.stock_symbol": stock_symbol}]}
+    )
+
+
+def pull_empty_update(user_id, stock_symbol):
+    # Drops a holding sold down to zero
+    return (
+        {"_id": user_id},
+        {"$pull": {"portfolio": {"stock_symbol": stock_symbol, "quantity": {"$lte": 0}}}}
+    )
+
+
+def is_emptied(user, stock_symbol):
+    return any(stock['stock_symbol'] == stock_symbol and stock['quantity'] <= 0 for stock in user.get('portfolio', []))
+
+
+def credit_holding(users, user_id, stock_symbol, quantity, total_price, projection=None):
+    """
+    Atomically debit the user's balance and add shares to their portfolio.
+
+    Args:
+        users: The pymongo users collection.
+        projection (dict, optional): The fields of the returned user document.
+
+    Returns:
+        dict: The updated user document, or None if the balance does not cover the price.
+    """
+    for _ in range(MAX_UPDATE_ATTEMPTS):
+        for query, update, options in credit_updates(user_id, stock_symbol, quantity, total_price):
+            user = users.find_one_and_update(query, update, projection=projection, return_document=ReturnDocument.AFTER, **options)
+            if user:
+                return user
+
+        # Neither guard matched: give up unless a concurrent trade added or pulled the holding in between
+        if not users.find_one(affordable_filter(user_id, total_price), {"_id": 1}):
+            return None
+    return None
+
+
+def debit_holding(users, user_id, stock_symbol, quantity, total_price, projection=None):
+    """
+    Atomically remove shares from the user's portfolio and credit their balance.
+
+    A holding that drops to zero is pulled.
+
+    Args:
+        users: The pymongo users collection.
+        projection (dict, optional): The fields of the returned user document, including 'portfolio'.
+
+    Returns:
+        dict: The updated user document, or None if the holding does not cover the quantity.
+    """
+    query, update, options = debit_update(user_id, stock_symbol, quantity, total_price)
+    user = users.find_one_and_update(query, update, projection=projection, return_document=ReturnDocument.AFTER, **options)
+    if user and is_emptied(user, stock_symbol):
+        users.update_one(*pull_empty_update(user_id, stock_symbol))
+        user['portfolio'] = [stock for stock in user['portfolio'] if stock['stock_symbol'] != stock_symbol]
+    return user
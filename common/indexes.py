@@ -0,0 +1,81 @@
+"""
+Index set of every collection, shared by the API and the Celery worker.
+
+Both create the declared indexes on startup, so the declaration lives here
+once: two copies would drift, and an index declared with the same name but
+other options fails to be created.
+"""
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+# Retention of the fine-grained price history (raw tick buckets and 1-minute candles)
+TICK_RETENTION_SECONDS = 2 * 24 * 3600
+CANDLE_1M_RETENTION_SECONDS = 7 * 24 * 3600
+
+# Retention of request and task profiles
+PROFILE_RETENTION_SECONDS = 7 * 24 * 3600
+
+# Retention of the per-tick net worth history; daily points are kept forever
+NET_WORTH_RETENTION_SECONDS = 7 * 24 * 3600
+
+# Indexes every hot lookup relies on, by collection
+INDEXES = {
+    "users": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+    ],
+    "stocks": [
+        IndexModel([("symbol", ASCENDING)], name="symbol_unique", unique=True),
+        IndexModel([("sector", ASCENDING)], name="sector"),
+        # Polling fallback of the price feed, see PriceFeedService._watch_polling
+        IndexModel([("last_update", DESCENDING)], name="last_update"),
+    ],
+    "transactions": [
+        IndexModel([("user_id", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], name="user_date"),
+        IndexModel([("user_id", ASCENDING), ("stock_symbol", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], name="user_symbol_date"),
+        # One transaction per matched or queued order, which makes applying an order idempotent
+        IndexModel([("order_id", ASCENDING)], name="order_id_unique", unique=True, partialFilterExpression={"order_id": {"$exists": True}}),
+    ],
+    "news": [
+        IndexModel([("timestamp", DESCENDING), ("_id", DESCENDING)], name="timestamp_id"),
+        IndexModel([("isFeatured", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], name="featured_timestamp"),
+    ],
+    "titles": [
+        IndexModel([("level", ASCENDING)], name="level_unique", unique=True),
+    ],
+    "trends": [
+        IndexModel([("sector", ASCENDING)], name="sector_unique", unique=True),
+    ],
+    "stock_ticks": [
+        IndexModel([("symbol", ASCENDING), ("start", DESCENDING)], name="symbol_start", unique=True),
+        IndexModel([("start", ASCENDING)], name="retention", expireAfterSeconds=TICK_RETENTION_SECONDS),
+    ],
+    "stock_candles_1m": [
+        IndexModel([("symbol", ASCENDING), ("start", DESCENDING)], name="symbol_start", unique=True),
+        IndexModel([("start", ASCENDING)], name="retention", expireAfterSeconds=CANDLE_1M_RETENTION_SECONDS),
+    ],
+    "stock_candles_1h": [
+        IndexModel([("symbol", ASCENDING), ("start", DESCENDING)], name="symbol_start", unique=True),
+    ],
+    "stock_candles_1d": [
+        IndexModel([("symbol", ASCENDING), ("start", DESCENDING)], name="symbol_start", unique=True),
+    ],
+    "orders": [
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created"),
+        IndexModel([("batch_id", ASCENDING)], name="batch_id", sparse=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created"),
+    ],
+    "profiles": [
+        IndexModel([("name", ASCENDING), ("started_at", DESCENDING)], name="name_started"),
+        IndexModel([("started_at", ASCENDING)], name="retention", expireAfterSeconds=PROFILE_RETENTION_SECONDS),
+    ],
+    "leaderboard": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+        IndexModel([("netWorth", DESCENDING), ("username", ASCENDING)], name="net_worth"),
+    ],
+    "net_worth_history": [
+        IndexModel([("user_id", ASCENDING), ("start", DESCENDING)], name="user_start", unique=True),
+        IndexModel([("start", ASCENDING)], name="retention", expireAfterSeconds=NET_WORTH_RETENTION_SECONDS),
+    ],
+    "net_worth_1d": [
+        IndexModel([("user_id", ASCENDING), ("start", DESCENDING)], name="user_start", unique=True),
+    ],
+}
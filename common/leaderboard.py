@@ -0,0 +1,65 @@
+"""
+Leaderboard entries, shared by the API (sync and async) and the worker.
+
+Entries are materialized with the time they were computed in 'updated_at'.
+Bulk refreshes read users over the length of a scan, so their writes keep a
+row that a single-user refresh (e.g. after a trade) updated in the meantime.
+"""
+from pymongo import UpdateOne
+
+# Fields read from each user document when valuing portfolios (never the password hash)
+USER_PROJECTION = {"username": 1, "balance": 1, "portfolio": 1, "title_level": 1}
+
+
+def build_entry(user, prices, titles):
+    """
+    Build the leaderboard entry for a single user.
+
+    Args:
+        user (dict): The user document, projected with USER_PROJECTION.
+        prices (dict): A mapping of stock symbol to current price.
+        titles (dict): A mapping of title level to title name.
+
+    Returns:
+        dict: The leaderboard document for the user.
+    """
+    invested_assets = sum(
+        stock['quantity'] * (prices.get(stock['stock_symbol']) or 0)
+        for stock in user.get('portfolio', [])
+    )
+    balance = user.get('balance', 0)
+
+    # Resolve the title name, falling back to "none" for missing levels
+    title_level = user.get('title_level', -1)
+    title_name = titles.get(title_level)
+    if title_name is None:
+        title_level, title_name = -1, "none"
+
+    return {
+        "user_id": user['_id'],
+        "username": user['username'],
+        "liquidAssets": balance,
+        "investedAssets": invested_assets,
+        "netWorth": balance + invested_assets,
+        "title": title_name,
+        "title_image": f"/images/Level{title_level}.png" if title_level != -1 else None
+    }
+
+
+def entry_update(entry):
+    """
+    Build the upsert of an entry that leaves a row updated after entry['updated_at'] untouched.
+
+    Returns:
+        UpdateOne: The pipeline update, for a bulk write.
+    """
+    return UpdateOne(
+        {"user_id": entry['user_id']},
+        [{"$replaceWith": {"$cond": [
+            {"$gt": ["$updated_at", entry['updated_at']]},
+            "$$ROOT",
+            # The literal keeps user-supplied values such as a username starting with '$' from being parsed
+            {"$mergeObjects": ["$$ROOT", {"$literal": entry}]}
+        ]}}],
+        upsert=True
+    )
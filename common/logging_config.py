@@ -0,0 +1,149 @@
+"""
+Asynchronous, structured and rate-limited logging.
+
+Records are filtered and enqueued in the calling thread and written by a
+background QueueListener, so request threads never block on log I/O.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else was passed through 'extra'
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_queue_handler = None
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line.
+    """
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token-bucket rate limit per logger name for records below WARNING.
+
+    Warnings and errors always pass. When a record passes after others were
+    dropped, the number of dropped records is attached as 'suppressed'.
+    """
+
+    def __init__(self, limits):
+        """
+        Args:
+            limits (dict): A mapping of logger name prefix to (records per second, burst).
+        """
+        super().__init__()
+        self.limits = sorted(limits.items(), key=lambda item: len(item[0]), reverse=True)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _limit_for(self, name):
+        for prefix, limit in self.limits:
+            if name == prefix or name.startswith(prefix + '.'):
+                return prefix, limit
+        return None, None
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        prefix, limit = self._limit_for(record.name)
+        if limit is None:
+            return True
+
+        rate, burst = limit
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at, suppressed = self._buckets.get(record.name, (burst, now, 0))
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            if tokens < 1:
+                self._buckets[record.name] = (tokens, now, suppressed + 1)
+                return False
+            self._buckets[record.name] = (tokens - 1, now, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+def _start_listener(handler):
+    global _listener
+    _queue_handler.queue = queue.SimpleQueue()
+    _listener = QueueListener(_queue_handler.queue, handler, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_listener_after_fork():
+    # The writer thread does not survive a fork (Celery prefork, pre-fork servers)
+    global _listener
+    if _listener is not None:
+        handlers = _listener.handlers
+        _listener = None
+        _start_listener(*handlers)
+
+
+def configure_logging(level='INFO', json_output=True, rate_limits=None):
+    """
+    Route the root logger through a queue drained by a background writer.
+
+    Calling it again replaces the previous configuration. The writer is
+    restarted in forked child processes.
+
+    Args:
+        level (str): The root log level.
+        json_output (bool): Write JSON lines instead of the plain text format.
+        rate_limits (dict, optional): A mapping of logger name prefix to
+            (records per second, burst) for hot-path loggers.
+    """
+    global _queue_handler
+    first_call = _queue_handler is None
+    _stop_listener()
+
+    stream_handler = logging.StreamHandler()
+    if json_output:
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s in %(module)s: %(message)s'))
+
+    _queue_handler = QueueHandler(queue.SimpleQueue())
+    if rate_limits:
+        _queue_handler.addFilter(RateLimitFilter(rate_limits))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+
+    _start_listener(stream_handler)
+    if first_call:
+        atexit.register(_stop_listener)
+        os.register_at_fork(after_in_child=_restart_listener_after_fork)
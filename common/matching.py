@@ -0,0 +1,252 @@
+"""
+Batched order matching shared by the API and the Celery worker.
+
+Orders queued in the 'orders' collection are cleared per symbol in one batch:
+every eligible order of a symbol fills at the same pre-batch price and the net
+quantity moves the price once. Each fill is applied to the user with a guarded
+update (see common/holdings.py), as trades executed by the API may change the
+same users meanwhile, and its transaction is recorded right after; order
+statuses and the price impact are written with bulk operations.
+
+Only one batch runs at a time, under a lock document in the 'locks'
+collection. Orders left claimed by a batch that did not finish are recovered
+by the next batch from their transactions, which are unique per order.
+"""
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from common.holdings import credit_holding, debit_holding
+
+logger = logging.getLogger(__name__)
+
+# Price movement applied per share bought or sold
+PRICE_IMPACT_PER_SHARE = 0.02
+
+ORDER_SIDES = ('buy', 'sell')
+ORDER_TYPES = ('market', 'limit')
+
+# Orders claimed longer ago than this belong to a batch that did not finish
+RECLAIM_AFTER = timedelta(minutes=5)
+
+# A batch holds the lock at most this long, so the lock of a batch that died expires
+LOCK_ID = 'match_orders'
+LOCK_TTL = RECLAIM_AFTER
+
+
+def _price_impact_pipeline(net_quantity, now):
+    # Move the price by the net quantity of the batch and keep high/low in step
+    price_change = PRICE_IMPACT_PER_SHARE * net_quantity
+    return [
+        {'$set': {
+            'price': {'$max': [{'$add': ['$price', price_change]}, 0.01]},
+            'change': price_change,
+            'last_update': now
+        }},
+        {'$set': {
+            'high': {'$max': [{'$ifNull': ['$high', '$price']}, '$price']},
+            'low': {'$min': [{'$ifNull': ['$low', '$price']}, '$price']}
+        }}
+    ]
+
+
+def _is_eligible(order, price):
+    if order['type'] == 'market':
+        return True
+    if order['side'] == 'buy':
+        return price <= order['limit_price']
+    return price >= order['limit_price']
+
+
+def acquire_lock(db, owner, now):
+    """
+    Take the matching lock unless another batch holds an unexpired one.
+
+    Returns:
+        bool: Whether the lock was taken.
+    """
+    try:
+        # A held lock does not match the filter, so the upsert collides with its _id
+        db.locks.update_one(
+            {'_id': LOCK_ID, 'expires_at': {'$lt': now}},
+            {'$set': {'owner': owner, 'expires_at': now + LOCK_TTL}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+def release_lock(db, owner):
+    db.locks.delete_one({'_id': LOCK_ID, 'owner': owner})
+
+
+def reclaim_orders(db, claimed_before):
+    """
+    Recover the orders of batches that stopped between claiming and settling them.
+
+    Orders with a recorded transaction were applied to their user and are marked
+    filled; the others were not and are opened again for the next batch.
+
+    Returns:
+        int: The number of orders recovered.
+    """
+    stale_ids = [
+        order['_id'] for order in db.orders.find(
+            {'status': 'matching', '$or': [{'claimed_at': {'$lt': claimed_before}}, {'claimed_at': {'$exists': False}}]},
+            {'_id': 1}
+        )
+    ]
+    if not stale_ids:
+        return 0
+
+    filled = {
+        ObjectId(transaction['order_id']): transaction
+        for transaction in db.transactions.find(
+            {'order_id': {'$in': [str(order_id) for order_id in stale_ids]}}, {'order_id': 1, 'price': 1, 'total_price': 1, 'date': 1}
+        )
+    }
+    db.orders.bulk_write([
+        UpdateOne({'_id': order_id, 'status': 'matching'}, {'$set': {
+            'status': 'filled',
+            'fill_price': filled[order_id]['price'],
+            'total_price': filled[order_id]['total_price'],
+            'processed_at': filled[order_id]['date']
+        }})
+        if order_id in filled else
+        UpdateOne({'_id': order_id, 'status': 'matching'}, {'$set': {'status': 'open'}, '$unset': {'batch_id': '', 'claimed_at': ''}})
+        for order_id in stale_ids
+    ], ordered=False)
+    logger.warning(f"Reclaimed {len(stale_ids)} orders of unfinished batches: {len(filled)} filled, {len(stale_ids) - len(filled)} reopened")
+    return len(stale_ids)
+
+
+def match_orders(db, batch_size=10000, filled_users=None):
+    """
+    Clear the open orders of every symbol in one batch.
+
+    Args:
+        db: The pymongo database.
+        batch_size (int): The maximum number of orders claimed per batch.
+        filled_users (set, optional): Collects the IDs of the users with a filled order.
+
+    Returns:
+        dict: Counts of 'filled', 'rejected' and 'pending' orders and the number of 'symbols' traded.
+    """
+    now = datetime.now()
+    batch_id = uuid.uuid4().hex
+    if not acquire_lock(db, batch_id, now):
+        logger.info("Order matching skipped: another batch is running")
+        return {'filled': 0, 'rejected': 0, 'pending': 0, 'symbols': 0}
+    try:
+        return _match_batch(db, batch_id, now, batch_size, filled_users)
+    finally:
+        release_lock(db, batch_id)
+
+
+def _match_batch(db, batch_id, now, batch_size, filled_users):
+    reclaim_orders(db, now - RECLAIM_AFTER)
+
+    # Claim the batch first, so orders cancelled meanwhile are never filled
+    open_ids = [order['_id'] for order in db.orders.find({'status': 'open'}, {'_id': 1}).sort('created_at', 1).limit(batch_size)]
+    if not open_ids:
+        return {'filled': 0, 'rejected': 0, 'pending': 0, 'symbols': 0}
+    db.orders.update_many({'_id': {'$in': open_ids}, 'status': 'open'}, {'$set': {'status': 'matching', 'batch_id': batch_id, 'claimed_at': now}})
+    orders = list(db.orders.find({'batch_id': batch_id, 'status': 'matching'}).sort('created_at', 1))
+
+    symbols = {order['stock_symbol'] for order in orders}
+    prices = {stock['symbol']: stock['price'] for stock in db.stocks.find({'symbol': {'$in': list(symbols)}}, {'_id': 0, 'symbol': 1, 'price': 1})}
+    user_ids = {user['_id'] for user in db.users.find({'_id': {'$in': list({order['user_id'] for order in orders})}}, {'_id': 1})}
+    # Orders that already have a transaction were applied to their user and must not be applied again
+    applied = {
+        transaction['order_id']: transaction for transaction in db.transactions.find(
+            {'order_id': {'$in': [str(order['_id']) for order in orders]}}, {'_id': 0, 'order_id': 1, 'price': 1, 'total_price': 1, 'date': 1}
+        )
+    }
+
+    order_updates = []
+    net_quantities = defaultdict(int)
+    counts = {'filled': 0, 'rejected': 0, 'pending': 0}
+    try:
+        for order in orders:
+            transaction = applied.get(str(order['_id']))
+            if transaction:
+                order_updates.append(UpdateOne({'_id': order['_id']}, {'$set': {
+                    'status': 'filled',
+                    'fill_price': transaction['price'],
+                    'total_price': transaction['total_price'],
+                    'processed_at': transaction['date']
+                }}))
+                counts['filled'] += 1
+                continue
+
+            price = prices.get(order['stock_symbol'])
+            reason = None
+            if price is None:
+                reason = 'Stock not found'
+            elif order['user_id'] not in user_ids:
+                reason = 'User not found'
+            elif not _is_eligible(order, price):
+                # Limit orders that do not cross wait for a later batch
+                order_updates.append(UpdateOne({'_id': order['_id']}, {'$set': {'status': 'open'}, '$unset': {'batch_id': '', 'claimed_at': ''}}))
+                counts['pending'] += 1
+                continue
+
+            total_price = price * order['quantity'] if price is not None else 0
+            if reason is None:
+                # The guard is checked by the update itself, so a concurrent trade of the same user is never overridden
+                if order['side'] == 'buy':
+                    user = credit_holding(db.users, order['user_id'], order['stock_symbol'], order['quantity'], total_price, projection={'_id': 1})
+                    reason = None if user else 'Insufficient balance'
+                else:
+                    user = debit_holding(
+                        db.users, order['user_id'], order['stock_symbol'], order['quantity'], total_price,
+                        projection={'portfolio': {'$elemMatch': {'stock_symbol': order['stock_symbol']}}}
+                    )
+                    reason = None if user else 'Insufficient stock quantity'
+
+            if reason:
+                order_updates.append(UpdateOne({'_id': order['_id']}, {'$set': {'status': 'rejected', 'reason': reason, 'processed_at': now}}))
+                counts['rejected'] += 1
+                continue
+
+            sign = 1 if order['side'] == 'buy' else -1
+            net_quantities[order['stock_symbol']] += sign * order['quantity']
+            if filled_users is not None:
+                filled_users.add(order['user_id'])
+
+            # Recorded with the fill, so a batch that stops here can be recovered by reclaim_orders
+            db.transactions.insert_one({
+                'user_id': order['user_id'],
+                'stock_symbol': order['stock_symbol'],
+                'quantity': order['quantity'],
+                'price': price,
+                'total_price': total_price,
+                'type': order['side'],
+                # A string, like the order IDs of queued trades, so transactions serialize to JSON as they are
+                'order_id': str(order['_id']),
+                'date': now
+            })
+            order_updates.append(UpdateOne({'_id': order['_id']}, {'$set': {
+                'status': 'filled', 'fill_price': price, 'total_price': total_price, 'processed_at': now
+            }}))
+            counts['filled'] += 1
+    finally:
+        # The fills applied so far move the price even if a later one failed
+        stock_updates = [
+            UpdateOne({'symbol': symbol}, _price_impact_pipeline(net_quantity, now))
+            for symbol, net_quantity in net_quantities.items() if net_quantity
+        ]
+        if stock_updates:
+            db.stocks.bulk_write(stock_updates, ordered=False)
+        if order_updates:
+            db.orders.bulk_write(order_updates, ordered=False)
+
+    counts['symbols'] = len(net_quantities)
+    logger.info(f"Matched batch {batch_id}: {counts['filled']} filled, {counts['rejected']} rejected, {counts['pending']} pending on {counts['symbols']} symbols")
+    return counts
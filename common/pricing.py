@@ -0,0 +1,151 @@
+"""
+Vectorized stock price simulation shared by the API and the Celery worker.
+
+The whole universe is held as NumPy arrays and every tick is computed in a
+single vectorized step, with a selectable price model.
+"""
+import numpy as np
+
+# Prices never drop below this floor
+MIN_PRICE = 0.01
+
+
+def additive_step(engine, rng):
+    """
+    The original worker model: sector interest, a volatility-scaled random
+    factor of up to 5% and the trend direction are added to the price.
+    """
+    base_price_change = engine.interest * 0.01
+    random_factor = rng.uniform(-0.05, 0.05, engine.size) * engine.volatility_factor
+    return engine.price + base_price_change + engine.price * random_factor + engine.trend_direction
+
+
+def uniform_step(engine, rng):
+    """
+    The original API model: a uniform percentage change of up to 10%.
+    """
+    return engine.price * (1 + rng.uniform(-10, 10, engine.size) / 100.0)
+
+
+def gbm_step(engine, rng):
+    """
+    Geometric Brownian motion, drifting with sector interest and trend direction.
+    """
+    sigma = engine.params['sigma'] * engine.volatility_factor
+    dt = engine.params['dt']
+    drift = engine.interest / 100.0 * engine.params['interest_drift'] + engine.trend_direction / np.maximum(engine.price, MIN_PRICE)
+    shock = rng.standard_normal(engine.size)
+    return engine.price * np.exp((drift - 0.5 * sigma ** 2) * dt + sigma * np.sqrt(dt) * shock)
+
+
+def mean_reverting_step(engine, rng):
+    """
+    Ornstein-Uhlenbeck process on the log price, pulled towards each stock's anchor price,
+    a slow moving average of its price kept by every tick (see PricingEngine.tick).
+    """
+    sigma = engine.params['sigma'] * engine.volatility_factor
+    dt = engine.params['dt']
+    log_price = np.log(np.maximum(engine.price, MIN_PRICE))
+    log_anchor = np.log(np.maximum(engine.anchor, MIN_PRICE))
+    shock = rng.standard_normal(engine.size)
+    log_price += engine.params['reversion'] * (log_anchor - log_price) * dt + sigma * np.sqrt(dt) * shock
+    return np.exp(log_price) + engine.trend_direction
+
+
+MODELS = {
+    'additive': additive_step,
+    'uniform': uniform_step,
+    'gbm': gbm_step,
+    'mean_reverting': mean_reverting_step,
+}
+
+DEFAULT_PARAMS = {
+    'sigma': 0.02,           # Base volatility per tick, scaled by each stock's volatility_factor
+    'dt': 1.0,               # Length of a tick in model time units
+    'interest_drift': 0.01,  # Drift per tick at a sector interest of 100
+    'reversion': 0.1,        # Speed of mean reversion towards the anchor price
+    'anchor_smoothing': 0.01,  # Weight of the new price in the anchor's moving average
+}
+
+
+class PricingEngine:
+    """
+    The stock universe as NumPy arrays, advanced one vectorized tick at a time.
+
+    Args:
+        model (str): One of the keys of MODELS.
+        seed (int, optional): Seed of the random generator, for reproducible ticks.
+        **params: Overrides of DEFAULT_PARAMS.
+    """
+
+    def __init__(self, model='additive', seed=None, **params):
+        if model not in MODELS:
+            raise ValueError(f"Unknown price model '{model}', expected one of {', '.join(MODELS)}")
+        self.model = model
+        self.params = {**DEFAULT_PARAMS, **params}
+        self.rng = np.random.default_rng(seed)
+        self.load([], {})
+
+    @property
+    def size(self):
+        return len(self.ids)
+
+    def load(self, stocks, sector_interest):
+        """
+        Load the universe from stock documents.
+
+        Args:
+            stocks (iterable): Stock documents with '_id', 'price' and optionally 'symbol',
+                'sector', 'volatility_factor', 'trend_direction', 'high', 'low' and 'anchor_price'.
+            sector_interest (dict): A mapping of sector to live interest.
+
+        Returns:
+            PricingEngine: The engine, for chaining.
+        """
+        stocks = list(stocks)
+        self.ids = [stock['_id'] for stock in stocks]
+        self.symbols = [stock.get('symbol') for stock in stocks]
+        self.price = np.array([stock['price'] for stock in stocks], dtype=float)
+        self.volatility_factor = np.array([stock.get('volatility_factor', 1.0) for stock in stocks], dtype=float)
+        self.trend_direction = np.array([stock.get('trend_direction', 0.0) for stock in stocks], dtype=float)
+        self.high = np.array([stock.get('high', stock['price']) for stock in stocks], dtype=float)
+        self.low = np.array([stock.get('low', stock['price']) for stock in stocks], dtype=float)
+        self.anchor = np.array([stock.get('anchor_price', stock['price']) for stock in stocks], dtype=float)
+        self.change = np.zeros(len(stocks))
+
+        self.interest = np.fromiter(
+            (sector_interest.get(stock.get('sector'), 0) for stock in stocks), dtype=float, count=len(stocks)
+        )
+        return self
+
+    def tick(self):
+        """
+        Advance every price by one tick of the selected model.
+
+        The anchor price of every stock follows an exponential moving average of
+        its price, whatever the model, so it is persisted with each tick.
+
+        Returns:
+            numpy.ndarray: The new prices.
+        """
+        if not self.size:
+            return self.price
+        new_price = np.maximum(MODELS[self.model](self, self.rng), MIN_PRICE)
+        self.change = new_price - self.price
+        self.price = new_price
+        self.high = np.maximum(self.high, new_price)
+        self.low = np.minimum(self.low, new_price)
+        self.anchor += self.params['anchor_smoothing'] * (new_price - self.anchor)
+        return new_price
+
+    def updates(self):
+        """
+        Iterate over the state of every stock after the last tick.
+
+        Yields:
+            tuple: (_id, symbol, price, change, high, low, anchor) with native Python floats.
+        """
+        return zip(
+            self.ids, self.symbols, self.price.tolist(), self.change.tolist(),
+            self.high.tolist(), self.low.tolist(), self.anchor.tolist()
+        )
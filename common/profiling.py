@@ -0,0 +1,178 @@
+"""
+Statistical profiler for single requests and Celery tasks, shared by the API and the worker.
+
+A sampler thread reads the stack of the profiled thread at a fixed interval
+and attributes the elapsed wall time and the thread's CPU time to that stack,
+building a call tree. MongoDB commands issued in the context of the profile
+are timed through a pymongo command listener.
+
+In the async app the profiled thread is the event loop, so the samples and
+the CPU time also cover requests running concurrently; the MongoDB time is
+that of the profiled request, as motor runs commands in a copy of its context.
+"""
+import contextvars
+import sys
+import threading
+import time
+from datetime import datetime
+
+from pymongo import monitoring
+
+# Profile being recorded in the current context (a thread, or a request task of the async app)
+_current = contextvars.ContextVar('profile', default=None)
+
+# Call tree nodes below this share of the samples are folded into their parent
+MIN_NODE_SHARE = 0.001
+
+
+def _thread_cpu_clock(thread_ident):
+    # Per-thread CPU clocks are only available on some platforms (Linux, macOS)
+    try:
+        clock_id = time.pthread_getcpuclockid(thread_ident)
+        time.clock_gettime(clock_id)
+        return lambda: time.clock_gettime(clock_id)
+    except (AttributeError, OSError):
+        return None
+
+
+class _Node:
+    __slots__ = ('name', 'file', 'line', 'wall', 'cpu', 'samples', 'children')
+
+    def __init__(self, name, file, line):
+        self.name, self.file, self.line = name, file, line
+        self.wall = self.cpu = 0.0
+        self.samples = 0
+        self.children = {}
+
+    def to_dict(self, min_samples):
+        return {
+            'name': self.name,
+            'file': self.file,
+            'line': self.line,
+            'wall': round(self.wall, 6),
+            'cpu': round(self.cpu, 6),
+            'samples': self.samples,
+            'children': [
+                child.to_dict(min_samples)
+                for child in sorted(self.children.values(), key=lambda node: node.wall, reverse=True)
+                if child.samples >= min_samples
+            ],
+        }
+
+
+class Profile:
+    """
+    A statistical profile of the calling thread between start() and stop().
+
+    Args:
+        name (str): What is profiled, e.g. the route or the task name.
+        interval (float): Seconds between samples.
+    """
+
+    def __init__(self, name, interval=0.005):
+        self.name = name
+        self.interval = interval
+        self.root = _Node(name, None, None)
+        self.mongo_seconds = 0.0
+        self.mongo_commands = {}
+        self._stopped = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        self.thread_ident = threading.get_ident()
+        self.started_at = datetime.now()
+        self._cpu_clock = _thread_cpu_clock(self.thread_ident)
+        self._wall_start = time.perf_counter()
+        self._cpu_start = self._cpu_clock() if self._cpu_clock else None
+        _current.set(self)
+        self._sampler = threading.Thread(target=self._sample, name=f'profiler-{self.thread_ident}', daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._sampler.join()
+        self.wall_seconds = time.perf_counter() - self._wall_start
+        self.cpu_seconds = self._cpu_clock() - self._cpu_start if self._cpu_clock else None
+        if _current.get() is self:
+            _current.set(None)
+        return self
+
+    def add_mongo_command(self, command_name, seconds):
+        self.mongo_seconds += seconds
+        count, total = self.mongo_commands.get(command_name, (0, 0.0))
+        self.mongo_commands[command_name] = (count + 1, total + seconds)
+
+    def _sample(self):
+        last_wall = time.perf_counter()
+        last_cpu = self._cpu_clock() if self._cpu_clock else 0.0
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_ident)
+            now = time.perf_counter()
+            cpu = self._cpu_clock() if self._cpu_clock else 0.0
+            if frame is not None:
+                self._record(frame, now - last_wall, cpu - last_cpu)
+            last_wall, last_cpu = now, cpu
+
+    def _record(self, frame, wall, cpu):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+
+        node = self.root
+        node.wall += wall
+        node.cpu += cpu
+        node.samples += 1
+        for key in reversed(stack):
+            child = node.children.get(key)
+            if child is None:
+                child = node.children[key] = _Node(*key)
+            child.wall += wall
+            child.cpu += cpu
+            child.samples += 1
+            node = child
+
+    def to_document(self, **extra):
+        """
+        Serialize the profile for storage.
+
+        Returns:
+            dict: The totals, the MongoDB time by command and the call tree.
+        """
+        return {
+            'name': self.name,
+            'started_at': self.started_at,
+            'interval': self.interval,
+            'wall_seconds': round(self.wall_seconds, 6),
+            'cpu_seconds': round(self.cpu_seconds, 6) if self.cpu_seconds is not None else None,
+            'mongo_seconds': round(self.mongo_seconds, 6),
+            'mongo_commands': {
+                name: {'count': count, 'seconds': round(seconds, 6)}
+                for name, (count, seconds) in sorted(self.mongo_commands.items())
+            },
+            'samples': self.root.samples,
+            'tree': self.root.to_dict(max(1, int(self.root.samples * MIN_NODE_SHARE))),
+            **extra,
+        }
+
+
+class MongoProfileListener(monitoring.CommandListener):
+    """
+    Add the time of every MongoDB command to the profile of the context issuing it, if any.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+    def _record(self, event):
+        profile = _current.get()
+        if profile is not None:
+            profile.add_mongo_command(event.command_name, event.duration_micros / 1e6)
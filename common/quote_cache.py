@@ -0,0 +1,322 @@
+"""
+Read-through cache of stock quotes shared by the API and the Celery worker.
+
+Prices live in an in-process tier in front of an optional Redis hash shared
+by every process. Writers (price ticks, trades, order matching) overwrite or
+invalidate the Redis entries and announce the change on a pub/sub channel,
+and every API process applies the announcement to its local tier.
+
+Readers only fill prices missing from the shared hash, never overwrite them,
+and the hash expires SHARED_QUOTES_TTL seconds after it is created, so a
+value a reader loaded before a concurrent change is served for a bounded time.
+"""
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Redis hash of symbol to price, and the channel announcing changes
+QUOTES_KEY = 'quotes:prices'
+QUOTES_CHANNEL = 'quotes:updates'
+
+# Seconds the shared hash lives before it is rebuilt from the database; writes do not extend it
+SHARED_QUOTES_TTL = 60
+
+# Sets (ARGV[2] == '1') or fills the field/value pairs from ARGV[3], and gives the hash a TTL if it has none
+STORE_QUOTES_SCRIPT = """
+for i = 3, #ARGV, 2 do
+    if ARGV[2] == '1' then
+        redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+    else
+        redis.call('HSETNX', KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+end
+if redis.call('TTL', KEYS[1]) == -1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+"""
+
+
+def store_shared_prices(client, prices, overwrite=True):
+    """
+    Write prices to the shared hash, keeping its expiry.
+
+    Args:
+        client: The Redis client or pipeline.
+        prices (dict): A mapping of symbol to price.
+        overwrite (bool): False to only fill the missing symbols, for values read from the database.
+    """
+    args = [SHARED_QUOTES_TTL, '1' if overwrite else '0']
+    for symbol, price in prices.items():
+        args += [symbol, price]
+    client.register_script(STORE_QUOTES_SCRIPT)(keys=[QUOTES_KEY], args=args)
+
+
+def publish_prices(redis_client, prices, chunk_size=5000):
+    """
+    Overwrite the shared prices after a tick and tell every process to drop its local tier.
+
+    Args:
+        redis_client: The Redis client.
+        prices (dict): A mapping of symbol to the new price.
+    """
+    items = list(prices.items())
+    pipeline = redis_client.pipeline(transaction=False)
+    for start in range(0, len(items), chunk_size):
+        store_shared_prices(pipeline, dict(items[start:start + chunk_size]))
+    pipeline.publish(QUOTES_CHANNEL, json.dumps({'invalidate': None}))
+    pipeline.execute()
+
+
+def publish_quotes(redis_client, quotes):
+    """
+    Overwrite the shared prices of a few stocks, e.g. after a trade, and push
+    the new quotes to every process.
+
+    Args:
+        redis_client: The Redis client.
+        quotes (dict): A mapping of symbol to a dict with at least 'price', and
+            optionally 'change', 'high' and 'low'.
+    """
+    pipeline = redis_client.pipeline(transaction=False)
+    store_shared_prices(pipeline, {symbol: quote['price'] for symbol, quote in quotes.items()})
+    pipeline.publish(QUOTES_CHANNEL, json.dumps({'quotes': quotes}))
+    pipeline.execute()
+
+
+def publish_invalidation(redis_client, symbols=None):
+    """
+    Drop the shared prices of the given symbols, or all of them, and tell every
+    process to do the same.
+    """
+    pipeline = redis_client.pipeline(transaction=False)
+    if symbols is None:
+        pipeline.delete(QUOTES_KEY)
+    elif symbols:
+        pipeline.hdel(QUOTES_KEY, *symbols)
+    pipeline.publish(QUOTES_CHANNEL, json.dumps({'invalidate': list(symbols) if symbols is not None else None}))
+    pipeline.execute()
+
+
+class QuoteCache:
+    """
+    Two-tier read-through cache of stock prices and of the full stock list.
+
+    Args:
+        redis_client (optional): The Redis client of the shared tier. Without it
+            only the local tier is used and changes made by other processes are
+            picked up when entries expire.
+        ttl (float): Seconds a local entry is trusted, as a backstop for lost announcements.
+    """
+
+    def __init__(self, redis_client=None, ttl=5.0):
+        self.redis = redis_client
+        self.ttl = ttl
+        self._prices = {}
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._listener = None
+        # Bumped on every change, so values read before a change are never cached after it
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_prices(self, symbols, loader):
+        """
+        Fetch prices from the local tier, then the shared tier, then the loader.
+
+        Args:
+            symbols (iterable): The symbols to look up.
+            loader (callable): Called with the list of missing symbols, returns a
+                mapping of symbol to price from the database.
+
+        Returns:
+            dict: A mapping of symbol to price. Unknown symbols are omitted.
+        """
+        prices, missing, generation = self.lookup_prices(symbols)
+        if not missing:
+            return prices
+
+        found = {}
+        if self.redis is not None:
+            try:
+                values = self.redis.hmget(QUOTES_KEY, missing)
+                found = {symbol: float(value) for symbol, value in zip(missing, values) if value is not None}
+            except Exception as e:
+                logger.warning(f"Shared quote cache unavailable: {e}")
+        remaining = [symbol for symbol in missing if symbol not in found]
+        loaded = loader(remaining) if remaining else {}
+        # Only share values that no announcement has superseded meanwhile, and never over a newer write
+        if loaded and self.redis is not None and generation == self._generation:
+            try:
+                store_shared_prices(self.redis, loaded, overwrite=False)
+            except Exception as e:
+                logger.warning(f"Shared quote cache unavailable: {e}")
+
+        found.update(loaded)
+        self.store_prices(found, generation)
+        prices.update(found)
+        return prices
+
+    def lookup_prices(self, symbols):
+        """
+        Fetch prices from the local tier only, for callers that load the rest themselves (e.g. asynchronously).
+
+        Returns:
+            tuple: The prices found, the missing symbols, and the generation to pass to store_prices.
+        """
+        self._ensure_listener()
+        now = time.monotonic()
+        prices = {}
+        missing = []
+        with self._lock:
+            generation = self._generation
+            for symbol in set(symbols):
+                entry = self._prices.get(symbol)
+                if entry and entry[1] > now:
+                    prices[symbol] = entry[0]
+                else:
+                    missing.append(symbol)
+            self.hits += len(prices)
+            self.misses += len(missing)
+        return prices, missing, generation
+
+    def get_snapshot(self, loader):
+        """
+        Fetch the full stock list from the local tier, or the loader on a miss.
+
+        Args:
+            loader (callable): Returns the list of stock documents from the database.
+
+        Returns:
+            list: The stock documents. They are shared between callers and must not be mutated.
+        """
+        stocks, generation = self.lookup_snapshot()
+        if stocks is None:
+            stocks = loader()
+            self.store_snapshot(stocks, generation)
+        return stocks
+
+    def lookup_snapshot(self):
+        """
+        Fetch the full stock list from the local tier only.
+
+        Returns:
+            tuple: The stock documents or None on a miss, and the generation to pass to store_snapshot.
+        """
+        self._ensure_listener()
+        with self._lock:
+            if self._snapshot and self._snapshot[1] > time.monotonic():
+                self.hits += 1
+                return self._snapshot[0], self._generation
+            self.misses += 1
+            return None, self._generation
+
+    def store_snapshot(self, stocks, generation):
+        """
+        Cache a loaded stock list, unless a change was announced since the generation was read.
+        """
+        with self._lock:
+            if generation == self._generation:
+                self._snapshot = (stocks, time.monotonic() + self.ttl)
+
+    def put_prices(self, prices):
+        """
+        Overwrite the prices of every stock after a tick in all processes.
+        """
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+        self.store_prices(prices)
+        if self.redis is not None:
+            try:
+                publish_prices(self.redis, prices)
+            except Exception as e:
+                logger.warning(f"Could not publish quotes: {e}")
+
+    def put_quotes(self, quotes):
+        """
+        Overwrite the quotes of a few stocks after a trade in all processes.
+        """
+        self._apply_quotes(quotes)
+        if self.redis is not None:
+            try:
+                publish_quotes(self.redis, quotes)
+            except Exception as e:
+                logger.warning(f"Could not publish quotes: {e}")
+
+    def invalidate(self, symbols=None):
+        """
+        Drop the given symbols, or everything, in all processes.
+        """
+        self._drop(symbols)
+        if self.redis is not None:
+            try:
+                publish_invalidation(self.redis, symbols)
+            except Exception as e:
+                logger.warning(f"Could not publish quote invalidation: {e}")
+
+    def store_prices(self, prices, generation=None):
+        """
+        Cache loaded prices locally, unless a change was announced since the generation was read.
+        """
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            for symbol, price in prices.items():
+                self._prices[symbol] = (price, expires_at)
+
+    def _apply_quotes(self, quotes):
+        with self._lock:
+            self._generation += 1
+        self.store_prices({symbol: quote['price'] for symbol, quote in quotes.items()})
+        with self._lock:
+            if self._snapshot is None:
+                return
+            # Patch the cached stock list in place of reloading it after every trade
+            stocks = []
+            for stock in self._snapshot[0]:
+                quote = quotes.get(stock.get('symbol'))
+                stocks.append({**stock, **quote} if quote else stock)
+            self._snapshot = (stocks, self._snapshot[1])
+
+    def _drop(self, symbols):
+        with self._lock:
+            self._generation += 1
+            if symbols is None:
+                self._prices.clear()
+            else:
+                for symbol in symbols:
+                    self._prices.pop(symbol, None)
+            self._snapshot = None
+
+    def _ensure_listener(self):
+        if self.redis is None or (self._listener is not None and self._listener.is_alive()):
+            return
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='quote-cache-listener', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        """
+        Apply the announcements of other processes to the local tier.
+        """
+        while True:
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(QUOTES_CHANNEL)
+                # Changes missed while disconnected are unknown, so start from scratch
+                self._drop(None)
+                for message in pubsub.listen():
+                    update = json.loads(message['data'])
+                    if 'quotes' in update:
+                        self._apply_quotes(update['quotes'])
+                    else:
+                        self._drop(update.get('invalidate'))
+            except Exception as e:
+                logger.warning(f"Quote cache listener disconnected: {e}")
+                time.sleep(1)
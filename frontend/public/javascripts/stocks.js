@@ -148,6 +148,27 @@ document.addEventListener("DOMContentLoaded", () => {
 
   
 
-  setInterval(fetchStocks, 10000);
-  fetchStocks(); // Initial load
+  function applyPriceChanges(changes) {
+    changes.forEach(change => {
+      const stock = stocks.find(stock => stock.symbol === change.symbol);
+      if (stock) Object.assign(stock, change);
+    });
+    sortAndUpdateStocks();
+  }
+
+  function subscribeToPrices() {
+    // Fall back to polling on browsers without server-sent events
+    if (!window.EventSource) {
+      setInterval(fetchStocks, 10000);
+      return;
+    }
+
+    const source = new EventSource(`${apiUrl}/stocks/stream`, { withCredentials: true });
+    source.addEventListener('prices', event => applyPriceChanges(JSON.parse(event.data)));
+    // Reload the full list after a reconnect to pick up changes missed while disconnected
+    source.addEventListener('open', fetchStocks);
+  }
+
+  fetchStocks(); // Initial load, even if the stream never connects
+  subscribeToPrices();
 });
@@ -11,15 +11,8 @@ const getBackendUrl = (endpoint) => `http://pepo_backend:5000${endpoint}`;
 router.get('/', requireLogin, attachToken, async (req, res) => {
   try {
     const token = req.session.token;
-    const portfolioResponse = await axios.get(getBackendUrl('/portfolio/stocks'), {
-      headers: { 'Authorization': `Bearer ${token}` }
-    });
-
-    const balanceResponse = await axios.get(getBackendUrl('/portfolio/balance'), {
-      headers: { 'Authorization': `Bearer ${token}` }
-    });
-
-    const assetsValueResponse = await axios.get(getBackendUrl('/portfolio/assets_value'), {
+    // Fetch balance, priced holdings and assets value in one call
+    const summaryResponse = await axios.get(getBackendUrl('/portfolio/summary'), {
       headers: { 'Authorization': `Bearer ${token}` }
     });
 
@@ -28,9 +21,7 @@ router.get('/', requireLogin, attachToken, async (req, res) => {
       headers: { 'Authorization': `Bearer ${token}` }
     });
     
-    const portfolio = portfolioResponse.data;
-    const balance = balanceResponse.data;
-    const assets_value = assetsValueResponse.data;
+    const { portfolio, balance, assets_value } = summaryResponse.data;
     const allStocks = stockSymbolsResponse.data;  // Pass the stock symbols to the template
     
     res.render('trade', { user: req.session.user, portfolio, balance, assets_value, token, allStocks });
@@ -1,9 +1,15 @@
+import os
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import setup_logging
+from common.logging_config import configure_logging
 
 # Configure Celery to use Redis as the broker
 app = Celery('tasks', broker='redis://redis:6379/0', backend='redis://redis:6379/0')
 
+# Seconds between order matching batches
+ORDER_MATCH_INTERVAL = float(os.getenv('ORDER_MATCH_INTERVAL', '5'))
+
 # Define the Celery Beat schedule for running tasks between 9 AM and 5 PM every 10 minutes
 app.conf.beat_schedule = {
     'update-stock-prices': {
@@ -16,7 +22,21 @@ app.conf.beat_schedule = {
         'schedule': crontab(minute='*/10')
         #'schedule': crontab(minute='*/10', hour='9-16'),  # Every 10 minutes between 9 AM and 5 PM
     },
+    'match-orders': {
+        'task': 'tasks.match_orders',
+        'schedule': ORDER_MATCH_INTERVAL
+    },
 }
 
 # Load task modules
 app.conf.timezone = 'UTC'
+
+
+@setup_logging.connect
+def setup_worker_logging(**kwargs):
+    # Use the same asynchronous, structured logging pipeline as the API
+    configure_logging(
+        os.getenv('LOG_LEVEL', 'INFO'),
+        json_output=os.getenv('LOG_FORMAT', 'json') == 'json',
+        rate_limits={'tasks': (float(os.getenv('LOG_RATE_LIMIT', '20')), int(os.getenv('LOG_RATE_BURST', '50')))}
+    )
@@ -0,0 +1,57 @@
+"""
+Token-bucket rate limiter shared by every worker process through Redis.
+"""
+import time
+
+# Refill the bucket for the elapsed time, then take 'requested' tokens if available.
+# Returns 0 when the tokens were taken, otherwise the seconds until they will be.
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local requested = tonumber(ARGV[4])
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = (requested - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(wait)
+"""
+
+
+class RedisTokenBucket:
+    """
+    A token bucket stored in Redis and updated atomically by a Lua script.
+
+    Args:
+        redis_client: The Redis client holding the bucket.
+        key (str): The Redis key of the bucket.
+        rate (float): Tokens added per second.
+        capacity (int): The maximum number of tokens (the burst size).
+    """
+
+    def __init__(self, redis_client, key, rate, capacity):
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+        self._script = redis_client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    def try_acquire(self, tokens=1):
+        """
+        Take tokens from the bucket without blocking.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the seconds to wait before retrying.
+        """
+        return float(self._script(keys=[self.key], args=[self.rate, self.capacity, time.time(), tokens]))
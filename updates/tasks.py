@@ -1,60 +1,221 @@
 from celery_config import app
-from pytrends.request import TrendReq
+from celery.signals import (
+    before_task_publish, task_postrun, task_prerun, worker_init, worker_process_shutdown, worker_ready
+)
+from trends_sources import RateLimitedError, get_trends_source
+from rate_limiter import RedisTokenBucket
+import worker_metrics
+from common.pricing import PricingEngine
+from common import matching
+from common.database import MongoDatabase
+from common.indexes import INDEXES
+from common.leaderboard import USER_PROJECTION, build_entry, entry_update
+from common.profiling import MongoProfileListener, Profile
+from common.quote_cache import publish_invalidation, publish_prices
 import pymongo
-from datetime import datetime, timedelta
+import redis
+import os
+from datetime import datetime
 import time
 import random
+import logging
 
-# Setup MongoDB
-client = pymongo.MongoClient("mongodb://mongo:27017/")
-db = client['gourdstocks']
+logger = logging.getLogger(__name__)
+
+# Setup MongoDB through the data-access layer shared with the API, timing its commands for task profiles.
+# The client is created on first use in each prefork child
+database = MongoDatabase()
+database.configure(os.getenv('MONGO_URI', 'mongodb://mongo:27017/'), os.getenv('MONGO_DB', 'gourdstocks'), event_listeners=[MongoProfileListener()])
+db = database.db
 trends_collection = db['trends']
 stocks_collection = db['stocks']
+users_collection = db['users']
+titles_collection = db['titles']
+leaderboard_collection = db['leaderboard']
+ticks_collection = db['stock_ticks']
+profiles_collection = db['profiles']
+net_worth_collection = db['net_worth_history']
+net_worth_daily_collection = db['net_worth_1d']
+
+# Candle collections by interval, with the function truncating a time to the candle start
+CANDLE_INTERVALS = {
+    '1m': (db['stock_candles_1m'], lambda t: t.replace(second=0, microsecond=0)),
+    '1h': (db['stock_candles_1h'], lambda t: t.replace(minute=0, second=0, microsecond=0)),
+    '1d': (db['stock_candles_1d'], lambda t: t.replace(hour=0, minute=0, second=0, microsecond=0)),
+}
+
+# Users valued per bulk write when refreshing the leaderboard and the net worth history
+REFRESH_BATCH_SIZE = 1000
+
+# Tasks profiled like the API's requests: the PROFILE_TASKS named here (e.g. 'tasks.update_stock_prices')
+# at PROFILE_TASK_SAMPLE_RATE, and any task sent with the 'profile' header
+PROFILE_TASKS = {name.strip() for name in os.getenv('PROFILE_TASKS', '').split(',') if name.strip()}
+PROFILE_TASK_SAMPLE_RATE = float(os.getenv('PROFILE_TASK_SAMPLE_RATE', '1'))
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', '0.005'))
+_task_profiles = {}
+
+# Price model of the simulation, see common/pricing.py
+PRICE_MODEL = os.getenv('PRICE_MODEL', 'additive')
+PRICING_PROJECTION = {'symbol': 1, 'price': 1, 'sector': 1, 'volatility_factor': 1, 'trend_direction': 1, 'low': 1, 'high': 1, 'anchor_price': 1}
+
+# Setup the trends source and the rate limiter shared by all workers
+REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379/0')
+redis_client = redis.Redis.from_url(REDIS_URL)
+trends_source = get_trends_source()
+
+TRENDS_BATCH_SIZE = 5  # Google Trends compares at most 5 keywords per request
+TRENDS_REQUESTS_PER_MINUTE = float(os.getenv('TRENDS_REQUESTS_PER_MINUTE', '1'))
+TRENDS_BURST = int(os.getenv('TRENDS_BURST', '1'))
+trends_rate_limiter = RedisTokenBucket(redis_client, 'trends:rate', TRENDS_REQUESTS_PER_MINUTE / 60, TRENDS_BURST)
+
+# A sector claimed by a run is not fetched again by overlapping runs until the claim expires
+TRENDS_CLAIM_SECONDS = int(os.getenv('TRENDS_CLAIM_SECONDS', '540'))
+TRENDS_MAX_RETRIES = 8
+TRENDS_BACKOFF_BASE = 30
+TRENDS_BACKOFF_MAX = 1800
+
+
+@worker_ready.connect
+def ensure_indexes(**kwargs):
+    # Same declaration as the API, see common/indexes.py
+    for collection, indexes in INDEXES.items():
+        try:
+            db[collection].create_indexes(indexes)
+        except Exception as e:
+            logger.error(f"Error ensuring indexes on {collection}: {e}")
+    logger.info("Indexes ensured.")
+
+
+@worker_init.connect
+def reset_metrics(**kwargs):
+    worker_metrics.reset_multiproc_dir()
+
+
+@worker_ready.connect
+def start_metrics_server(**kwargs):
+    worker_metrics.start_server()
+
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid=None, **kwargs):
+    worker_metrics.process_stopped(pid)
+
+
+@before_task_publish.connect
+def mark_published(headers=None, **kwargs):
+    # Lets the worker measure how long scheduled tasks waited before starting
+    if headers is not None:
+        worker_metrics.mark_published(headers)
+
 
-# Setup Pytrends
-pytrends = TrendReq(hl='en-US', tz=360)
+@task_prerun.connect
+def time_task_start(task_id=None, task=None, **kwargs):
+    worker_metrics.task_started(task_id, task)
+
+
+@task_postrun.connect
+def time_task_end(task_id=None, task=None, state=None, **kwargs):
+    worker_metrics.task_finished(task_id, task, state)
+
+
+@task_prerun.connect
+def start_task_profile(task_id=None, task=None, **kwargs):
+    requested = bool(getattr(task.request, 'profile', None))
+    if requested or (task.name in PROFILE_TASKS and random.random() < PROFILE_TASK_SAMPLE_RATE):
+        _task_profiles[task_id] = (Profile(task.name, PROFILE_INTERVAL).start(), requested)
+
+
+@task_postrun.connect
+def save_task_profile(task_id=None, task=None, state=None, **kwargs):
+    profile, requested = _task_profiles.pop(task_id, (None, False))
+    if profile is None:
+        return
+    profile.stop()
+    try:
+        result = profiles_collection.insert_one(profile.to_document(kind='task', task_id=task_id, status=state, sampled=not requested))
+        logger.info(f"Stored profile {result.inserted_id} of {task.name} ({profile.wall_seconds * 1000:.1f} ms)")
+    except Exception as e:
+        logger.error(f"Error storing the profile of {task.name}: {e}")
+
+
+def claim_sectors(sectors):
+    # SET NX makes the claim atomic across overlapping runs and workers
+    return [
+        sector for sector in sectors
+        if redis_client.set(f'trends:claim:{sector}', 1, nx=True, ex=TRENDS_CLAIM_SECONDS)
+    ]
+
+
+def release_sectors(sectors):
+    if sectors:
+        redis_client.delete(*[f'trends:claim:{sector}' for sector in sectors])
+
+
+def reschedule_batch(sectors, attempt, countdown):
+    # Keep the sectors claimed while the batch is pending, then run it later without holding a worker
+    for sector in sectors:
+        redis_client.expire(f'trends:claim:{sector}', TRENDS_CLAIM_SECONDS + int(countdown))
+    fetch_trends_batch.apply_async(args=[sectors, attempt], countdown=countdown)
 
 
 @app.task
-def fetch_live_interest_data(sectors):
+def fetch_trends_batch(sectors, attempt=0):
+    # Wait for a token of the shared rate limiter instead of sleeping in the worker
+    wait = trends_rate_limiter.try_acquire()
+    if wait > 0:
+        reschedule_batch(sectors, attempt, wait + random.uniform(0, 1))
+        return None
+
     try:
-        pytrends.build_payload(sectors, cat=0, timeframe='now 1-H')
-        interest_over_time_df = pytrends.interest_over_time()
-        return interest_over_time_df
+        interest = trends_source.fetch(sectors)
+    except RateLimitedError as e:
+        worker_metrics.TRENDS_FETCHES.labels('rate_limited').inc()
+        if attempt >= TRENDS_MAX_RETRIES:
+            worker_metrics.TRENDS_FETCHES.labels('gave_up').inc()
+            logger.error(f'Giving up on batch {sectors} after {attempt + 1} rate-limited attempts')
+            release_sectors(sectors)
+            return None
+        # Exponential backoff with jitter on 429s
+        countdown = min(TRENDS_BACKOFF_MAX, TRENDS_BACKOFF_BASE * 2 ** attempt)
+        countdown += random.uniform(0, countdown / 2)
+        logger.warning(f'Rate limited fetching {sectors}, retrying in {countdown:.0f}s: {e}')
+        reschedule_batch(sectors, attempt + 1, countdown)
+        return None
     except Exception as e:
-        print(f"Error fetching data for {sectors}: {e}")
-    return None
+        worker_metrics.TRENDS_FETCHES.labels('error').inc()
+        logger.error(f'Error fetching data for {sectors}: {e}')
+        release_sectors(sectors)
+        return None
+
+    worker_metrics.TRENDS_FETCHES.labels('success').inc()
+    now = datetime.now()
+    if interest:
+        trends_collection.bulk_write([
+            pymongo.UpdateOne(
+                {'sector': sector},
+                {'$set': {'live_interest': live_interest, 'timestamp': now}},
+                upsert=True
+            )
+            for sector, live_interest in interest.items()
+        ], ordered=False)
+    for sector in sectors:
+        if sector in interest:
+            logger.info(f'Retrieved live data for {sector}')
+        else:
+            logger.warning(f'No live data for {sector}')
+    return interest
 
 
 @app.task
 def store_live_interest_data():
-    # Get all unique sectors from the stocks collection
-    sectors = stocks_collection.distinct('sector')
-    
-    start_time = datetime.now()
-    end_time = start_time + timedelta(hours=1)
-    
-    while datetime.now() < end_time and sectors:
-        batch = sectors[:5]  # Take the first 5 sectors
-        interest_data = fetch_live_interest_data(batch)
-        if interest_data is not None:
-            for sector in batch:
-                if sector in interest_data.columns:
-                    live_interest = int(interest_data[sector].iloc[-1])  # Convert to native Python int
-                    trends_collection.update_one(
-                        {'sector': sector},
-                        {'$set': {'live_interest': live_interest, 'timestamp': datetime.now()}},
-                        upsert=True
-                    )
-                    print(f'Retrieved live data for {sector}')
-                else:
-                    print(f'No live data for {sector}')
-        else:
-            print(f'Failed to fetch data for batch: {batch}')
-        
-        # Remove the processed sectors from the list
-        sectors = sectors[5:]
-        time.sleep(60)  # Wait for 1 minute between requests to avoid rate limits
+    # Get all unique sectors from the stocks collection, skipping those claimed by an overlapping run
+    sectors = claim_sectors(stocks_collection.distinct('sector'))
+
+    # Fan out small batches; the shared rate limiter spaces out the requests
+    for i in range(0, len(sectors), TRENDS_BATCH_SIZE):
+        fetch_trends_batch.delay(sectors[i:i + TRENDS_BATCH_SIZE])
+    logger.info(f'Scheduled trends ingestion of {len(sectors)} sectors')
+    return len(sectors)
 
 
 @app.task
@@ -64,41 +225,191 @@ def get_live_interest_data(sector):
         return trend_data['live_interest']
     return 0
 
+
+def get_sector_interest_map():
+    # Read the whole trends collection once into a sector -> live interest map
+    return {
+        trend['sector']: trend.get('live_interest', 0)
+        for trend in trends_collection.find({}, {'_id': 0, 'sector': 1, 'live_interest': 1})
+    }
+
+
 @app.task
 def update_stock_prices():
-    stocks = list(stocks_collection.find())
-    for stock in stocks:
-        sector_interest = get_live_interest_data(stock['sector'])
-
-        # Base price change based on sector interest
-        base_price_change = sector_interest * 0.01
-
-        # Add random factor adjusted by volatility factor
-        random_factor = random.uniform(-0.05, 0.05) * stock.get('volatility_factor', 1.0)
-
-        # Adjust for trend direction
-        trend_adjustment = stock.get('trend_direction', 0.0)
-
-        # Calculate final price change
-        price_change = base_price_change + (stock['price'] * random_factor) + trend_adjustment
-
-        # Calculate new price
-        new_price = stock['price'] + price_change
-
-        # Update stock document in MongoDB
-        stocks_collection.update_one(
-            {'_id': stock['_id']},
-            {
-                '$set': {
-                    'price': new_price,
-                    'last_update': datetime.now(),
-                    'change': new_price - stock['price'],
-                    'low': min(stock['low'], new_price),
-                    'high': max(stock['high'], new_price)
-                }
-            }
+    tick_start = time.perf_counter()
+    engine = PricingEngine(PRICE_MODEL).load(
+        stocks_collection.find({}, PRICING_PROJECTION),
+        get_sector_interest_map()
+    )
+    load_seconds = time.perf_counter() - tick_start
+
+    # Compute every new price in one vectorized step
+    engine.tick()
+    compute_seconds = time.perf_counter() - tick_start - load_seconds
+
+    now = datetime.now()
+    operations = []
+    new_prices = {}
+    for stock_id, symbol, price, change, high, low, anchor in engine.updates():
+        new_prices[symbol] = price
+        operations.append(pymongo.UpdateOne(
+            {'_id': stock_id},
+            {'$set': {'price': price, 'last_update': now, 'change': change, 'low': low, 'high': high, 'anchor_price': anchor}}
+        ))
+
+    # Commit the whole tick in one unordered bulk write
+    modified_count = 0
+    if operations:
+        result = stocks_collection.bulk_write(operations, ordered=False)
+        modified_count = result.modified_count
+    tick_seconds = time.perf_counter() - tick_start
+
+    logger.info(
+        f"Stock prices updated with the {PRICE_MODEL} model: {len(operations)} stocks, {modified_count} written "
+        f"in {tick_seconds * 1000:.1f} ms (load {load_seconds * 1000:.1f} ms, compute {compute_seconds * 1000:.1f} ms)."
+    )
+
+    record_price_history(new_prices, now)
+    publish_quote_change(publish_prices, new_prices)
+    # Value every portfolio once for both the leaderboard and the net worth history, in its own task so the
+    # full user scan does not delay the tick
+    refresh_leaderboard.delay(record_history=True)
+    worker_metrics.LAST_TICK.set_to_current_time()
+
+    return {'stocks': len(operations), 'written': modified_count, 'tick_seconds': tick_seconds}
+
+
+def record_price_history(prices, timestamp):
+    if not prices:
+        return
+
+    # Append the tick to the hourly bucket of raw ticks of each symbol
+    bucket_start = timestamp.replace(minute=0, second=0, microsecond=0)
+    ticks_collection.bulk_write([
+        pymongo.UpdateOne(
+            {'symbol': symbol, 'start': bucket_start},
+            {'$push': {'ticks': {'t': timestamp, 'p': price}}, '$inc': {'count': 1}},
+            upsert=True
+        )
+        for symbol, price in prices.items()
+    ], ordered=False)
+
+    # Roll the tick into the open candle of every interval
+    for interval, (candles_collection, truncate) in CANDLE_INTERVALS.items():
+        candle_start = truncate(timestamp)
+        candles_collection.bulk_write([
+            pymongo.UpdateOne(
+                {'symbol': symbol, 'start': candle_start},
+                {
+                    '$setOnInsert': {'open': price},
+                    '$max': {'high': price},
+                    '$min': {'low': price},
+                    '$set': {'close': price},
+                    '$inc': {'ticks': 1}
+                },
+                upsert=True
+            )
+            for symbol, price in prices.items()
+        ], ordered=False)
+    logger.info(f"Price history recorded for {len(prices)} stocks.")
+
+
+def publish_quote_change(publish, *args):
+    # Keep the API quote caches fresh; they fall back to their TTL if Redis is unavailable
+    try:
+        publish(redis_client, *args)
+    except redis.RedisError as e:
+        logger.warning(f"Could not publish quote change: {e}")
+
+
+@app.task
+def match_orders():
+    # Clear the queued orders of every symbol in one batch
+    filled_users = set()
+    counts = matching.match_orders(database.trades, filled_users=filled_users)
+    if counts['symbols']:
+        publish_quote_change(publish_invalidation)
+    if filled_users:
+        refresh_leaderboard_users(filled_users)
+    return counts
+
+
+def get_titles():
+    return {title['level']: title['title'] for title in titles_collection.find({}, {'_id': 0, 'level': 1, 'title': 1})}
+
+
+def refresh_leaderboard_users(user_ids):
+    # Revalue only the given users, pricing just the stocks they hold
+    refreshed_at = datetime.now()
+    users = list(users_collection.find({'_id': {'$in': list(user_ids)}}, USER_PROJECTION))
+    symbols = list({stock['stock_symbol'] for user in users for stock in user.get('portfolio', [])})
+    prices = {stock['symbol']: stock['price'] for stock in stocks_collection.find({'symbol': {'$in': symbols}}, {'_id': 0, 'symbol': 1, 'price': 1})}
+    titles = get_titles()
+
+    if users:
+        leaderboard_collection.bulk_write([
+            entry_update({**build_entry(user, prices, titles), 'updated_at': refreshed_at})
+            for user in users
+        ], ordered=False)
+    logger.info(f"Leaderboard refreshed for {len(users)} users.")
+
+
+@app.task
+def refresh_leaderboard(record_history=False):
+    # Value every portfolio from one price map and one streamed user scan, writing as the scan goes
+    refreshed_at = datetime.now()
+    prices = {stock['symbol']: stock['price'] for stock in stocks_collection.find({}, {'_id': 0, 'symbol': 1, 'price': 1})}
+    titles = get_titles()
+
+    count = 0
+    entries = []
+    users = users_collection.find({}, USER_PROJECTION, batch_size=REFRESH_BATCH_SIZE)
+    for user in users:
+        entries.append({**build_entry(user, prices, titles), 'updated_at': refreshed_at})
+        if len(entries) >= REFRESH_BATCH_SIZE:
+            write_leaderboard_batch(entries, refreshed_at, record_history)
+            count += len(entries)
+            entries = []
+    if entries:
+        write_leaderboard_batch(entries, refreshed_at, record_history)
+        count += len(entries)
+
+    # Drop entries of users that no longer exist
+    leaderboard_collection.delete_many({'updated_at': {'$lt': refreshed_at}})
+    logger.info(f"Leaderboard refreshed with {count} entries{' and net worth history recorded' if record_history else ''}.")
+
+
+def write_leaderboard_batch(entries, refreshed_at, record_history):
+    # Rows a trade refreshed after the scan started are newer than the entries and kept
+    leaderboard_collection.bulk_write([entry_update(entry) for entry in entries], ordered=False)
+    if record_history:
+        record_net_worth_history([(entry['user_id'], entry['liquidAssets'], entry['investedAssets']) for entry in entries], refreshed_at)
+
+
+def record_net_worth_history(snapshots, timestamp):
+    if not snapshots:
+        return
+
+    # Append a compact point to the daily bucket of each user
+    day_start = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    net_worth_collection.bulk_write([
+        pymongo.UpdateOne(
+            {'user_id': user_id, 'start': day_start},
+            {'$push': {'points': {'t': timestamp, 'c': cash, 'i': invested}}, '$inc': {'count': 1}},
+            upsert=True
+        )
+        for user_id, cash, invested in snapshots
+    ], ordered=False)
+
+    # Downsample to the last point of each day
+    net_worth_daily_collection.bulk_write([
+        pymongo.UpdateOne(
+            {'user_id': user_id, 'start': day_start},
+            {'$set': {'t': timestamp, 'c': cash, 'i': invested}},
+            upsert=True
         )
-    print("Stock prices updated.")
+        for user_id, cash, invested in snapshots
+    ], ordered=False)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,86 @@
+"""
+Pluggable sources of live Google Trends interest.
+
+'TRENDS_SOURCE=fake' swaps pytrends for a deterministic offline source, so the
+ingestion tasks can be exercised without network access.
+"""
+import os
+import random
+import zlib
+
+
+class RateLimitedError(Exception):
+    """
+    Raised when the trends backend rejects a request with HTTP 429.
+    """
+
+
+class PytrendsSource:
+    """
+    Live interest over the last hour from Google Trends.
+
+    The pytrends client (and pandas with it) is only created on first use.
+    """
+
+    def __init__(self):
+        self._client = None
+
+    def fetch(self, sectors):
+        """
+        Fetch the latest interest of up to 5 sectors.
+
+        Returns:
+            dict: A mapping of sector to interest; sectors without data are omitted.
+
+        Raises:
+            RateLimitedError: If Google Trends answered with HTTP 429.
+        """
+        from pytrends.exceptions import ResponseError, TooManyRequestsError
+
+        if self._client is None:
+            from pytrends.request import TrendReq
+            self._client = TrendReq(hl='en-US', tz=360)
+
+        try:
+            self._client.build_payload(sectors, cat=0, timeframe='now 1-H')
+            interest_over_time_df = self._client.interest_over_time()
+        except TooManyRequestsError as e:
+            raise RateLimitedError(str(e)) from e
+        except ResponseError as e:
+            if getattr(e.response, 'status_code', None) == 429:
+                raise RateLimitedError(str(e)) from e
+            raise
+
+        return {
+            sector: int(interest_over_time_df[sector].iloc[-1])  # Convert to native Python int
+            for sector in sectors
+            if not interest_over_time_df.empty and sector in interest_over_time_df.columns
+        }
+
+
+class FakeTrendsSource:
+    """
+    Deterministic offline interest for tests and local development.
+
+    Args:
+        rate_limit_probability (float): The chance of simulating an HTTP 429 per request.
+    """
+
+    def __init__(self, rate_limit_probability=0.0):
+        self.rate_limit_probability = rate_limit_probability
+        self.requests = []
+
+    def fetch(self, sectors):
+        self.requests.append(list(sectors))
+        if random.random() < self.rate_limit_probability:
+            raise RateLimitedError('Simulated 429 from the fake trends source')
+        return {sector: zlib.crc32(sector.encode()) % 101 for sector in sectors}
+
+
+def get_trends_source():
+    """
+    Build the trends source selected by the TRENDS_SOURCE environment variable.
+    """
+    if os.getenv('TRENDS_SOURCE', 'pytrends') == 'fake':
+        return FakeTrendsSource(float(os.getenv('FAKE_TRENDS_429_RATE', '0')))
+    return PytrendsSource()
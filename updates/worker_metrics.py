@@ -0,0 +1,98 @@
+import os
+import shutil
+import time
+import logging
+
+# Tasks run in prefork children, so their metrics are shared through files when
+# PROMETHEUS_MULTIPROC_DIR is set; the directory must exist before prometheus_client is imported
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess, start_http_server
+
+logger = logging.getLogger(__name__)
+
+METRICS_PORT = int(os.getenv('WORKER_METRICS_PORT', '9100'))
+
+TASK_DURATION = Histogram(
+    'celery_task_duration_seconds',
+    'Run time of Celery tasks.',
+    ['task', 'state'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+TASK_LAG = Histogram(
+    'celery_task_lag_seconds',
+    'Delay between a task being published (by Beat for scheduled tasks) and a worker starting it.',
+    ['task'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 600)
+)
+LAST_TICK = Gauge(
+    'stock_tick_last_success_timestamp_seconds',
+    'Unix time of the last completed stock price tick.',
+    multiprocess_mode='max'
+)
+TRENDS_FETCHES = Counter(
+    'trends_fetch_total',
+    'Google Trends batch fetches, by result.',
+    ['result']
+)
+
+_started_at = {}
+
+
+def mark_published(headers):
+    headers.setdefault('published_at', time.time())
+
+
+def task_started(task_id, task):
+    _started_at[task_id] = time.perf_counter()
+    published_at = getattr(task.request, 'published_at', None)
+    if published_at:
+        TASK_LAG.labels(task.name).observe(max(time.time() - published_at, 0))
+
+
+def task_finished(task_id, task, state):
+    started_at = _started_at.pop(task_id, None)
+    if started_at is not None:
+        TASK_DURATION.labels(task.name, state or 'UNKNOWN').observe(time.perf_counter() - started_at)
+
+
+def reset_multiproc_dir():
+    """
+    Remove the metric files left by a previous run of the worker.
+
+    Called in the main process before the pool forks: files of dead children
+    would otherwise be summed into the metrics of the new run.
+    """
+    if not MULTIPROC_DIR:
+        return
+    for name in os.listdir(MULTIPROC_DIR):
+        path = os.path.join(MULTIPROC_DIR, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+    logger.info(f"Cleared worker metric files in {MULTIPROC_DIR}")
+
+
+def process_stopped(pid):
+    # Drops the live gauges of a pool child that exits
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
+
+
+def start_server():
+    """
+    Serve the metrics of the worker (and of all its children in multiprocess mode).
+    """
+    try:
+        if MULTIPROC_DIR:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            start_http_server(METRICS_PORT, registry=registry)
+        else:
+            start_http_server(METRICS_PORT)
+        logger.info(f"Worker metrics served on port {METRICS_PORT}")
+    except OSError as e:
+        logger.error(f"Could not serve worker metrics on port {METRICS_PORT}: {e}")